@@ -0,0 +1,345 @@
+"""Stores the outcome of every simulation in memory-mapped files on disk."""
+
+import os
+import json
+import queue
+import threading
+import numpy
+import numpy.lib.format
+import database
+
+# Define constants.
+HEADER_FILE = "header.json"
+WINNERS_FILE = "winners.npy"
+MOST_DELEGATES_FILE = "most_delegates.npy"
+FINAL_DELEGATES_FILE = "final_delegates.npy"
+# Code used when no candidate has any delegates.
+NO_CANDIDATE_CODE = 255
+# Number of simulations held in memory before being written to the files.
+BUFFER_SIZE = 5000
+# Number of full buffers waiting to be written before adding simulations
+# waits for the files to catch up.
+QUEUE_SIZE = 4
+# Number of simulations read at once when summarising a store.
+READ_CHUNK_SIZE = 100000
+
+class OutcomeWriter:
+    """
+    Writes the outcome of each simulation to a directory of .npy files.
+
+    Winners and the candidates with the most delegates are written as uint8
+    codes indexing the labels in the JSON header, and final delegate counts
+    as an int16 array with one row per simulation. Full buffers are written
+    by a background thread, so simulations carry on while they are written.
+
+    """
+    def __init__(self, path, candidates, capacity=BUFFER_SIZE,
+                 buffer_size=BUFFER_SIZE):
+        """
+        Creates the files of a new store, overwriting any existing store.
+
+        :param path:
+            The directory to store the files in, which is created if needed.
+        :param candidates:
+            List of candidate names giving the order of the columns.
+        :param capacity:
+            The number of simulations to make room for. The files grow if more
+            simulations are added.
+        :param buffer_size:
+            The number of simulations collected before writing to the files.
+
+        """
+        if len(candidates) >= NO_CANDIDATE_CODE:
+            raise ValueError("Too many candidates to store as uint8 codes.")
+        if capacity <= 0 or buffer_size <= 0:
+            raise ValueError("Capacity and buffer size must be positive.")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.candidates = list(candidates)
+        self.num_sims = 0
+        self.capacity = 0
+        self.winners = None
+        self.most_delegates = None
+        self.final_delegates = None
+        self.grow(capacity)
+
+        # Set up the buffer, which is handed to the background thread
+        # whenever it fills.
+        self.buffer = numpy.zeros((buffer_size, len(self.candidates)),
+                                  dtype=numpy.int16)
+        self.buffered = 0
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.error = None
+        self.thread = threading.Thread(target=self.write_buffers, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        """Returns the writer for use in a with statement."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the writer at the end of a with statement."""
+        self.close()
+
+    def grow(self, capacity):
+        """
+        Makes room in the files for at least capacity simulations, copying
+        any simulations already written.
+
+        :param capacity:
+            The number of simulations to make room for.
+
+        """
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2*self.capacity)
+        new_arrays = []
+        for attribute, name, dtype, shape in [
+                ("winners", WINNERS_FILE, numpy.uint8, (capacity,)),
+                ("most_delegates", MOST_DELEGATES_FILE, numpy.uint8,
+                 (capacity,)),
+                ("final_delegates", FINAL_DELEGATES_FILE, numpy.int16,
+                 (capacity, len(self.candidates)))]:
+            # Write the larger file alongside the old one, then replace it.
+            new_path = os.path.join(self.path, name + ".tmp")
+            array = numpy.lib.format.open_memmap(new_path, mode="w+",
+                                                 dtype=dtype, shape=shape)
+            if getattr(self, attribute) is not None:
+                array[:self.num_sims] = getattr(self, attribute)[
+                    :self.num_sims]
+                array.flush()
+                setattr(self, attribute, None)
+            new_arrays.append((attribute, name, new_path, array))
+        for attribute, name, new_path, array in new_arrays:
+            os.replace(new_path, os.path.join(self.path, name))
+            setattr(self, attribute, array)
+        self.capacity = capacity
+        self.write_header()
+
+    def add_final_delegates(self, final_delegates):
+        """
+        Adds a batch of simulations to the store.
+
+        :param final_delegates:
+            Integer array with one row per simulation, giving each candidate's
+            pledged delegate count at the end of the primary in the order of
+            the store's candidates.
+
+        """
+        final_delegates = numpy.asarray(final_delegates)
+        start = 0
+        while start < len(final_delegates):
+            # Copy as much of the batch as fits into the buffer.
+            stop = min(len(final_delegates),
+                       start + len(self.buffer) - self.buffered)
+            self.buffer[self.buffered:self.buffered + stop - start] = (
+                final_delegates[start:stop])
+            self.buffered = self.buffered + stop - start
+            start = stop
+            if self.buffered == len(self.buffer):
+                self.flush()
+
+    def add_result(self, result):
+        """
+        Adds the result of one simulation to the store.
+
+        :param result:
+            A PrimarySimulationResults object.
+
+        """
+        final_delegates = [result.final_delegates[candidate]
+                           for candidate in self.candidates]
+        self.add_final_delegates([final_delegates])
+
+    def flush(self):
+        """
+        Hands the buffered simulations to the background thread to write,
+        and starts a new buffer.
+
+        """
+        if self.error is not None:
+            raise self.error
+        if self.buffered == 0:
+            return
+        self.queue.put(self.buffer[:self.buffered])
+        self.buffer = numpy.empty_like(self.buffer)
+        self.buffered = 0
+
+    def write_buffers(self):
+        """
+        Writes each buffer handed over by flush to the files, in order, until
+        handed None. Runs on the background thread, keeping the first error
+        for close to raise.
+
+        """
+        while True:
+            final_delegates = self.queue.get()
+            if final_delegates is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                self.write(final_delegates)
+            except Exception as error:
+                self.error = error
+
+    def write(self, final_delegates):
+        """
+        Writes a batch of simulations to the files.
+
+        :param final_delegates:
+            Integer array with one row per simulation, giving each candidate's
+            pledged delegate count in the order of the store's candidates.
+
+        """
+        self.grow(self.num_sims + len(final_delegates))
+        winners, most_delegates = encode_outcomes(final_delegates)
+        stop = self.num_sims + len(final_delegates)
+        self.winners[self.num_sims:stop] = winners
+        self.most_delegates[self.num_sims:stop] = most_delegates
+        self.final_delegates[self.num_sims:stop] = final_delegates
+        self.num_sims = stop
+
+    def close(self):
+        """
+        Writes any buffered simulations, waits for the background thread to
+        finish, then writes the header to disk.
+
+        """
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        for array in [self.winners, self.most_delegates,
+                      self.final_delegates]:
+            array.flush()
+        self.write_header()
+
+    def write_header(self):
+        """Writes the JSON header describing the files."""
+        header = {"candidates":self.candidates,
+                  "labels":self.candidates + ["No majority"],
+                  "no_candidate_code":NO_CANDIDATE_CODE,
+                  "num_sims":self.num_sims,
+                  "capacity":self.capacity}
+        with open(os.path.join(self.path, HEADER_FILE), "w") as header_file:
+            json.dump(header, header_file)
+
+class OutcomeStore:
+    """
+    Reads a store written by OutcomeWriter, mapping the files into memory
+    rather than loading them.
+
+    """
+    def __init__(self, path):
+        """
+        Opens an existing store.
+
+        :param path:
+            The directory containing the store's files.
+
+        """
+        with open(os.path.join(path, HEADER_FILE)) as header_file:
+            header = json.load(header_file)
+        self.path = path
+        self.candidates = header["candidates"]
+        self.labels = header["labels"]
+        self.no_candidate_code = header["no_candidate_code"]
+        self.num_sims = header["num_sims"]
+
+        # Only the rows holding simulations are used.
+        self.winners = open_array(path, WINNERS_FILE)[:self.num_sims]
+        self.most_delegates = open_array(path,
+                                         MOST_DELEGATES_FILE)[:self.num_sims]
+        self.final_delegates = open_array(path,
+                                          FINAL_DELEGATES_FILE)[:self.num_sims]
+
+    def __len__(self):
+        """Returns the number of simulations stored."""
+        return self.num_sims
+
+    def __iter__(self):
+        """Yields a PrimarySimulationResults object for each simulation."""
+        for i in range(len(self)):
+            yield self.get_result(i)
+
+    def decode(self, code):
+        """
+        Converts a winner or most delegates code into a name.
+
+        :param code:
+            The uint8 code.
+        :return name:
+            The name of the candidate, "No majority", or None if the code
+            is no_candidate_code.
+
+        """
+        if code == self.no_candidate_code:
+            return None
+        return self.labels[code]
+
+    def get_result(self, i):
+        """
+        Retrieves the results of a single simulation.
+
+        :param i:
+            The index of the simulation.
+        :return result:
+            A PrimarySimulationResults object for the simulation.
+
+        """
+        final_delegates = dict(zip(self.candidates,
+                                   self.final_delegates[i].tolist()))
+        return database.PrimarySimulationResults(
+            self.decode(self.winners[i]), final_delegates,
+            self.decode(self.most_delegates[i]))
+
+    def summarise(self, chunk_size=READ_CHUNK_SIZE):
+        """
+        Summarises the stored simulations, reading a chunk at a time.
+
+        :param chunk_size:
+            The number of simulations read at once.
+        :return summary:
+            A SimulationSummary object containing the results.
+
+        """
+        summary = database.SimulationSummary(self.candidates)
+        for start in range(0, self.num_sims, chunk_size):
+            summary.add_final_delegates(
+                self.final_delegates[start:start + chunk_size])
+        return summary
+
+def encode_outcomes(final_delegates):
+    """
+    Finds the winner and candidate with the most delegates of each simulation
+    as uint8 codes, from database.find_outcome_columns.
+
+    :param final_delegates:
+        Integer array of final delegate counts, one row per simulation.
+    :return winners:
+        Array of the column of each simulation's winner, or the number of
+        candidates if no candidate has a majority.
+    :return most_delegates:
+        Array of the column of the candidate with the most delegates in each
+        simulation, or NO_CANDIDATE_CODE if no candidate has any.
+
+    """
+    winners, most_delegates = database.find_outcome_columns(final_delegates)
+    most_delegates[most_delegates < 0] = NO_CANDIDATE_CODE
+    return winners.astype(numpy.uint8), most_delegates.astype(numpy.uint8)
+
+def open_array(path, name):
+    """
+    Maps one of a store's .npy files into memory read-only.
+
+    :param path:
+        The directory containing the store's files.
+    :param name:
+        The name of the file.
+    :return array:
+        The memory-mapped array.
+
+    """
+    return numpy.load(os.path.join(path, name), mmap_mode="r")
\ No newline at end of file
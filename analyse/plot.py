@@ -1,39 +1,69 @@
 """Analyses and presents presidential primary results."""
 
+import datetime
 import matplotlib.pyplot as plt
 import database
+import collect.process_polls as pp
+import analyse.outcomes as outcomes
 import sys
 
+def summarise(results):
+    """
+    Summarises a set of simulation results, unless they are already summarised.
+
+    :param results:
+        A SimulationSummary object, an OutcomeStore object, a
+        BatchSimulationResults object, or a list of PrimarySimulationResults
+        objects storing data for each simulation.
+    :return summary:
+        A SimulationSummary object containing the results.
+
+    """
+    if isinstance(results, database.SimulationSummary):
+        return results
+    if isinstance(results, outcomes.OutcomeStore):
+        return results.summarise()
+
+    # Take the candidates from the first result.
+    if isinstance(results, database.BatchSimulationResults):
+        candidates = results.candidates
+    else:
+        results = list(results)
+        if results == []:
+            print("No simulation results to summarise.")
+            sys.exit()
+        candidates = list(results[0].final_delegates)
+    summary = database.SimulationSummary(candidates)
+    summary.add_results(results)
+    return summary
+
 def winners_pie_chart(results):
     """
     Plots a pie chart showing how likely each candidate is to win the first
     ballot at the Democratic National Convention.
 
     :param results:
-        A list of PrimarySimulationResults objects storing data for each
-        simulation.
+        A SimulationSummary object containing the results of the simulations.
+        A list of PrimarySimulationResults objects is also accepted.
     
     """
-    # Sum the results of the simulations and add them to a dict keying name
-    # to number of wins.
-    total_results = {}
-    for result in results:
-        winner = result.winner
-        if winner in total_results:
-            total_results[winner] = total_results[winner] + 1
-        else:
-            total_results[winner] = 1
+    # Find a dict keying name to number of wins, and the standard error of
+    # each probability.
+    summary = summarise(results)
+    total_results = summary.get_win_counts()
+    standard_errors = summary.get_win_standard_errors()
     
     # Convert the dict into two lists where the index of a candidate's name
     # in the names list matches the index of their wins in the wins list.
     names = []
     wins = []
     for candidate in total_results:
-        names.append(candidate)
+        names.append(label_with_error(candidate, standard_errors[candidate]))
         wins.append(total_results[candidate])
     
     plt.pie(wins, labels=names, autopct = '%1.1f%%')
-    plt.title("Probability of Winning a Majority of Pledged Delegates.")
+    plt.title("Probability of Winning a Majority of Pledged Delegates.\n"
+              + precision_note(summary))
     plt.show()
 
 def most_delegates_pie_chart(results):
@@ -43,20 +73,15 @@ def most_delegates_pie_chart(results):
     first ballot.
 
     :param results:
-        A list of PrimarySimulationResults objects storing data for each
-        simulation.
+        A SimulationSummary object containing the results of the simulations.
+        A list of PrimarySimulationResults objects is also accepted.
     
     """
-    # Sum the results of the simulations and add them to a dict keying name
-    # to number of wins.
-    total_results = {}
-    for result in results:
-        if result.winner == "No majority":
-            winner = result.most_delegates
-            if winner in total_results:
-                total_results[winner] = total_results[winner] + 1
-            else:
-                total_results[winner] = 1
+    # Find a dict keying name to number of times with the most delegates when
+    # there is no majority, and the standard error of each probability.
+    summary = summarise(results)
+    total_results = summary.get_most_delegates_counts()
+    standard_errors = summary.get_most_delegates_standard_errors()
     
     # Convert the dict into two lists where the index of a candidate's name
     # in the names list matches the index of their most delegates in the wins 
@@ -64,21 +89,70 @@ def most_delegates_pie_chart(results):
     names = []
     wins = []
     for candidate in total_results:
-        names.append(candidate)
+        names.append(label_with_error(candidate, standard_errors[candidate]))
         wins.append(total_results[candidate])
     
     plt.pie(wins, labels=names, autopct = '%1.1f%%')
-    plt.title("Probability of Winning The Most Pledged Delegates.")
+    plt.title("Probability of Winning The Most Pledged Delegates.\n"
+              + precision_note(summary))
     plt.show()
 
+def label_with_error(name, standard_error):
+    """
+    Adds the standard error of a probability to its label.
+
+    :param name:
+        The label, such as a candidate's name.
+    :param standard_error:
+        The standard error of the probability, between 0 and 1.
+    :return label:
+        The label followed by the standard error in percentage points.
+
+    """
+    return "{} (\u00b1{:.1f}%)".format(name, 100*standard_error)
+
+def precision_note(summary):
+    """
+    Describes how many simulations a chart is based on and how precise it is.
+
+    :param summary:
+        The SimulationSummary object the chart is drawn from.
+    :return note:
+        A string giving the number of simulations and explaining the errors
+        shown.
+
+    """
+    return ("{:,} simulations, \u00b1 one standard error.".format(
+        len(summary)))
+
+def print_weighted_win_probabilities(results):
+    """
+    Prints the probability of each candidate winning a majority of pledged
+    delegates, weighting each simulation by its likelihood ratio, as needed
+    for importance sampled simulations.
+
+    :param results:
+        A SimulationSummary object containing the results of the simulations.
+
+    """
+    summary = summarise(results)
+    probabilities = summary.get_weighted_win_probabilities()
+    standard_errors = summary.get_weighted_win_standard_errors()
+    print("Probability of Winning a Majority of Pledged Delegates.")
+    for name in probabilities:
+        print("{:<16} {:>10.3g} \u00b1 {:.2g}".format(
+            name, probabilities[name], standard_errors[name]))
+    print("{:,} simulations, worth {:,.0f} unweighted simulations.".format(
+        len(summary), summary.get_effective_sample_size()))
+
 def mean_final_delegates(results, num_sims, candidates):
     """
     Plots a pie chart showing the mean number of pledged delegates each
     candidate has at the end of the primary process.
 
     :param results:
-        A list of PrimarySimulationResults objects storing data for each
-        simulation.
+        A SimulationSummary object containing the results of the simulations.
+        A list of PrimarySimulationResults objects is also accepted.
     :param num_sims:
         The number of simulations run.
     :param candidates:
@@ -91,21 +165,12 @@ def mean_final_delegates(results, num_sims, candidates):
         print("Number of simulations less than or equal to zero.")
         sys.exit()
 
-    # Set up dict keying candidate names to total delegates over all
+    # Find a dict keying candidate names to their mean delegates over all
     # simulations.
+    mean_dels = summarise(results).get_mean_delegates()
     total_dels = {}
     for candidate in candidates:
-        total_dels[candidate] = 0
-
-    # Add up the results.
-    for result in results:
-        dels = result.final_delegates
-        for candidate in candidates:
-            total_dels[candidate] = total_dels[candidate] + dels[candidate]
-
-    # Divide through by the number of simulations to find the average. 
-    for candidate in total_dels:
-        total_dels[candidate] = total_dels[candidate]/num_sims
+        total_dels[candidate] = mean_dels[candidate]
 
     # Convert the dict into two lists where the index of a candidate's name
     # in the names list matches the index of their mean delegates iun the
@@ -121,4 +186,31 @@ def mean_final_delegates(results, num_sims, candidates):
 
     plt.pie(delegates, labels=names, autopct = '%1.1f%%')
     plt.title("Mean Percentage of Delegates Won.")
+    plt.show()
+
+def polling_trends(db, start, stop, location="USA"):
+    """
+    Plots a line chart showing each candidate's polling average in a location
+    on every day in a range.
+
+    :param db:
+        The database containing the candidates and polls.
+    :param start:
+        datetime.date object of the first day.
+    :param stop:
+        datetime.date object of the last day.
+    :param location:
+        The name of the location.
+
+    """
+    averages, confidence = pp.daily_averages(db, start, stop, [location])
+    days = [start + datetime.timedelta(days=i) for i in range(len(averages))]
+    candidates = db.get_primary_candidates()
+    for i in range(len(candidates)):
+        plt.plot(days, averages[:, 0, i], label=candidates[i])
+
+    plt.legend()
+    plt.gcf().autofmt_xdate()
+    plt.ylabel("Polling average (%)")
+    plt.title("Polling Averages in {}.".format(location))
     plt.show()
\ No newline at end of file
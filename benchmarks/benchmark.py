@@ -0,0 +1,286 @@
+"""Times the main steps of the model and checks them against a baseline."""
+
+import os
+import copy
+import sys
+import json
+import timeit
+import argparse
+import tempfile
+import datetime
+import numpy
+import populate
+import database
+import collect.polls
+import collect.process_polls as pp
+import simulate.primary_simulation as ps
+import simulate.state_similarities as ss
+import simulate.sampling as sampling
+import constants as c
+
+# Define constants.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "baseline.json")
+# Fractional slowdown compared to the baseline counted as a regression.
+REGRESSION_THRESHOLD = 0.2
+REPEATS = 5
+# The date the polls in collect.polls were most recent on. Benchmark polls
+# are moved forward so they are as old, compared to today, as they were then.
+POLL_DATE = datetime.date(2019, 11, 2)
+
+def make_polls(db, copies=1):
+    """
+    Copies the polls in a database with their dates moved forward so that the
+    newest is from today, so they are not ignored as out of date.
+
+    :param db:
+        The database containing the polls.
+    :param copies:
+        The number of copies of each poll to make.
+    :return polls:
+        A list of new Poll objects.
+
+    """
+    shift = datetime.date.today() - POLL_DATE
+    polls = []
+    for repeat in range(copies):
+        for poll in db.get_polls():
+            polls.append(database.Poll(poll.question, poll.get_location(),
+                                       poll.get_weight(), poll.get_result(),
+                                       poll.get_date() + shift))
+    return polls
+
+def make_database():
+    """
+    Creates the full database, with polling averages from date-shifted polls.
+
+    :return db:
+        The populated database.
+
+    """
+    db = populate.populate()
+    db.polls = make_polls(db)
+    db = pp.attach_primary_polls_to_states(db)
+    db = ss.save_state_similarities(db)
+    return db
+
+def setup_populate(db, size):
+    """Times populate.populate, which has one size."""
+    return populate.populate
+
+def setup_load_polls(db, size):
+    """Times loading a poll file of size polls into a new database."""
+    # The directory is deleted once the benchmark no longer refers to it.
+    directory = tempfile.TemporaryDirectory()
+    polls = make_polls(db, size//len(db.get_polls()) + 1)[:size]
+    collect.polls.write_polls(os.path.join(directory.name, "polls.csv"), polls)
+
+    def run():
+        poll_db = database.Database(states={}, primary_calendar=[], polls=[])
+        path = os.path.join(directory.name, "polls.csv")
+        collect.polls.add_to_database(poll_db, path)
+    return run
+
+def setup_attach_polls(db, size):
+    """Times averaging polls, with size copies of every poll."""
+    # Copy the states, as their polling averages are replaced.
+    states = {}
+    for state_name in db.get_states_dict():
+        states[state_name] = copy.copy(db.get_state(state_name))
+    polls = make_polls(db, size)
+    poll_db = database.Database(states=states,
+                                primary_calendar=db.get_primary_calendar(),
+                                primary_candidates=db.get_primary_candidates(),
+                                nat_primary_environment={}, polls=polls)
+
+    def run():
+        # Empty the cache, so the averages are found again on every call.
+        pp.average_cache.clear()
+        pp.attach_primary_polls_to_states(poll_db)
+    return run
+
+def setup_state_similarities(db, size):
+    """Times finding state similarities for the first size states."""
+    states = {}
+    for state_name in list(db.get_states_dict())[:size]:
+        states[state_name] = db.get_state(state_name)
+    sims_db = database.Database(states=states, primary_calendar=[],
+                                primary_candidates=[],
+                                nat_primary_environment={}, polls=[])
+    return lambda: ss.save_state_similarities(sims_db)
+
+def setup_raw_primary_result(db, size):
+    """Times a state's raw result, with size candidates in the race."""
+    candidates = db.get_primary_candidates()[:size]
+    state = db.get_state(c.S_IOWA)
+    nat_environment = db.get_nat_primary_environment().copy()
+    rng = numpy.random.default_rng(0)
+    return lambda: state.get_raw_primary_result(
+        nat_environment, db.get_nat_primary_environment(), candidates, db,
+        rng)
+
+def setup_distribute_delegates(db, size):
+    """Times distributing a state's delegates between size candidates."""
+    candidates = db.get_primary_candidates()[:size]
+    result = db.get_nat_primary_environment().take(candidates)
+    result.normalize()
+    state = db.get_state(c.S_CALIFORNIA)
+    return lambda: state.distribute_delegates(result)
+
+def setup_simulate(db, size):
+    """Times size full runs of ps.simulate."""
+    snapshot = database.ModelSnapshot(db)
+    base_nat_environment = snapshot.get_nat_primary_environment()
+    candidates = snapshot.get_primary_candidates()
+    primary_calendar = snapshot.get_primary_calendar()
+    rng = sampling.BlockSampler(sampling.make_generator(0))
+
+    def run():
+        for simulation in range(size):
+            ps.simulate(snapshot.new_run(), base_nat_environment, candidates,
+                        primary_calendar, rng)
+    return run
+
+# Each benchmark's name, the function setting it up, and the sizes to run it
+# at.
+BENCHMARKS = [
+    ("populate", setup_populate, [1]),
+    ("load_polls", setup_load_polls, [1000, 100000]),
+    ("attach_primary_polls_to_states", setup_attach_polls, [1, 10, 100]),
+    ("save_state_similarities", setup_state_similarities, [10, 30, 62]),
+    ("get_raw_primary_result", setup_raw_primary_result, [5, 10, 17]),
+    ("distribute_delegates", setup_distribute_delegates, [5, 10, 17]),
+    ("simulate", setup_simulate, [1, 10, 100]),
+]
+
+def run_benchmarks(name_filter=None, repeats=REPEATS):
+    """
+    Runs the benchmarks, timing each at each of its sizes.
+
+    :param name_filter:
+        String which benchmark names must contain to be run, or None to run
+        every benchmark.
+    :param repeats:
+        The number of times to time each benchmark. The fastest is kept.
+    :return timings:
+        Dict keying "name[size]" to the fastest time per call in seconds.
+
+    """
+    db = make_database()
+    timings = {}
+    for name, setup, sizes in BENCHMARKS:
+        if name_filter is not None and name_filter not in name:
+            continue
+        for size in sizes:
+            # Call quick functions many times per measurement, as timeit does,
+            # so the timings are not swamped by noise.
+            timer = timeit.Timer(setup(db, size))
+            number, total_time = timer.autorange()
+            best = min(timer.repeat(repeats, number))
+            timings["{}[{}]".format(name, size)] = best/number
+    return timings
+
+def compare_to_baseline(timings, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Finds the benchmarks which are slower than their baseline.
+
+    :param timings:
+        Dict keying benchmark names to times in seconds.
+    :param baseline:
+        Dict keying benchmark names to baseline times in seconds.
+    :param threshold:
+        The fractional slowdown counted as a regression.
+    :return regressions:
+        Dict keying the names of regressed benchmarks to the ratio of their
+        time to the baseline time.
+
+    """
+    regressions = {}
+    for name in timings:
+        if name in baseline and baseline[name] > 0:
+            ratio = timings[name]/baseline[name]
+            if ratio > 1 + threshold:
+                regressions[name] = ratio
+    return regressions
+
+def print_table(timings, baseline):
+    """
+    Prints each benchmark's time, and its change compared to the baseline.
+
+    :param timings:
+        Dict keying benchmark names to times in seconds.
+    :param baseline:
+        Dict keying benchmark names to baseline times in seconds.
+
+    """
+    print("{:<40} {:>12} {:>12} {:>8}".format("Benchmark", "Time (ms)",
+                                              "Baseline", "Ratio"))
+    for name in timings:
+        time_ms = "{:.3f}".format(1000*timings[name])
+        if name in baseline and baseline[name] > 0:
+            baseline_ms = "{:.3f}".format(1000*baseline[name])
+            ratio = "{:.2f}".format(timings[name]/baseline[name])
+        else:
+            baseline_ms = "-"
+            ratio = "-"
+        print("{:<40} {:>12} {:>12} {:>8}".format(name, time_ms, baseline_ms,
+                                                  ratio))
+
+def load_baseline(path):
+    """
+    Loads baseline timings from a JSON file.
+
+    :param path:
+        The path of the file.
+    :return baseline:
+        Dict keying benchmark names to times in seconds, empty if the file
+        does not exist.
+
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+def save_baseline(timings, path):
+    """
+    Saves timings to a JSON file as the new baseline.
+
+    :param timings:
+        Dict keying benchmark names to times in seconds.
+    :param path:
+        The path of the file.
+
+    """
+    with open(path, "w") as baseline_file:
+        json.dump(timings, baseline_file, indent=4, sort_keys=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--save", action="store_true",
+                        help="save the timings as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help="path of the baseline JSON file")
+    parser.add_argument("--threshold", type=float,
+                        default=REGRESSION_THRESHOLD,
+                        help="fractional slowdown counted as a regression")
+    parser.add_argument("--filter", default=None,
+                        help="only run benchmarks whose names contain this")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="number of times to time each benchmark")
+    args = parser.parse_args()
+
+    timings = run_benchmarks(args.filter, args.repeats)
+    baseline = load_baseline(args.baseline)
+    print_table(timings, baseline)
+
+    if args.save:
+        save_baseline(timings, args.baseline)
+        print("Saved baseline to {}.".format(args.baseline))
+    else:
+        regressions = compare_to_baseline(timings, baseline, args.threshold)
+        for name in regressions:
+            print("Regression: {} is {:.2f} times slower than the "
+                  "baseline.".format(name, regressions[name]))
+        if regressions != {}:
+            sys.exit(1)
\ No newline at end of file
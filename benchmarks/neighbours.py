@@ -0,0 +1,155 @@
+"""Compares inferring support from each state's nearest neighbours only with
+inferring it from every state, for accuracy and speed."""
+
+import copy
+import timeit
+import argparse
+import numpy
+import database
+import simulate.state_similarities as ss
+import benchmarks.benchmark as bm
+
+# Define constants.
+SIZES = [57, 500, 2000]
+NEIGHBOURS = [5, 10, 20]
+REPEATS = 5
+# Standard deviations of the random changes made to copies of states.
+PVI_JITTER = 3
+DEMOGRAPHIC_JITTER = 2
+
+def make_units(db, size, rng):
+    """
+    Creates a database of size units with primaries, made by copying the
+    states with primaries and changing each copy's PVI and demographics at
+    random. The first copy of each state is left unchanged.
+
+    :param db:
+        The populated database, with polling averages.
+    :param size:
+        The number of units.
+    :param rng:
+        The numpy.random.Generator to draw random changes from.
+    :return units_db:
+        A new database containing only the units.
+
+    """
+    states = [state for state in db.get_states_dict().values()
+              if state.get_date() is not None]
+    units_db = database.Database(states={})
+    units_db.set_primary_candidates(db.get_primary_candidates())
+    for i in range(size):
+        unit = copy.copy(states[i % len(states)])
+        if i >= len(states):
+            unit.name = "{} {}".format(unit.name, i//len(states))
+            unit.PVI += rng.normal(0, PVI_JITTER)
+            for name in ["pcwhite", "pcblack", "pchispanic", "pcasian",
+                         "pcnative"]:
+                value = getattr(unit, name) + rng.normal(0, DEMOGRAPHIC_JITTER)
+                setattr(unit, name, max(value, 0))
+        units_db.add_state(unit)
+    return units_db
+
+def infer_all(totals, state_names):
+    """
+    Infers support in every unit.
+
+    :param totals:
+        The ss.ComparisonTotals object.
+    :param state_names:
+        List of the names of the units.
+    :return support:
+        Array of each unit's inferred support for each candidate, with NaN
+        for units with no similar data.
+
+    """
+    support = numpy.full((len(state_names), len(totals.candidates)), numpy.nan)
+    for i in range(len(state_names)):
+        inferred_support = totals.get_inferred_support(state_names[i])
+        if inferred_support is not None:
+            support[i] = inferred_support.values
+    return support
+
+def compare(db, size, neighbours=NEIGHBOURS, repeats=REPEATS, seed=0):
+    """
+    Times inferring support in every unit, and finds the error of using only
+    each unit's nearest neighbours compared to using every unit.
+
+    :param db:
+        The populated database.
+    :param size:
+        The number of units.
+    :param neighbours:
+        List of the numbers of neighbours to try.
+    :param repeats:
+        The number of times to time each. The fastest is kept.
+    :param seed:
+        Seed for the random changes to the units.
+    :return rows:
+        List of tuples of the number of neighbours, or None for every unit,
+        the time taken in seconds to build the similarities, the time taken
+        in seconds to infer support in every unit, and the largest and mean
+        absolute error in percentage points.
+
+    """
+    units_db = make_units(db, size, numpy.random.default_rng(seed))
+    state_names = list(units_db.get_states_dict())
+    candidates = units_db.get_primary_candidates()
+    rows = []
+    expected = None
+    for num_neighbours in [None] + list(neighbours):
+        build_time = min(timeit.repeat(
+            lambda: ss.save_state_similarities(units_db, num_neighbours),
+            number=1, repeat=repeats))
+        ss.save_state_similarities(units_db, num_neighbours)
+        totals = ss.ComparisonTotals(units_db, candidates)
+        infer_time = min(timeit.repeat(lambda: infer_all(totals, state_names),
+                                       number=1, repeat=repeats))
+        support = infer_all(totals, state_names)
+        if expected is None:
+            expected = support
+
+        # Units with data in the dense case may have none among their
+        # neighbours, and are counted separately.
+        found = ~numpy.isnan(support[:, 0])
+        error = numpy.abs(support[found] - expected[found])
+        rows.append((num_neighbours, build_time, infer_time,
+                     float(error.max()) if error.size > 0 else 0.0,
+                     float(error.mean()) if error.size > 0 else 0.0,
+                     int(numpy.sum(~found & ~numpy.isnan(expected[:, 0])))))
+    return rows
+
+def print_table(size, rows):
+    """
+    Prints the results of compare.
+
+    :param size:
+        The number of units.
+    :param rows:
+        The rows returned by compare.
+
+    """
+    print("{} units".format(size))
+    print("{:>10} {:>12} {:>12} {:>10} {:>10} {:>8}".format(
+        "Neighbours", "Build (ms)", "Infer (ms)", "Max err", "Mean err",
+        "No data"))
+    for num_neighbours, build_time, infer_time, max_error, mean_error, \
+            no_data in rows:
+        print("{:>10} {:>12.3f} {:>12.3f} {:>10.4f} {:>10.4f} {:>8}".format(
+            "all" if num_neighbours is None else num_neighbours,
+            1000*build_time, 1000*infer_time, max_error, mean_error, no_data))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="numbers of units to compare")
+    parser.add_argument("--neighbours", type=int, nargs="+",
+                        default=NEIGHBOURS,
+                        help="numbers of neighbours to try")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="number of times to time each")
+    args = parser.parse_args()
+
+    db = bm.make_database()
+    for size in args.sizes:
+        print_table(size, compare(db, size, args.neighbours, args.repeats))
+        print()
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""Compares the variance of the model's results with each sampler, to show
+how many fewer simulations the variance-reducing samplers need."""
+
+import argparse
+import numpy
+import database
+import simulate.parallel_simulation as pars
+import benchmarks.benchmark as bm
+
+# Define constants.
+NUM_SIMULATIONS = 200
+REPLICATIONS = 20
+# The samplers compared by default. Importance sampling is left out, as it
+# needs a candidate to favour and its results are only meaningful weighted.
+REPORT_SAMPLERS = ["random", "antithetic", "sobol"]
+
+def replicate(snapshot, sampler, num_sims, replications, seed=0,
+              workers=None):
+    """
+    Runs the model many times with a sampler, each time with a different
+    seed.
+
+    :param snapshot:
+        The ModelSnapshot object containing the model.
+    :param sampler:
+        The name of the sampler, from sampling.SAMPLERS.
+    :param num_sims:
+        The number of simulations in each run.
+    :param replications:
+        The number of runs.
+    :param seed:
+        Seed the seed of each run is spawned from.
+    :param workers:
+        The number of processes to use, as in pars.run_simulations.
+    :return win_probabilities:
+        Array with one row per run of each candidate's probability of
+        winning a majority, followed by the probability of no majority.
+    :return mean_delegates:
+        Array with one row per run of each candidate's mean delegate count.
+
+    """
+    candidates = snapshot.get_primary_candidates()
+    win_probabilities = numpy.zeros((replications, len(candidates) + 1))
+    mean_delegates = numpy.zeros((replications, len(candidates)))
+    seeds = numpy.random.SeedSequence(seed).spawn(replications)
+    for i in range(replications):
+        summary = pars.run_simulations(snapshot, num_sims, seeds[i], workers,
+                                       sampler=sampler)
+        win_counts = numpy.append(summary.win_counts,
+                                  summary.no_majority_count)
+        win_probabilities[i] = win_counts/len(summary)
+        mean_delegates[i] = summary.delegate_sums/len(summary)
+    return win_probabilities, mean_delegates
+
+def variance_report(snapshot, num_sims=NUM_SIMULATIONS,
+                    replications=REPLICATIONS, samplers=REPORT_SAMPLERS,
+                    seed=0, workers=None):
+    """
+    Finds the variance between runs of each candidate's results with each
+    sampler.
+
+    :param snapshot:
+        The ModelSnapshot object containing the model.
+    :param num_sims:
+        The number of simulations in each run.
+    :param replications:
+        The number of runs with each sampler.
+    :param samplers:
+        List of the names of the samplers to compare.
+    :param seed:
+        Seed the seed of each run is spawned from.
+    :param workers:
+        The number of processes to use, as in pars.run_simulations.
+    :return report:
+        Dict keying each sampler to the variance between runs of each
+        candidate's probability of winning a majority, with that of no
+        majority last, and of each candidate's mean delegate count.
+
+    """
+    report = {}
+    for sampler in samplers:
+        win_probabilities, mean_delegates = replicate(
+            snapshot, sampler, num_sims, replications, seed, workers)
+        report[sampler] = (win_probabilities.var(axis=0, ddof=1),
+                           mean_delegates.var(axis=0, ddof=1))
+    return report
+
+def get_reductions(report, baseline="random"):
+    """
+    Finds how many times smaller each sampler's variances are than the
+    baseline's, which is how many times fewer simulations it needs for the
+    same precision.
+
+    :param report:
+        Dict returned by variance_report.
+    :param baseline:
+        The sampler to compare to.
+    :return reductions:
+        Dict keying each sampler to arrays of the ratio of the baseline
+        variance to its variance, which is NaN where both are zero.
+
+    """
+    reductions = {}
+    for sampler in report:
+        ratios = []
+        for variance, baseline_variance in zip(report[sampler],
+                                               report[baseline]):
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                ratios.append(baseline_variance/variance)
+        reductions[sampler] = tuple(ratios)
+    return reductions
+
+def print_report(candidates, report):
+    """
+    Prints the standard deviation of each candidate's results with each
+    sampler, and the variance reduction compared to random sampling.
+
+    :param candidates:
+        List of candidates in the race.
+    :param report:
+        Dict returned by variance_report, including "random".
+
+    """
+    reductions = get_reductions(report)
+    names = list(candidates) + ["No majority"]
+    titles = ["Probability of winning a majority", "Mean delegates"]
+    for k in range(len(titles)):
+        print(titles[k])
+        print("{:<16}".format("Candidate") +
+              "".join("{:>24}".format(sampler) for sampler in report))
+        for j in range(len(report["random"][k])):
+            line = "{:<16}".format(names[j])
+            for sampler in report:
+                line += "{:>14.4g} ({:>6.2f}x)".format(
+                    numpy.sqrt(report[sampler][k][j]),
+                    reductions[sampler][k][j])
+            print(line)
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sims", type=int, default=NUM_SIMULATIONS,
+                        help="number of simulations in each run")
+    parser.add_argument("--replications", type=int, default=REPLICATIONS,
+                        help="number of runs with each sampler")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes to use")
+    args = parser.parse_args()
+
+    snapshot = database.ModelSnapshot(bm.make_database())
+    print_report(snapshot.get_primary_candidates(),
+                 variance_report(snapshot, args.sims, args.replications,
+                                 workers=args.workers))
\ No newline at end of file
@@ -1,248 +1,235 @@
-"""Adds Poll objects to the database. These polls start from October 2019."""
+"""Loads Poll objects from poll files and adds them to the database."""
 
-import sys
-import database
+import os
+import csv
+import json
 import datetime
+import itertools
+import database
 import constants as c
 
+# Define constants.
+POLLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "polls.csv")
+# Number of polls read from a file before they are added to the database.
+CHUNK_SIZE = 10000
+# The columns of a CSV poll file before the column of each candidate.
+CSV_COLUMNS = ["question", "location", "weight", "date"]
+# Prefixes of the constants which poll files can refer to.
+NAME_PREFIXES = ["C_", "S_", "Q_"]
 
-def add_to_database(db):
+
+def add_to_database(db, path=POLLS_PATH, chunk_size=CHUNK_SIZE):
     """
-    Adds polls starting from late October 2019 to the database.
+    Adds the polls in a poll file, by default those starting from late
+    October 2019, to the database.
 
     :param db:
         The database to add the polls to.
+    :param path:
+        The path of a CSV or JSONL poll file, as described in read_polls.
+    :param chunk_size:
+        The number of polls read before they are added to the database.
     :return db:
         The database with the polls added.
-    
+
+    """
+    for polls in read_polls(path, chunk_size):
+        db.add_polls(polls)
+
+    return db
+
+def read_polls(path, chunk_size=CHUNK_SIZE):
+    """
+    Reads the polls in a poll file a chunk at a time.
+
+    A CSV file has a header row starting with the columns in CSV_COLUMNS,
+    followed by one column per candidate giving their share of the vote. A
+    candidate left blank was not included in the poll. A JSONL file has one
+    JSON object per line, with the keys in CSV_COLUMNS and a "result" key
+    holding an object of candidates' shares of the vote. Dates are written
+    as YYYY-MM-DD, and names either as the values of the constants, such as
+    "Biden", or as their identifiers, such as "C_BIDEN".
+
+    :param path:
+        The path of the file. Files ending in ".jsonl" are read as JSONL and
+        all others as CSV.
+    :param chunk_size:
+        The largest number of polls in each chunk.
+    :return chunks:
+        Generator yielding lists of Poll objects in the order of the file.
+
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive.")
+    names = get_names()
+    with open(path, newline="") as poll_file:
+        if path.endswith(".jsonl"):
+            polls = parse_jsonl(poll_file, names)
+        else:
+            polls = parse_csv(poll_file, names)
+        while True:
+            chunk = list(itertools.islice(polls, chunk_size))
+            if chunk == []:
+                break
+            yield chunk
+
+def write_polls(path, polls):
+    """
+    Writes polls to a CSV poll file which read_polls can read.
+
+    :param path:
+        The path of the file, which is overwritten.
+    :param polls:
+        List of Poll objects.
+
+    """
+    # Give each candidate in any of the polls a column.
+    candidates = []
+    for poll in polls:
+        for candidate in poll.get_result():
+            if candidate not in candidates:
+                candidates.append(candidate)
+
+    with open(path, "w", newline="") as poll_file:
+        writer = csv.writer(poll_file, lineterminator="\n")
+        writer.writerow(CSV_COLUMNS + candidates)
+        for poll in polls:
+            result = poll.get_result()
+            writer.writerow([poll.question, poll.get_location(),
+                             poll.get_weight(), poll.get_date().isoformat()] +
+                            [result.get(candidate, "")
+                             for candidate in candidates])
+
+def parse_csv(poll_file, names):
+    """
+    Parses the rows of a CSV poll file.
+
+    :param poll_file:
+        The open file.
+    :param names:
+        Dict keying the names allowed in the file to the constants they refer
+        to, as returned by get_names.
+    :return polls:
+        Generator yielding a Poll object for each row.
+
+    """
+    reader = csv.reader(poll_file)
+    header = next(reader, None)
+    if header is None or header[:len(CSV_COLUMNS)] != CSV_COLUMNS:
+        raise ValueError("Poll file must start with the columns {}.".format(
+            ", ".join(CSV_COLUMNS)))
+    candidates = [look_up(names, name) for name in header[len(CSV_COLUMNS):]]
+    first = len(CSV_COLUMNS)
+
+    # Poll files repeat the same few numbers and dates many times, so each is
+    # only converted once.
+    numbers = ConversionCache(float)
+    dates = ConversionCache(datetime.date.fromisoformat)
+    get_number = numbers.__getitem__
+
+    for row in reader:
+        if row == []:
+            continue
+        if len(row) != len(header):
+            raise ValueError("Poll file row has {} columns, not {}.".format(
+                len(row), len(header)))
+
+        # Leave out the candidates who were not included in the poll.
+        values = row[first:]
+        if "" in values:
+            result = {}
+            for candidate, value in zip(candidates, values):
+                if value != "":
+                    result[candidate] = get_number(value)
+        else:
+            result = dict(zip(candidates, map(get_number, values)))
+
+        yield database.Poll(look_up(names, row[0]), look_up(names, row[1]),
+                            get_number(row[2]), result, dates[row[3]])
+
+def parse_jsonl(poll_file, names):
+    """
+    Parses the lines of a JSONL poll file.
+
+    :param poll_file:
+        The open file.
+    :param names:
+        Dict keying the names allowed in the file to the constants they refer
+        to, as returned by get_names.
+    :return polls:
+        Generator yielding a Poll object for each line.
+
+    """
+    for line in poll_file:
+        if line.strip() == "":
+            continue
+        record = json.loads(line)
+        result = {}
+        for name, value in record["result"].items():
+            result[look_up(names, name)] = float(value)
+        yield database.Poll(look_up(names, record["question"]),
+                            look_up(names, record["location"]),
+                            float(record["weight"]), result,
+                            datetime.date.fromisoformat(record["date"]))
+
+class ConversionCache(dict):
+    """Dict converting strings on first use, then remembering the result."""
+    def __init__(self, convert):
+        """
+        Creates an empty cache.
+
+        :param convert:
+            Function converting a string to its value.
+
+        """
+        self.convert = convert
+
+    def __missing__(self, text):
+        """
+        Converts a string which has not been seen before.
+
+        :param text:
+            The string.
+        :return value:
+            The converted value.
+
+        """
+        value = self.convert(text)
+        self[text] = value
+        return value
+
+def get_names():
+    """
+    Finds the names poll files can use for candidates, locations and
+    questions.
+
+    :return names:
+        Dict keying both the value and the identifier of each constant with a
+        prefix in NAME_PREFIXES to its value.
+
+    """
+    names = {}
+    for identifier in dir(c):
+        if identifier[:2] in NAME_PREFIXES:
+            value = getattr(c, identifier)
+            names[identifier] = value
+            names[value] = value
+    return names
+
+def look_up(names, name):
+    """
+    Converts a name in a poll file to the constant it refers to.
+
+    :param names:
+        Dict returned by get_names.
+    :param name:
+        The name in the file.
+    :return value:
+        The value of the constant.
+
     """
-    polls = [
-        database.Poll(c.Q_PRIMARY, c.S_USA, 7.12, {c.C_BIDEN:25, c.C_WARREN:24,
-            c.C_SANDERS:15, c.C_BUTTIGIEG:8, c.C_HARRIS:5, c.C_YANG:3,
-            c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:1, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:2, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 19)),
-
-        database.Poll(c.Q_PRIMARY, c.S_IOWA, 6.88, {c.C_BIDEN:20,
-            c.C_WARREN:23, c.C_SANDERS:16, c.C_BUTTIGIEG:13, c.C_HARRIS:4,
-            c.C_YANG:2, c.C_OROURKE:1, c.C_BENNET:1, c.C_GABBARD:2,
-            c.C_BOOKER:3, c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:2,
-            c.C_DELANEY:1, c.C_MESSAM:0, c.C_BULLOCK:1, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 19)),
-
-        database.Poll(c.Q_PRIMARY, c.S_NEW_HAMPSHIRE, 7.34, {c.C_BIDEN:23,
-            c.C_WARREN:27, c.C_SANDERS:17, c.C_BUTTIGIEG:10, c.C_HARRIS:5,
-            c.C_YANG:3, c.C_OROURKE:1, c.C_BENNET:0, c.C_GABBARD:2,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:2, c.C_CASTRO:0, c.C_STEYER:2,
-            c.C_DELANEY:1, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 19)),
-
-        database.Poll(c.Q_PRIMARY, c.S_NEVADA, 7.01, {c.C_BIDEN:22,
-            c.C_WARREN:20, c.C_SANDERS:19, c.C_BUTTIGIEG:5, c.C_HARRIS:5,
-            c.C_YANG:3, c.C_OROURKE:1, c.C_BENNET:0, c.C_GABBARD:1,
-            c.C_BOOKER:2, c.C_KLOBUCHAR:1, c.C_CASTRO:1, c.C_STEYER:4,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:1}, datetime.date(2019, 10, 19)),
-
-        database.Poll(c.Q_PRIMARY, c.S_SOUTH_CAROLINA, 6.65, {c.C_BIDEN:39,
-            c.C_WARREN:14, c.C_SANDERS:11, c.C_BUTTIGIEG:3, c.C_HARRIS:6,
-            c.C_YANG:2, c.C_OROURKE:1, c.C_BENNET:1, c.C_GABBARD:1,
-            c.C_BOOKER:4, c.C_KLOBUCHAR:1, c.C_CASTRO:1, c.C_STEYER:4,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:1}, datetime.date(2019, 10, 19)),
-
-        database.Poll(c.Q_PRIMARY, c.S_CALIFORNIA, 7.20, {c.C_BIDEN:23,
-            c.C_WARREN:22, c.C_SANDERS:21, c.C_BUTTIGIEG:5, c.C_HARRIS:10,
-            c.C_YANG:5, c.C_OROURKE:3, c.C_BENNET:10, c.C_GABBARD:2,
-            c.C_BOOKER:2, c.C_KLOBUCHAR:1, c.C_CASTRO:2, c.C_STEYER:1,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 19)),
-                                                        
-        database.Poll(c.Q_PRIMARY, c.S_TEXAS, 5.99, {c.C_BIDEN:27,
-            c.C_WARREN:16, c.C_SANDERS:13, c.C_BUTTIGIEG:4, c.C_HARRIS:7,
-            c.C_YANG:2, c.C_OROURKE:17, c.C_BENNET:0, c.C_GABBARD:1,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:2, c.C_CASTRO:3, c.C_STEYER:0,
-            c.C_DELANEY:1, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:1}, datetime.date(2019, 10, 19)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 2.69, {c.C_BIDEN:19, c.C_WARREN:12,
-            c.C_SANDERS:17, c.C_BUTTIGIEG:3, c.C_HARRIS:4, c.C_YANG:3,
-            c.C_OROURKE:3, c.C_BENNET:0, c.C_GABBARD:1, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:1, c.C_CASTRO:1, c.C_STEYER:0, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 10, 20)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 2.14, {c.C_BIDEN:32, c.C_WARREN:22,
-            c.C_SANDERS:17, c.C_BUTTIGIEG:5, c.C_HARRIS:7, c.C_YANG:2,
-            c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:1, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 20)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 3.51, {c.C_BIDEN:30, c.C_WARREN:21,
-            c.C_SANDERS:18, c.C_BUTTIGIEG:6, c.C_HARRIS:6, c.C_YANG:3,
-            c.C_OROURKE:3, c.C_BENNET:1, c.C_GABBARD:1, c.C_BOOKER:3,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:1,
-            c.C_MESSAM:0, c.C_BULLOCK:1, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 10, 20)),
-
-        database.Poll(c.Q_PRIMARY, c.S_CALIFORNIA, 1.11, {c.C_BIDEN:33,
-            c.C_WARREN:18, c.C_SANDERS:17, c.C_BUTTIGIEG:4, c.C_HARRIS:8,
-            c.C_YANG:4, c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:1,
-            c.C_BOOKER:2, c.C_KLOBUCHAR:1, c.C_CASTRO:1, c.C_STEYER:1,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 21)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 0.86, {c.C_BIDEN:27, c.C_WARREN:21,
-            c.C_SANDERS:25, c.C_BUTTIGIEG:6, c.C_HARRIS:5, c.C_YANG:4,
-            c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:3, c.C_BOOKER:3,
-            c.C_KLOBUCHAR:1, c.C_CASTRO:0, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 21)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 0.88, {c.C_BIDEN:27, c.C_WARREN:19,
-            c.C_SANDERS:14, c.C_BUTTIGIEG:6, c.C_HARRIS:5, c.C_YANG:2,
-            c.C_OROURKE:3, c.C_BENNET:1, c.C_GABBARD:0, c.C_BOOKER:1,
-            c.C_KLOBUCHAR:1, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:1, c.C_BULLOCK:0, c.C_SESTAK:1, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 21)),
-
-        database.Poll(c.Q_PRIMARY, c.S_MICHIGAN, 0.43, {c.C_BIDEN:27,
-            c.C_WARREN:23, c.C_SANDERS:12, c.C_BUTTIGIEG:4, c.C_HARRIS:4,
-            c.C_YANG:1, c.C_OROURKE:1, c.C_BENNET:2, c.C_GABBARD:1,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:1, c.C_CASTRO:0, c.C_STEYER:0,
-            c.C_DELANEY:1, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 22)),
-
-        database.Poll(c.Q_PRIMARY, c.S_WISCONSIN, 0.76, {c.C_BIDEN:31,
-            c.C_WARREN:24, c.C_SANDERS:17, c.C_BUTTIGIEG:7, c.C_HARRIS:5,
-            c.C_YANG:3, c.C_OROURKE:0, c.C_BENNET:0, c.C_GABBARD:2,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:0, c.C_CASTRO:0, c.C_STEYER:0,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 22)),
-
-        database.Poll(c.Q_PRIMARY, c.S_MASSACHUSETTS, 0.91, {c.C_BIDEN:18,
-            c.C_WARREN:33, c.C_SANDERS:13, c.C_BUTTIGIEG:7, c.C_HARRIS:3,
-            c.C_YANG:1, c.C_OROURKE:0, c.C_BENNET:0, c.C_GABBARD:2,
-            c.C_BOOKER:0, c.C_KLOBUCHAR:1, c.C_CASTRO:0, c.C_STEYER:1,
-            c.C_DELANEY:1, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 22)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 0.64, {c.C_BIDEN:34, c.C_WARREN:19,
-            c.C_SANDERS:16, c.C_BUTTIGIEG:6, c.C_HARRIS:6, c.C_YANG:2,
-            c.C_OROURKE:3, c.C_BENNET:1, c.C_GABBARD:1, c.C_BOOKER:1,
-            c.C_KLOBUCHAR:3, c.C_CASTRO:0, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 22)),
-
-        database.Poll(c.Q_PRIMARY, c.S_SOUTH_CAROLINA, 0.80, {c.C_BIDEN:33,
-            c.C_WARREN:16, c.C_SANDERS:12, c.C_BUTTIGIEG:3, c.C_HARRIS:6,
-            c.C_YANG:2, c.C_OROURKE:1, c.C_BENNET:0, c.C_GABBARD:1,
-            c.C_BOOKER:2, c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:4,
-            c.C_DELANEY:1, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 22)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 1.26, {c.C_BIDEN:24, c.C_WARREN:21,
-            c.C_SANDERS:15, c.C_BUTTIGIEG:8, c.C_HARRIS:5, c.C_YANG:3,
-            c.C_OROURKE:2, c.C_BENNET:1, c.C_GABBARD:3, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:1, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 10, 22)),
-
-        database.Poll(c.Q_PRIMARY, c.S_CALIFORNIA, 3.26, {c.C_BIDEN:19,
-            c.C_WARREN:28, c.C_SANDERS:24, c.C_BUTTIGIEG:9, c.C_HARRIS:8,
-            c.C_YANG:3, c.C_OROURKE:1, c.C_BENNET:0, c.C_GABBARD:2,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:2, c.C_CASTRO:0, c.C_STEYER:1,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 23)),
-
-        database.Poll(c.Q_PRIMARY, c.S_SOUTH_CAROLINA, 1.46, {c.C_BIDEN:30,
-            c.C_WARREN:19, c.C_SANDERS:13, c.C_BUTTIGIEG:9, c.C_HARRIS:11,
-            c.C_YANG:4, c.C_OROURKE:1, c.C_BENNET:1, c.C_GABBARD:3,
-            c.C_BOOKER:3, c.C_KLOBUCHAR:3, c.C_CASTRO:1, c.C_STEYER:5,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 23)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 1.06, {c.C_BIDEN:21, c.C_WARREN:28,
-            c.C_SANDERS:15, c.C_BUTTIGIEG:10, c.C_HARRIS:5, c.C_YANG:1,
-            c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:3, c.C_BOOKER:1,
-            c.C_KLOBUCHAR:3, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 23)),
-
-        database.Poll(c.Q_PRIMARY, c.S_IOWA, 1.20, {c.C_BIDEN:12,
-            c.C_WARREN:28, c.C_SANDERS:18, c.C_BUTTIGIEG:20, c.C_HARRIS:3,
-            c.C_YANG:2, c.C_OROURKE:1, c.C_BENNET:1, c.C_GABBARD:2,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:4, c.C_CASTRO:0, c.C_STEYER:3,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 23)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 0.92, {c.C_BIDEN:28, c.C_WARREN:16,
-            c.C_SANDERS:18, c.C_BUTTIGIEG:3, c.C_HARRIS:6, c.C_YANG:6,
-            c.C_OROURKE:3, c.C_BENNET:0, c.C_GABBARD:2, c.C_BOOKER:3,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:0, c.C_DELANEY:1,
-            c.C_MESSAM:0, c.C_BULLOCK:1, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 10, 24)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 3.49, {c.C_BIDEN:32, c.C_WARREN:20,
-            c.C_SANDERS:20, c.C_BUTTIGIEG:7, c.C_HARRIS:6, c.C_YANG:3,
-            c.C_OROURKE:2, c.C_BENNET:1, c.C_GABBARD:2, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:1,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 10, 27)),
-        
-        database.Poll(c.Q_PRIMARY, c.S_NEW_HAMPSHIRE, 1.05, {c.C_BIDEN:15,
-            c.C_WARREN:18, c.C_SANDERS:21, c.C_BUTTIGIEG:10, c.C_HARRIS:3,
-            c.C_YANG:5, c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:5,
-            c.C_BOOKER:2, c.C_KLOBUCHAR:5, c.C_CASTRO:0, c.C_STEYER:3,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:1,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 28)),
-
-        database.Poll(c.Q_PRIMARY, c.S_ARIZONA, 0.68, {c.C_BIDEN:28,
-            c.C_WARREN:21, c.C_SANDERS:21, c.C_BUTTIGIEG:12, c.C_HARRIS:4,
-            c.C_YANG:5, c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:2,
-            c.C_BOOKER:0, c.C_KLOBUCHAR:2, c.C_CASTRO:0, c.C_STEYER:0,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:1,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 28)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 0.80, {c.C_BIDEN:26, c.C_WARREN:17,
-            c.C_SANDERS:13, c.C_BUTTIGIEG:10, c.C_HARRIS:3, c.C_YANG:3,
-            c.C_OROURKE:0, c.C_BENNET:0, c.C_GABBARD:4, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:0, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 10, 30)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 1.26, {c.C_BIDEN:27, c.C_WARREN:23,
-            c.C_SANDERS:14, c.C_BUTTIGIEG:8, c.C_HARRIS:4, c.C_YANG:3,
-            c.C_OROURKE:4, c.C_BENNET:1, c.C_GABBARD:2, c.C_BOOKER:1,
-            c.C_KLOBUCHAR:2, c.C_CASTRO:1, c.C_STEYER:1, c.C_DELANEY:1,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 10, 30)),
-
-        database.Poll(c.Q_PRIMARY, c.S_PENNSYLVANIA, 0.34, {c.C_BIDEN:30,
-            c.C_WARREN:18, c.C_SANDERS:12, c.C_BUTTIGIEG:8, c.C_HARRIS:1,
-            c.C_YANG:1, c.C_OROURKE:2, c.C_BENNET:2, c.C_GABBARD:2,
-            c.C_BOOKER:1, c.C_KLOBUCHAR:2, c.C_CASTRO:0, c.C_STEYER:0,
-            c.C_DELANEY:0, c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0,
-            c.C_WILLIAMSON:0}, datetime.date(2019, 10, 31)),
-
-        database.Poll(c.Q_PRIMARY, c.S_IOWA, 0.88, {c.C_BIDEN:17,
-            c.C_WARREN:22, c.C_SANDERS:19, c.C_BUTTIGIEG:18, c.C_HARRIS:3,
-            c.C_YANG:3, c.C_BENNET:0, c.C_GABBARD:2, c.C_BOOKER:2,
-            c.C_KLOBUCHAR:4, c.C_CASTRO:0, c.C_STEYER:2, c.C_DELANEY:1,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:0},
-            datetime.date(2019, 11, 1)),
-
-        database.Poll(c.Q_PRIMARY, c.S_USA, 0.96, {c.C_BIDEN:33, c.C_WARREN:15,
-            c.C_SANDERS:18, c.C_BUTTIGIEG:4, c.C_HARRIS:5, c.C_YANG:2,
-            c.C_OROURKE:2, c.C_BENNET:0, c.C_GABBARD:2, c.C_BOOKER:3,
-            c.C_KLOBUCHAR:3, c.C_CASTRO:0, c.C_STEYER:1, c.C_DELANEY:0,
-            c.C_MESSAM:0, c.C_BULLOCK:0, c.C_SESTAK:0, c.C_WILLIAMSON:1},
-            datetime.date(2019, 11, 1)),
-
-        ]
-
-    db.add_polls(polls)
-
-    return db
\ No newline at end of file
+    try:
+        return names[name]
+    except KeyError:
+        raise ValueError("Unknown name in poll file: {}".format(name))
\ No newline at end of file
@@ -1,13 +1,17 @@
 """Processes raw polling data to produce useful information."""
 
-import math
+import numpy
+import bisect
 import datetime
+import collections
 import database
 import sys
 
 # User-defined variables.
 POLL_USEFULNESS_DURATION = 50
 HIGH_TOTAL_WEIGHT = 10
+# Number of polling averages kept in average_cache.
+AVERAGE_CACHE_SIZE = 4096
 
 def attach_primary_polls_to_states(db):
     """
@@ -15,58 +19,103 @@ def attach_primary_polls_to_states(db):
     useful information and add that to the state object.
 
     :param db:
-        The database containing the state and poll objects.
+        The database containing the state and poll objects. The averages are
+        found as of the database's as-of date, only using polls finished on
+        or before it.
     :param db:
         The database with the polling averages attached to state objects.
     
     """
-    # Setup lists for each state to contain the polls.
-    states = db.get_states_dict()
-    sorted_polls = {"USA": []}
-    for state_name in states:
-        sorted_polls[state_name] = []
+    locations = ["USA"] + list(db.get_states_dict())
+    averages = find_averages(db.get_poll_index(), locations,
+                             db.get_primary_candidates(), db.get_as_of_date())
 
-    # Sort through the polls, adding them to the lists in the sorted_polls dict
-    # as appropriate.
-    polls = db.get_polls()
-    for poll in polls:
-        sorted_polls[poll.get_location()].append(poll)
-
-    # For each location, add the confidence level and weighted average to the
-    # database, after adjusting the weights to take into account how old the
-    # polls are.
-    today = datetime.date.today()
-    for location in sorted_polls:
-        dated_polls = date_polls(sorted_polls[location], today)
-        average = weighted_average(dated_polls, db)
-
-        # If no polls were available, use a dict of candidates with 0 support
-        # and confidence 0.
-        if average == {"confidence":0}:
-            average = zero_support_dict(db)
- 
+    # Add copies of the averages to the database, so that the cached averages
+    # are never changed.
+    for location in locations:
         if location == "USA":
-            db.nat_primary_environment = average
+            db.nat_primary_environment = averages[location].copy()
         else:
-            db.states[location].primary_polling = average
+            db.states[location].primary_polling = averages[location].copy()
 
     return db
 
+def find_averages(poll_index, locations, candidates, today):
+    """
+    Finds the polling averages of some locations, using only the polls
+    finished on or before today.
+
+    :param poll_index:
+        The PollIndex object containing the polls.
+    :param locations:
+        List of the locations to average.
+    :param candidates:
+        List of candidates to find the averages of.
+    :param today:
+        datetime.date object giving the day to find the averages on.
+    :return averages:
+        Dict keying each location to a frozen CandidateVector of its average,
+        which may be shared with later calls.
+
+    """
+    # Find the polls recent enough to be useful in the index of polls.
+    candidates = tuple(candidates)
+    start = today - datetime.timedelta(days=POLL_USEFULNESS_DURATION - 1)
+
+    # Reuse any averages already found from these polls today. For the other
+    # locations, collect the rows of their recent polls, weighted to take
+    # into account how old the polls are.
+    averages = {}
+    uncached = []
+    results = []
+    missing = []
+    weights = []
+    location_codes = []
+    for location in locations:
+        key = (location, today, poll_index.version, candidates)
+        averages[location] = average_cache.get(key)
+        if averages[location] is not None:
+            continue
+        matrix = poll_index.get_matrix(location, candidates)
+        rows = matrix.get_rows(start, today)
+        results.append(matrix.results[rows])
+        missing.append(matrix.missing[rows])
+        weights.append(decay_weights(matrix.weights[rows], matrix.dates[rows],
+                                     today))
+        location_codes.append(numpy.full(len(matrix.polls[rows]),
+                                         len(uncached)))
+        uncached.append(location)
+
+    # Average the other locations' polls at once, and cache the averages.
+    if uncached != []:
+        sums, confidence = weighted_averages(
+            numpy.concatenate(results), numpy.concatenate(missing),
+            numpy.concatenate(weights), numpy.concatenate(location_codes),
+            len(uncached))
+        template = database.CandidateVector(candidates)
+        for code in range(len(uncached)):
+            average = database.CandidateVector(template.candidates,
+                                               sums[code], confidence[code],
+                                               template.index).freeze()
+            average_cache.add((uncached[code], today, poll_index.version,
+                               candidates), average)
+            averages[uncached[code]] = average
+
+    return averages
+
 def zero_support_dict(db):
     """
-    Creates a dict keying the name of each primary candidate to zero, and
-    a confidence level to zero.
+    Creates a CandidateVector giving each primary candidate zero support, with
+    a confidence level of zero.
 
     :param db:
         The database containing the candidate names.
     :return zeroes:
-        The dict keying names to zeroes.
+        The CandidateVector of zeroes.
     
     """
     candidates = db.get_primary_candidates()
-    zeroes = {"confidence":0}
-    for candidate in candidates:
-        zeroes[candidate] = 0
+    zeroes = database.CandidateVector(candidates)
     
     return zeroes
 
@@ -75,11 +124,12 @@ def date_polls(polls, today):
     Adjusts the weight attributed to polls on the basis of how old they are.
 
     :param polls:
-        A list of poll objects.
+        A list of poll objects. They are not changed.
     :param today:
         A datetime.date object representing today's date.
     :return dated_polls:
-        The list of polls with adjusted weights.
+        A list of new poll objects, copying the polls young enough to be
+        useful with their weights adjusted.
     
     """
     if not isinstance(polls, list):
@@ -87,21 +137,56 @@ def date_polls(polls, today):
 
     dated_polls = []
     for poll in polls:
-        # Calculate how old the poll is.
-        poll_date = poll.get_date()
-        days_old = (today - poll_date)/datetime.timedelta(days=1)
-        if days_old < 0:
-            days_old = 0
-
-        # Adjust the poll's weight. Ignore it if it is too old to be useful.
-        if days_old < POLL_USEFULNESS_DURATION:
-            adjustment_factor = 1 - (days_old/POLL_USEFULNESS_DURATION)
-            new_weight = adjustment_factor*poll.get_weight()
-            poll.set_weight(new_weight)
-            dated_polls.append(poll)
+        # Ignore the poll if it is too old to be useful.
+        if (today - poll.get_date()).days >= POLL_USEFULNESS_DURATION:
+            continue
+        weight = decay_weight(poll.get_weight(), poll.get_date(), today)
+        dated_polls.append(database.Poll(poll.question, poll.get_location(),
+                                         weight, poll.get_result(),
+                                         poll.get_date()))
 
     return dated_polls
 
+def decay_weight(weight, poll_date, today):
+    """
+    Finds the weight of a poll on a date, which falls in a straight line from
+    its full weight on the day of the poll to zero after
+    POLL_USEFULNESS_DURATION days.
+
+    :param weight:
+        The poll's full weight.
+    :param poll_date:
+        A datetime.date object of the final day of the poll. Polls from after
+        today count as being from today.
+    :param today:
+        A datetime.date object representing today's date.
+    :return weight:
+        The adjusted weight, or zero if the poll is too old to be useful.
+
+    """
+    days_old = max((today - poll_date)/datetime.timedelta(days=1), 0)
+    if days_old >= POLL_USEFULNESS_DURATION:
+        return 0
+    return (1 - days_old/POLL_USEFULNESS_DURATION)*weight
+
+def decay_weights(weights, dates, today):
+    """
+    Finds the weights of many polls on a date, as in decay_weight.
+
+    :param weights:
+        Array of the polls' full weights.
+    :param dates:
+        Array of the final days of the polls as ordinals.
+    :param today:
+        A datetime.date object representing today's date.
+    :return weights:
+        A new array of the adjusted weights.
+
+    """
+    days_old = numpy.maximum(today.toordinal() - dates, 0)
+    factors = numpy.maximum(1 - days_old/POLL_USEFULNESS_DURATION, 0)
+    return factors*weights
+
 def weighted_average(polls, db):
     """
     Finds the weighted average of polls and the confidence in that average.
@@ -113,41 +198,425 @@ def weighted_average(polls, db):
         a list of candidates still in the race, which may be different to the
         candidates listed in a poll.
     :return total_support:
-        A dict containing the average result of the polls and a "confidence"
-        key with a numerical value.
+        A CandidateVector containing the average result of the polls and the
+        confidence in it. If there are no polls, every candidate has zero
+        support and the confidence is zero.
     
     """
-    total_weight = 0
-    total_support = {}
-
-    # If there are no polls, simply return a dict stating that confidence = 0.
+    # If there are no polls, simply return zeroes with confidence = 0.
     if polls == []:
-        total_support = {"confidence":0}
-        return total_support
+        return zero_support_dict(db)
 
-    # Get the list of candidates/options and set up the counters.
-    candidates = db.get_primary_candidates()
-    for candidate in candidates:
-        total_support[candidate] = 0
+    # Arrange the polls as arrays, with a row for each poll and a column for
+    # each candidate, and average them as a single location.
+    matrix = database.PollMatrix(polls, db.get_primary_candidates())
+    location_codes = numpy.zeros(len(polls), dtype=int)
+    averages, confidence = weighted_averages(matrix.results, matrix.missing,
+                                             matrix.weights, location_codes, 1)
+    total_support = database.CandidateVector(matrix.candidates, averages[0],
+                                             confidence[0])
 
-    # For each poll, add the weight and weighted results to the cumulative
-    # totals.
-    for poll in polls:
-        weight = poll.get_weight()
-        total_weight = total_weight + weight
-        result = poll.get_result()
-        for candidate in candidates:
-            total_support[candidate] = (total_support[candidate] + 
-                                        weight*result[candidate])
-
-    # Divide through by the total weight to find weighted averages.
-    assert total_weight > 0, "Polls have negative or no weight."
-    for candidate in total_support:
-        total_support[candidate] = total_support[candidate]/total_weight
-    
-    # Calculate confidence and add it to the dict.
+    return total_support
+
+def weighted_averages(results, missing, weights, location_codes,
+                      num_locations):
+    """
+    Finds the weighted average of the polls in each location, and the
+    confidence in those averages, in a single pass over the polls.
+
+    :param results:
+        Array of poll results, with a row for each poll and a column for each
+        candidate.
+    :param missing:
+        Boolean array the shape of results, true where a candidate was not
+        included in a poll. Each candidate is averaged over the polls which
+        included them.
+    :param weights:
+        Array of the weight of each poll.
+    :param location_codes:
+        Integer array of the location of each poll, from 0 to
+        num_locations - 1.
+    :param num_locations:
+        The number of locations.
+    :return averages:
+        Array of the average result of each candidate in each location, with
+        a row for each location. Candidates with no polls have zero support.
+    :return confidence:
+        Array of the confidence in each location's average, which is zero
+        for locations without polls.
+
+    """
     assert HIGH_TOTAL_WEIGHT > 0, "HIGH_TOTAL_WEIGHT must be > zero."
-    confidence = 1 - math.exp(-total_weight/HIGH_TOTAL_WEIGHT)
-    total_support["confidence"] = confidence
+    num_candidates = results.shape[1]
+
+    # Add up the weights and weighted results of the polls in each location.
+    included_weights = weights[:, None]*~missing
+    sums = numpy.zeros((num_locations, num_candidates))
+    candidate_weights = numpy.zeros((num_locations, num_candidates))
+    numpy.add.at(sums, location_codes, included_weights*results)
+    numpy.add.at(candidate_weights, location_codes, included_weights)
+    total_weights = numpy.bincount(location_codes, weights,
+                                   minlength=num_locations)
+    num_polls = numpy.bincount(location_codes, minlength=num_locations)
+    assert numpy.all(total_weights[num_polls > 0] > 0), \
+        "Polls have negative or no weight."
+
+    # Divide through by the total weights to find weighted averages.
+    averages = numpy.zeros((num_locations, num_candidates))
+    numpy.divide(sums, candidate_weights, out=averages,
+                 where=candidate_weights > 0)
+    confidence = 1 - numpy.exp(-total_weights/HIGH_TOTAL_WEIGHT)
+
+    return averages, confidence
+
+def daily_averages(db, start, stop, locations=None):
+    """
+    Finds the polling average and confidence of each location on every day
+    in a range, in time proportional to the number of days plus the number
+    of polls. Each day only uses the polls finished by that day, weighted by
+    their age on that day as in date_polls.
+
+    :param db:
+        The database containing the candidates and polls.
+    :param start:
+        datetime.date object of the first day.
+    :param stop:
+        datetime.date object of the last day.
+    :param locations:
+        List of the locations to find averages for. If None, the USA then
+        every state in the database.
+    :return averages:
+        Array of each candidate's average support, indexed by day, location
+        and candidate, with candidates in the order of the database's
+        candidates.
+    :return confidence:
+        Array of the confidence in each average, indexed by day and location.
+
+    """
+    if stop < start:
+        raise ValueError("The range must not end before it starts.")
+    if locations is None:
+        locations = ["USA"] + list(db.get_states_dict())
+    candidates = db.get_primary_candidates()
+    num_candidates = len(candidates)
+    width = 2*num_candidates + 1
+    num_days = (stop - start).days + 1
+
+    # Add up the terms of the polls finished on each day, starting early
+    # enough to include every poll useful on the first day. The terms are the
+    # weighted results, the weights of the candidates included and the
+    # weight, then whether each candidate was included and a count of polls.
+    first_day = start - datetime.timedelta(days=POLL_USEFULNESS_DURATION - 1)
+    num_bins = num_days + POLL_USEFULNESS_DURATION - 1
+    daily_sums = numpy.zeros((num_bins, len(locations),
+                              width + num_candidates + 1))
+    poll_index = db.get_poll_index()
+    for code in range(len(locations)):
+        matrix = poll_index.get_matrix(locations[code], candidates)
+        rows = matrix.get_rows(first_day, stop)
+        weights = matrix.weights[rows, None]
+        included = ~matrix.missing[rows]
+        terms = numpy.hstack([weights*matrix.results[rows],
+                              weights*included, weights, included,
+                              numpy.ones_like(weights)])
+        numpy.add.at(daily_sums, (matrix.dates[rows] - first_day.toordinal(),
+                                  code), terms)
+
+    # Running totals of the sums, and of the weighted sums multiplied by the
+    # day, give the totals over each day's window of useful polls.
+    day_numbers = numpy.arange(num_bins)[:, None, None]
+    totals = numpy.zeros((2, num_bins + 1) + daily_sums.shape[1:])
+    numpy.cumsum(daily_sums, axis=0, out=totals[0, 1:])
+    numpy.cumsum(day_numbers*daily_sums[:, :, :width], axis=0,
+                 out=totals[1, 1:, :, :width])
+    ends = numpy.arange(POLL_USEFULNESS_DURATION, num_bins + 1)
+    window = totals[:, ends] - totals[:, ends - POLL_USEFULNESS_DURATION]
+
+    # A poll's weight falls by 1/POLL_USEFULNESS_DURATION each day, so the
+    # weighted sums on each day follow from the two totals.
+    days_left = (POLL_USEFULNESS_DURATION - day_numbers[ends - 1])
+    decayed = ((days_left*window[0, :, :, :width] +
+                window[1, :, :, :width])/POLL_USEFULNESS_DURATION)
+    included = window[0, :, :, width:-1] > 0
+    has_polls = window[0, :, :, -1] > 0
+
+    # Divide through by the weights to find the averages, leaving zeros for
+    # candidates without polls.
+    averages = numpy.zeros((num_days, len(locations), num_candidates))
+    numpy.divide(decayed[:, :, :num_candidates],
+                 decayed[:, :, num_candidates:width - 1], out=averages,
+                 where=included)
+    total_weights = numpy.where(has_polls, decayed[:, :, -1], 0)
+    confidence = 1 - numpy.exp(-total_weights/HIGH_TOTAL_WEIGHT)
+
+    return averages, confidence
+
+class AverageCache:
+    """
+    Keeps the most recently used polling averages, keyed by the location,
+    date, version of the poll index and candidates they were found from.
+
+    """
+    def __init__(self, max_size=AVERAGE_CACHE_SIZE):
+        """
+        Creates an empty cache.
+
+        :param max_size:
+            The number of averages kept. The least recently used are dropped
+            first.
+
+        """
+        self.max_size = max_size
+        self.averages = collections.OrderedDict()
+
+    def __len__(self):
+        """Returns the number of averages in the cache."""
+        return len(self.averages)
+
+    def get(self, key):
+        """
+        Retrieves an average from the cache.
+
+        :param key:
+            Tuple of the location, date, poll index version and candidates.
+        :return average:
+            The read-only CandidateVector, or None if it is not in the cache.
+
+        """
+        average = self.averages.get(key)
+        if average is not None:
+            self.averages.move_to_end(key)
+        return average
+
+    def add(self, key, average):
+        """
+        Adds an average to the cache, dropping the least recently used average
+        if the cache is full.
+
+        :param key:
+            Tuple of the location, date, poll index version and candidates.
+        :param average:
+            The read-only CandidateVector.
+
+        """
+        self.averages[key] = average
+        self.averages.move_to_end(key)
+        while len(self.averages) > self.max_size:
+            self.averages.popitem(last=False)
+
+    def clear(self):
+        """Removes every average from the cache."""
+        self.averages.clear()
+
+# The cache shared by every call to attach_primary_polls_to_states.
+average_cache = AverageCache()
+
+class PollAverages:
+    """
+    Keeps running sums of each location's polls in date order, so that the
+    weighted average of the polls finished by any date, with older polls
+    counting for less as in find_averages, is found without going through the
+    polls again.
+
+    """
+    def __init__(self, db, today=None):
+        """
+        Initialises the sums from the polls in the database.
+
+        :param db:
+            The database containing the states, candidates and polls.
+        :param today:
+            The datetime.date object dates are measured from, to keep the
+            sums small. If None, the database's as-of date is used.
+
+        """
+        if today is None:
+            today = db.get_as_of_date()
+        self.db = db
+        self.candidates = tuple(db.get_primary_candidates())
+        self.index = database.CandidateVector(self.candidates).index
+        self.origin = today.toordinal()
+
+        # Each location is keyed to a list of its polls' dates as ordinals,
+        # and an array whose row i holds the sums over its first i polls,
+        # with spare rows so polls can be added without copying.
+        self.dates = {}
+        self.sums = {}
+        poll_index = db.get_poll_index()
+        for location in ["USA"] + list(db.get_states_dict()):
+            self.rebuild(location, poll_index)
+
+    def get_terms(self, dates, weights, results, missing):
+        """
+        Finds the terms each poll adds to the sums.
+
+        :param dates:
+            Array of the polls' dates as ordinals.
+        :param weights:
+            Array of the polls' weights.
+        :param results:
+            Array of the polls' results, with a column for each candidate.
+        :param missing:
+            Boolean array the shape of results, true where a candidate was not
+            included in a poll.
+        :return terms:
+            Array with a row for each poll. The columns hold the weighted
+            results, the weights of the candidates included, and the weight,
+            then the same multiplied by the date, then whether each candidate
+            was included.
+
+        """
+        included = ~missing
+        weighted = numpy.hstack([weights[:, None]*results,
+                                 weights[:, None]*included, weights[:, None]])
+        days = (dates - self.origin)[:, None]
+        return numpy.hstack([weighted, days*weighted, included])
+
+    def rebuild(self, location, poll_index):
+        """
+        Recalculates a location's sums from all of its polls.
+
+        :param location:
+            The name of the location.
+        :param poll_index:
+            The PollIndex object of the database's polls.
+
+        """
+        matrix = poll_index.get_matrix(location, self.candidates)
+        terms = self.get_terms(matrix.dates, matrix.weights, matrix.results,
+                               matrix.missing)
+        sums = numpy.zeros((max(2*len(matrix), 1) + 1, terms.shape[1]))
+        numpy.cumsum(terms, axis=0, out=sums[1:len(matrix) + 1])
+        self.dates[location] = matrix.dates.tolist()
+        self.sums[location] = sums
+
+    def add_polls(self, polls, today=None):
+        """
+        Adds polls to the database, updating the sums and the averages in the
+        database of the locations polled. Each poll later than any other in
+        its location takes time proportional to the number of candidates.
+
+        :param polls:
+            List of Poll objects to add.
+        :param today:
+            datetime.date object to find the new averages on. If None, the
+            database's as-of date is used.
+
+        """
+        self.db.add_polls(polls)
+        locations = []
+        rebuilds = []
+        for poll in polls:
+            location = poll.get_location()
+            if location not in self.dates:
+                continue
+            if location not in locations:
+                locations.append(location)
+            if location in rebuilds:
+                continue
+            dates = self.dates[location]
+            date = poll.get_date().toordinal()
+
+            # Polls earlier than others in the location change every later
+            # sum, so the location's sums are recalculated once every poll
+            # is in the database, which also covers its remaining new polls.
+            if dates != [] and date < dates[-1]:
+                rebuilds.append(location)
+                continue
+
+            # Otherwise, add a row to the sums, making room if needed.
+            sums = self.sums[location]
+            size = len(dates) + 1
+            if size == len(sums):
+                sums = numpy.vstack([sums, numpy.zeros_like(sums)])
+                self.sums[location] = sums
+            result = numpy.array(list(map(poll.get_result().get,
+                                          self.candidates)), dtype=float)
+            missing = numpy.isnan(result)
+            result[missing] = 0
+            terms = self.get_terms(numpy.array([date]),
+                                   numpy.array([poll.get_weight()],
+                                               dtype=float),
+                                   result[None, :], missing[None, :])
+            sums[size] = sums[size - 1] + terms[0]
+            dates.append(date)
+
+        if rebuilds != []:
+            poll_index = self.db.get_poll_index()
+            for location in rebuilds:
+                self.rebuild(location, poll_index)
+        self.update_database(today, locations)
+
+    def get_average(self, location, today=None):
+        """
+        Finds the weighted average of a location's polls on a date, in time
+        proportional to the number of candidates.
+
+        :param location:
+            The name of the location.
+        :param today:
+            datetime.date object to find the average on. Only polls finished
+            by this date are used, weighted by their age on it as in
+            find_averages. If None, the database's as-of date is used.
+        :return total_support:
+            A CandidateVector containing the average result of the polls and
+            the confidence in it, as from weighted_average.
+
+        """
+        if today is None:
+            today = self.db.get_as_of_date()
+        num_candidates = len(self.candidates)
+        width = 2*num_candidates + 1
+        dates = self.dates[location]
+        sums = self.sums[location]
+
+        # Find the polls finished by today that are young enough to be
+        # useful.
+        date = today.toordinal()
+        first = bisect.bisect_left(dates, date - POLL_USEFULNESS_DURATION + 1)
+        last = bisect.bisect_right(dates, date)
+        if first == last:
+            return database.CandidateVector(self.candidates, index=self.index)
+        past = sums[last] - sums[first]
+
+        # A poll's weight falls by 1/POLL_USEFULNESS_DURATION each day, so the
+        # sums of the past polls' weighted terms and of the terms multiplied
+        # by their dates give the total over the decayed weights.
+        days_left = POLL_USEFULNESS_DURATION - (date - self.origin)
+        totals = ((days_left*past[:width] + past[width:2*width])/
+                  POLL_USEFULNESS_DURATION)
+        candidate_weights = totals[num_candidates:2*num_candidates]
+        total_weight = totals[-1]
+        assert total_weight > 0, "Polls have negative or no weight."
+
+        # Candidates not included in any of the polls have zero support.
+        included = past[2*width:] > 0
+        averages = numpy.zeros(num_candidates)
+        numpy.divide(totals[:num_candidates], candidate_weights, out=averages,
+                     where=included)
+        confidence = 1 - numpy.exp(-total_weight/HIGH_TOTAL_WEIGHT)
+
+        return database.CandidateVector(self.candidates, averages, confidence,
+                                        self.index)
+
+    def update_database(self, today=None, locations=None):
+        """
+        Replaces the polling averages in the database with the averages on a
+        date.
+
+        :param today:
+            datetime.date object to find the averages on. If None, the
+            database's as-of date is used.
+        :param locations:
+            List of the locations to update, or None to update every
+            location.
 
-    return total_support
\ No newline at end of file
+        """
+        if locations is None:
+            locations = list(self.dates)
+        for location in locations:
+            average = self.get_average(location, today)
+            if location == "USA":
+                self.db.nat_primary_environment = average
+            else:
+                self.db.states[location].primary_polling = average
\ No newline at end of file
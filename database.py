@@ -1,14 +1,249 @@
 """Provides the API with which to access data on candidates and states."""
 
 import numpy
+import copy
+import bisect
+import itertools
+import types
 import datetime
 import simulate.voting_patterns as vp
 import simulate.state_similarities as ss
+import simulate.profiling as profiling
+
+# Define constants.
+TOTAL_PLEDGED_DELEGATES = 3769
+
+# Gives each version of each PollIndex a different number.
+poll_versions = itertools.count()
+
+class CandidateVector:
+    """
+    Stores a number for each candidate, such as a polling average or result,
+    in a fixed order of candidates, along with the confidence in the numbers.
+
+    """
+    __slots__ = ("candidates", "index", "values", "confidence")
+
+    def __init__(self, candidates, values=None, confidence=0, index=None):
+        """
+        Initialises a candidate vector.
+
+        :param candidates:
+            Tuple of candidate names giving the order of values.
+        :param values:
+            Array of the number for each candidate, zeroes if None.
+        :param confidence:
+            A value from 0 to 1 representing the quality and quantity of data
+            used to find the values.
+        :param index:
+            Dict keying candidate names to their positions, shared between
+            vectors with the same candidates. Built from candidates if None.
+
+        """
+        self.candidates = tuple(candidates)
+        if values is None:
+            self.values = numpy.zeros(len(self.candidates))
+        else:
+            self.values = numpy.array(values, dtype=float)
+        assert self.values.shape == (len(self.candidates),), \
+            "Number of values does not match the number of candidates."
+        self.confidence = confidence
+        if index is None:
+            index = {}
+            for i in range(len(self.candidates)):
+                index[self.candidates[i]] = i
+        self.index = index
+
+    @classmethod
+    def from_dict(cls, polling, candidates=None):
+        """
+        Creates a candidate vector from a dict of the form previously used for
+        polling averages and results.
+
+        :param polling:
+            Dict keying candidate names to numbers, optionally with a
+            "confidence" key.
+        :param candidates:
+            List of candidates to take from the dict, every key other than
+            "confidence" if None.
+        :return vector:
+            The new CandidateVector object.
+
+        """
+        if candidates is None:
+            candidates = [key for key in polling if key != "confidence"]
+        values = [polling[candidate] for candidate in candidates]
+        return cls(candidates, values, polling.get("confidence", 0))
+
+    def __getitem__(self, key):
+        """Retrieves a candidate's value, or the confidence."""
+        if key == "confidence":
+            return self.confidence
+        return self.values[self.index[key]]
+
+    def __setitem__(self, key, value):
+        """Sets a candidate's value, or the confidence."""
+        if key == "confidence":
+            self.confidence = value
+        else:
+            self.values[self.index[key]] = value
+
+    def __contains__(self, key):
+        """Checks whether a candidate, or "confidence", is in the vector."""
+        return key == "confidence" or key in self.index
+
+    def __iter__(self):
+        """Iterates through the candidate names."""
+        return iter(self.candidates)
+
+    def __len__(self):
+        """Returns the number of candidates."""
+        return len(self.candidates)
+
+    def to_dict(self):
+        """
+        Converts the vector to a dict.
+
+        :return polling:
+            Dict keying candidate names to their values, and "confidence" to
+            the confidence.
+
+        """
+        polling = {}
+        for i in range(len(self.candidates)):
+            polling[self.candidates[i]] = float(self.values[i])
+        polling["confidence"] = self.confidence
+        return polling
+
+    def copy(self):
+        """
+        Copies the vector.
+
+        :return vector:
+            A new CandidateVector object with its own array of values.
+
+        """
+        return CandidateVector(self.candidates, self.values, self.confidence,
+                               self.index)
+
+    def freeze(self):
+        """
+        Makes the values of the vector read-only.
+
+        :return self:
+            The vector.
+
+        """
+        self.values.flags.writeable = False
+        return self
+
+    def take(self, candidates):
+        """
+        Creates a vector containing the values of some candidates.
+
+        :param candidates:
+            List of candidate names, all of which must be in this vector.
+        :return vector:
+            A new CandidateVector object with the candidates in the given
+            order.
+
+        """
+        if candidates is self.candidates or tuple(candidates) == \
+                self.candidates:
+            return self.copy()
+        positions = [self.index[candidate] for candidate in candidates]
+        return CandidateVector(candidates, self.values[positions],
+                               self.confidence)
+
+    def add(self, other):
+        """
+        Adds the values of another vector to the values of the same
+        candidates in this vector.
+
+        :param other:
+            The CandidateVector to add, whose candidates must all be in this
+            vector.
+        :return self:
+            The vector.
+
+        """
+        if other.candidates is self.candidates or \
+                other.candidates == self.candidates:
+            self.values += other.values
+        else:
+            positions = [self.index[candidate] for candidate in other]
+            self.values[positions] += other.values
+        return self
+
+    def clip(self, minimum=0):
+        """
+        Raises any values below a minimum up to that minimum.
+
+        :param minimum:
+            The lowest value allowed.
+        :return self:
+            The vector.
+
+        """
+        numpy.maximum(self.values, minimum, out=self.values)
+        return self
+
+    def multiply(self, other):
+        """
+        Multiplies the values of the same candidates in this vector by the
+        values of another vector.
+
+        :param other:
+            The CandidateVector to multiply by, whose candidates must all be
+            in this vector.
+        :return self:
+            The vector.
+
+        """
+        if other.candidates is self.candidates or \
+                other.candidates == self.candidates:
+            self.values *= other.values
+        else:
+            positions = [self.index[candidate] for candidate in other]
+            self.values[positions] *= other.values
+        return self
+
+    def normalize(self):
+        """
+        Scales the values so that they add to 100.
+
+        :return self:
+            The vector.
+
+        """
+        divisor = self.values.sum()/100
+        assert divisor != 0, "No support detected - divide by zero error."
+        self.values /= divisor
+        return self
+
+def as_candidate_vector(polling, candidates=None):
+    """
+    Converts polling data to a candidate vector if it is not one already.
+
+    :param polling:
+        A CandidateVector, or dict keying candidate names to numbers and
+        optionally "confidence" to a confidence level.
+    :param candidates:
+        List of candidates to take from a dict, every key other than
+        "confidence" if None.
+    :return vector:
+        The CandidateVector object.
+
+    """
+    if isinstance(polling, CandidateVector):
+        return polling
+    return CandidateVector.from_dict(polling, candidates)
 
 class Database:
     """Stores states and territories."""
     def __init__(self, states={}, primary_calendar=[], primary_candidates=[],
-                 nat_primary_environment={}, polls=[]):
+                 nat_primary_environment={}, polls=[],
+                 state_similarities=None, as_of_date=None):
         """
         Initialises a database object.
         
@@ -20,16 +255,31 @@ class Database:
         :param primary_candidates:
             List of candidates in the 2020 Democratic Primary.
         :param nat_primary_environment:
-            Dict keying primary candidates to their national polling averages.
+            CandidateVector of primary candidates' national polling averages.
         :param polls:
             List of Poll objects storing results of opinion polls.
+        :param state_similarities:
+            StateSimilarities object storing the political similarity of each
+            pair of states.
+        :param as_of_date:
+            datetime.date object giving the day the model is built as of,
+            which decides which polls are used and how far away each primary
+            is. If None, the model is as of today.
 
         """
         self.states = states
         self.primary_calendar = primary_calendar
         self.primary_candidates = primary_candidates
         self.nat_primary_environment = nat_primary_environment
-        self.polls = polls
+        self.polls = list(polls)
+        self.state_similarities = state_similarities
+        self.as_of_date = as_of_date
+
+        # The poll index is built when first used, then kept up to date with
+        # the list of polls.
+        self.poll_index = None
+        self.indexed_polls = None
+        self.num_indexed_polls = 0
 
     def get_state(self, name):
         """
@@ -64,6 +314,47 @@ class Database:
         """
         self.states[state.name] = state
 
+    def get_as_of_date(self):
+        """
+        Retrieves the day the model is built as of.
+
+        :return as_of_date:
+            A datetime.date object, which is today's date unless the database
+            was given another date.
+
+        """
+        if self.as_of_date is None:
+            return datetime.date.today()
+        return self.as_of_date
+
+    def as_of(self, as_of_date):
+        """
+        Creates a copy of the database to build the model as of another day.
+        The copy shares the polls, their index and the state similarities, and
+        has its own copies of the states so their polling can be replaced.
+
+        :param as_of_date:
+            datetime.date object giving the day to build the model as of.
+        :return db:
+            The new Database object.
+
+        """
+        states = {}
+        for state_name in self.states:
+            states[state_name] = copy.copy(self.states[state_name])
+        db = Database(states=states, primary_calendar=self.primary_calendar,
+                      primary_candidates=self.primary_candidates,
+                      nat_primary_environment=self.nat_primary_environment,
+                      state_similarities=self.state_similarities,
+                      as_of_date=as_of_date)
+
+        # Share the list of polls and its index rather than copying them.
+        db.poll_index = self.get_poll_index()
+        db.polls = self.polls
+        db.indexed_polls = self.polls
+        db.num_indexed_polls = len(self.polls)
+        return db
+
     def get_primary_calendar(self):
         """
         Retrieves the full list of primary dates.
@@ -110,7 +401,7 @@ class Database:
         Retrieves data on national primary polls.
         
         :return self.nat_primary_environment:
-            Dict keying candidate names to their national polling averages.
+            CandidateVector of candidates' national polling averages.
 
         """
         return self.nat_primary_environment
@@ -123,7 +414,7 @@ class Database:
             The list of poll objects to add to the database.
 
         """
-        self.polls = self.polls + polls
+        self.polls.extend(polls)
 
     def get_polls(self):
         """
@@ -135,11 +426,319 @@ class Database:
         """
         return self.polls
 
+    def get_poll_index(self):
+        """
+        Retrieves an index of the polls by location and date, first indexing
+        any polls added since it was last retrieved.
+
+        :return self.poll_index:
+            The PollIndex object.
+
+        """
+        # Start again if the list of polls has been replaced or shortened.
+        if (self.poll_index is None or self.indexed_polls is not self.polls or
+                self.num_indexed_polls > len(self.polls)):
+            self.poll_index = PollIndex()
+            self.indexed_polls = self.polls
+            self.num_indexed_polls = 0
+
+        self.poll_index.add_polls(self.polls[self.num_indexed_polls:])
+        self.num_indexed_polls = len(self.polls)
+        return self.poll_index
+
+    def get_state_similarities(self):
+        """
+        Retrieves the political similarities between states.
+
+        :return self.state_similarities:
+            The StateSimilarities object.
+
+        """
+        return self.state_similarities
+
+    def set_state_similarities(self, state_similarities):
+        """
+        Sets the political similarities between states, and gives each state
+        in them access to their similarities.
+
+        :param state_similarities:
+            The StateSimilarities object.
+
+        """
+        self.state_similarities = state_similarities
+        for state_name in state_similarities.get_state_names():
+            self.states[state_name].set_state_sims(state_similarities)
+
+class ModelSnapshot:
+    """
+    Read-only copy of a populated database, built once and shared by every
+    simulation in a run.
+
+    """
+    def __init__(self, db):
+        """
+        Initialises a snapshot of a database object.
+
+        :param db:
+            The populated database to take a snapshot of. The snapshot does
+            not share any mutable data with it.
+
+        """
+        states = {}
+        for state_name in db.get_states_dict():
+            state = copy.copy(db.get_state(state_name))
+            state.primary_polling = as_candidate_vector(
+                state.get_primary_polling()).copy().freeze()
+            states[state_name] = state
+        self.states = types.MappingProxyType(states)
+        self.primary_calendar = tuple(db.get_primary_calendar())
+        self.primary_candidates = tuple(db.get_primary_candidates())
+        self.nat_primary_environment = as_candidate_vector(
+            db.get_nat_primary_environment()).copy().freeze()
+        self.polls = tuple(db.get_polls())
+        self.state_similarities = db.get_state_similarities()
+        self.as_of_date = db.get_as_of_date()
+
+    def __getstate__(self):
+        """
+        Converts the snapshot back to a database when it is pickled, such as
+        when sending it to another process, as read-only mappings cannot be
+        pickled. The snapshot is made read-only again when it is unpickled.
+
+        :return db:
+            A Database object containing copies of the snapshot's data.
+
+        """
+        db = Database(states={},
+                      primary_calendar=list(self.primary_calendar),
+                      primary_candidates=list(self.primary_candidates),
+                      nat_primary_environment=(
+                          self.nat_primary_environment.copy()),
+                      polls=list(self.polls),
+                      state_similarities=self.state_similarities,
+                      as_of_date=self.as_of_date)
+        for state_name in self.states:
+            state = copy.copy(self.states[state_name])
+            state.primary_polling = state.get_primary_polling().copy()
+            db.add_state(state)
+        return db
+
+    def __setstate__(self, db):
+        """
+        Rebuilds the snapshot from a pickled database.
+
+        :param db:
+            The Database object returned by __getstate__.
+
+        """
+        self.__init__(db)
+
+    def get_state(self, name):
+        """
+        Retrieves a read-only state object in the snapshot.
+
+        :param name:
+            The name of the state to be returned.
+        :return self.states[name]:
+            The state object.
+
+        """
+        return self.states[name]
+
+    def get_states_dict(self):
+        """
+        Retrieves the read-only dict of states in the snapshot.
+
+        :return self.states:
+            Mapping keying state names to state objects.
+
+        """
+        return self.states
+
+    def get_primary_calendar(self):
+        """
+        Retrieves the primary dates.
+
+        :return self.primary_calendar:
+            Tuple containing PrimaryDate objects.
+
+        """
+        return self.primary_calendar
+
+    def get_primary_candidates(self):
+        """
+        Retrieves the primary candidates.
+
+        :return self.primary_candidates:
+            Tuple containing the surnames of the candidates.
+
+        """
+        return self.primary_candidates
+
+    def get_nat_primary_environment(self):
+        """
+        Retrieves data on national primary polls.
+
+        :return self.nat_primary_environment:
+            Read-only CandidateVector of candidates' national polling
+            averages.
+
+        """
+        return self.nat_primary_environment
+
+    def get_polls(self):
+        """
+        Retrieves the polls in the snapshot.
+
+        :return self.polls:
+            Tuple of poll objects.
+
+        """
+        return self.polls
+
+    def get_state_similarities(self):
+        """
+        Retrieves the political similarities between states.
+
+        :return self.state_similarities:
+            The StateSimilarities object.
+
+        """
+        return self.state_similarities
+
+    def get_as_of_date(self):
+        """
+        Retrieves the day the model is built as of.
+
+        :return self.as_of_date:
+            A datetime.date object, fixed when the snapshot was taken.
+
+        """
+        return self.as_of_date
+
+    def new_run(self):
+        """
+        Creates a view of the snapshot for a single simulation.
+
+        :return overlay:
+            A SimulationOverlay object which can be passed to ps.simulate in
+            place of a database.
+
+        """
+        return SimulationOverlay(self)
+
+class SimulationOverlay:
+    """
+    Per-simulation view of a ModelSnapshot which holds the fields a simulation
+    changes, leaving the snapshot untouched.
+
+    """
+    def __init__(self, snapshot):
+        """
+        Initialises an overlay on a snapshot.
+
+        :param snapshot:
+            The ModelSnapshot object to read unchanged data from.
+
+        """
+        self.snapshot = snapshot
+        self.states = {}
+
+    def get_state(self, name):
+        """
+        Retrieves this simulation's copy of a state object. The copy is made
+        the first time the state is requested, so setting its primary_polling
+        does not affect the snapshot or other simulations.
+
+        :param name:
+            The name of the state to be returned.
+        :return state:
+            The state object.
+
+        """
+        if name not in self.states:
+            self.states[name] = copy.copy(self.snapshot.get_state(name))
+        return self.states[name]
+
+    def get_states_dict(self):
+        """
+        Retrieves this simulation's copies of every state.
+
+        :return states:
+            Dict keying state names to state objects.
+
+        """
+        states = {}
+        for state_name in self.snapshot.get_states_dict():
+            states[state_name] = self.get_state(state_name)
+        return states
+
+    def get_primary_calendar(self):
+        """
+        Retrieves the primary dates.
+
+        :return self.snapshot.primary_calendar:
+            Tuple containing PrimaryDate objects.
+
+        """
+        return self.snapshot.get_primary_calendar()
+
+    def get_primary_candidates(self):
+        """
+        Retrieves the primary candidates.
+
+        :return self.snapshot.primary_candidates:
+            Tuple containing the surnames of the candidates.
+
+        """
+        return self.snapshot.get_primary_candidates()
+
+    def get_nat_primary_environment(self):
+        """
+        Retrieves data on national primary polls.
+
+        :return self.snapshot.nat_primary_environment:
+            Read-only CandidateVector of candidates' national polling
+            averages.
+
+        """
+        return self.snapshot.get_nat_primary_environment()
+
+    def get_polls(self):
+        """
+        Retrieves the polls in the snapshot.
+
+        :return self.snapshot.polls:
+            Tuple of poll objects.
+
+        """
+        return self.snapshot.get_polls()
+
+    def get_state_similarities(self):
+        """
+        Retrieves the political similarities between states.
+
+        :return self.snapshot.state_similarities:
+            The StateSimilarities object.
+
+        """
+        return self.snapshot.get_state_similarities()
+
+    def get_as_of_date(self):
+        """
+        Retrieves the day the model is built as of.
+
+        :return self.snapshot.as_of_date:
+            A datetime.date object.
+
+        """
+        return self.snapshot.get_as_of_date()
+
 class State:
     """Stores statistics for each state or territory."""
     def __init__(self, name, PVI, electors, pchispanic, pcwhite, pcblack,
                  pcasian, pcnative, status, elasticity, pop1000s, date,
-                 delegates, region, primary_polling={}, state_sims={}):
+                 delegates, region, primary_polling={}, state_sims=None):
         """
         Initialises a state object.
         
@@ -182,14 +781,16 @@ class State:
             The number of pledged delegates the state has in the 2020
             Democratic primary.
         :param primary_polling:
-            Dict keying candidate names to percentage polling in the state, and
-            a "confidence" key with a value representing the quality and
-            quantity of data used to find this average.
+            CandidateVector of candidates' percentage polling in the state,
+            with a confidence representing the quality and quantity of data
+            used to find this average. A dict with a "confidence" key is
+            converted to a CandidateVector.
         :param region:
             String giving the region of the USA the state is in.
         :param state_sims:
-            Dict keying the names of other states to a coefficient between 0
-            and 1 describing the similarities in their political behaivours.
+            StateSimilarities object giving coefficients between 0 and 1
+            describing the similarities in the political behaviour of this
+            state and others, or None if they have not been calculated.
 
         """
         self.name = name
@@ -205,50 +806,65 @@ class State:
         self.pop1000s = pop1000s
         self.date = date
         self.delegates = delegates
-        self.primary_polling = primary_polling
+        self.primary_polling = as_candidate_vector(primary_polling)
         self.region = region
         self.state_sims = state_sims
 
     def get_raw_primary_result(self, nat_environment, base_nat_environment, 
-                               candidates, db):
+                               candidates, db, rng=None,
+                               comparison_totals=None, profiler=None):
         """
         Calculates the unadjusted result of the vote in the state's primary.
 
         :param nat_environment:
-            A dict where the keys are candidate surnames and the values are
-            their probabilistically predicted % standings in national polls at
-            the time of this primary. Additionally the key "confidence" has a
-            value representing the confidence in national polling based on the
-            quantity and quality of data available, scored from 0 to 1.
+            A CandidateVector of candidates' probabilistically predicted %
+            standings in national polls at the time of this primary, with a
+            confidence representing the confidence in national polling based on
+            the quantity and quality of data available, scored from 0 to 1.
         :param base_nat_environment:
             The means of the distributions used to predict the nat_environment.
         :param candidates:
-            A list of candidates in the 2020 Democratic Primary race.
+            A list of candidates in the 2020 Democratic Primary race. The
+            result only includes these candidates, so the state's polling of
+            candidates who have dropped out is shared between the rest.
         :param db:
             The database object storing the data.
+        :param rng:
+            The numpy.random.Generator to draw random numbers from. If None,
+            the global numpy.random state is used.
+        :param comparison_totals:
+            ss.ComparisonTotals object holding the current polling of every
+            state. If None, one is built from the database.
+        :param profiler:
+            The StageProfiler object to record the time taken by each stage
+            in, or None not to record it.
         :return result:
-            A dict keying candidate names to the percentage share of the vote
-            they are probabilistically predicted to win in this primary. Also
-            has a "confidence" key with associated value from 0 to 1.
+            A CandidateVector of the percentage share of the vote candidates
+            are probabilistically predicted to win in this primary, with a
+            confidence of 1.
         
         """
-        state_environment = self.get_primary_polling()
+        if profiler is None:
+            profiler = profiling.DISABLED
 
         # Account for the difference in national environment between polling
         # and this simulation by finding the difference between them and
         # applying it to the state level polls.
-        for candidate in candidates:
-            difference = (nat_environment[candidate] - 
-                      base_nat_environment[candidate])
-            state_environment[candidate] = (state_environment[candidate] + 
-                                            difference)
+        with profiler.stage("national_difference"):
+            state_environment = self.get_primary_polling().take(candidates)
+            difference = as_candidate_vector(nat_environment).take(candidates)
+            difference.values -= as_candidate_vector(
+                base_nat_environment).take(candidates).values
+            state_environment.add(difference)
 
         # Adjust the result to account for state similarities.
-        state_environment = ss.apply_comparison(state_environment, db,
-                                                self.state_sims)
+        with profiler.stage("apply_comparison"):
+            state_environment = ss.apply_comparison(state_environment, db,
+                                                    self.name,
+                                                    comparison_totals)
         
         # Get days left until the election. This is used to gauge uncertainty.
-        today = datetime.date.today()
+        today = db.get_as_of_date()
         primary_date = self.date
         time_left = today - primary_date
         days_left = time_left/datetime.timedelta(days=1)
@@ -256,19 +872,17 @@ class State:
             days_left = 0
 
         # Apply random variation to the state results.
-        result = vp.random_variation(state_environment, days_left)
+        with profiler.stage("random_variation"):
+            result = vp.random_variation(state_environment, days_left, rng)
 
-        # Prevent any results from being less than zero.
-        for candidate in result:
-            if candidate != "confidence":
-                if result[candidate] < 0:
-                    result[candidate] = 0
+            # Prevent any results from being less than zero.
+            result.clip(0)
 
-        # Rebalance support such that the percentages add to 100.
-        result = vp.rebalance(state_environment)
+            # Rebalance support such that the percentages add to 100.
+            result = vp.rebalance(result)
 
         # This is now a result, so set confidence to 1.
-        result["confidence"] = 1
+        result.confidence = 1
 
         return result
 
@@ -277,51 +891,18 @@ class State:
         Approximates the distribution of delegates in the state's primary.
 
         :param result:
-            Dict keying candidate names to their share of the vote, keying
-            the string "confidence" to the confidence in the result.
+            CandidateVector of candidates' share of the vote. A dict with a
+            "confidence" key is also accepted.
         :return delegates:
             Dict keying candidates to the number of pledged delegates they
             receive from this state's primary.
         
         """
-        num_delegates = self.delegates 
-
-        # A dict keying % popular vote to expected proportion of delegates, up
-        # to 25% of the popular vote, where delegate share becomes proportional
-        # to vote share.
-        conversion = {0:0, 1:0, 2:0, 3:0, 4:0, 5:0, 6:0, 7:1, 8:1, 9:1, 10:2,
-                      11:2, 12:2, 13:3, 14:5, 15:12, 16:14, 17:15, 18:17,
-                      19:18, 20:19, 21:20, 22:21, 23:23, 24:24, 25:25}
-
-        # Find the expected percentage of delegates each candidate should win.
-        pc_dels = {}
-        for candidate in result:
-            if candidate != "confidence":
-                votes = result[candidate]
-                if votes > 25:
-                    pc_dels[candidate] = votes
-                else:
-                    pc_dels[candidate] = conversion[round(votes)]
-        pc_dels = vp.rebalance(pc_dels)
-
-        # Convert the percentages into numbers of delegates
-        delegates = {}
-        total_dels_distributed = 0
-        for candidate in pc_dels:
-            dels = round(pc_dels[candidate]*num_delegates/100)
-            delegates[candidate] = dels
-            total_dels_distributed = total_dels_distributed + dels
-
-        # Account for the fact that due to rounding error, an incorrect number
-        # of delegates may have been distributed, and redistribute as
-        # necessary.
-        unassigned_dels = num_delegates - total_dels_distributed
-        if unassigned_dels > 0:
-                delegates = vp.assign_leftover_delegates(delegates, pc_dels,
-                                                         unassigned_dels)
-        elif unassigned_dels < 0:
-                delegates = vp.unassign_extra_delegates(delegates, pc_dels, 
-                                                        -unassigned_dels)
+        result = as_candidate_vector(result)
+
+        # Allocate the delegates as a single row of the array kernel.
+        dels = vp.allocate_delegates(result.values[None, :], self.delegates)
+        delegates = dict(zip(result.candidates, dels[0].tolist()))
 
         return delegates
 
@@ -406,9 +987,9 @@ class State:
         Retrieves the average of the primary polling data for the state.
 
         :return self.primary_polling:
-            Dict keying candidate names to their average % polling in the state
-            and a "confidence" key with a value representing the quality and
-            quantity of data gone into forming this average.
+            CandidateVector of candidates' average % polling in the state, with
+            a confidence representing the quality and quantity of data gone
+            into forming this average.
 
         """
         return self.primary_polling
@@ -427,25 +1008,25 @@ class State:
         """
         Retrieves the dict giving similarities to other states.
 
-        :return self.state_sims:
+        :return sims:
             Dict keying state names to coefficients betwwen 0 and 1 describing
             the political similarity of the two states.
 
         """
-        return self.state_sims
+        if self.state_sims is None:
+            return {}
+        return self.state_sims.get_sims(self.name)
 
     def set_state_sims(self, sims):
         """
-        Sets the dict giving poltical similarity coefficients to other states.
+        Sets the object giving poltical similarity coefficients to other
+        states.
 
         :param sims:
-            Dict keying state names to coefficients betwwen 0 and 1 describing
-            the political similarity of the two states.
+            StateSimilarities object containing a row for this state.
 
         """
-        for state in sims:
-            assert sims[state] >= 0, "State similarity is negative."
-            assert sims[state] <= 1, "State similarity is > 1."
+        assert self.name in sims.index, "State missing from similarities."
         self.state_sims = sims
 
     def get_date(self):
@@ -458,6 +1039,215 @@ class State:
         """
         return self.date
 
+class StateSimilarities:
+    """
+    Stores the political similarity of every pair of states as a matrix, with
+    a fixed order of states.
+
+    """
+    def __init__(self, state_names, sims):
+        """
+        Initialises a state similarities object.
+
+        :param state_names:
+            List of state names giving the order of the rows and columns of
+            sims.
+        :param sims:
+            Square array where sims[i, j] is a coefficient between 0 and 1
+            describing the political similarity of the states named
+            state_names[i] and state_names[j]. The diagonal is zero, as a
+            state is not compared to itself.
+
+        """
+        sims = numpy.array(sims, dtype=float)
+        assert sims.shape == (len(state_names), len(state_names)), \
+            "Similarity matrix does not match the list of states."
+        assert numpy.all(sims >= 0), "State similarity is negative."
+        assert numpy.all(sims <= 1), "State similarity is > 1."
+        sims.flags.writeable = False
+
+        self.state_names = tuple(state_names)
+        self.sims = sims
+        self.index = {}
+        for i in range(len(self.state_names)):
+            self.index[self.state_names[i]] = i
+
+    def get_state_names(self):
+        """
+        Retrieves the names of the states in the order of the matrix.
+
+        :return self.state_names:
+            Tuple of state names.
+
+        """
+        return self.state_names
+
+    def get_index(self, name):
+        """
+        Retrieves the position of a state in the matrix.
+
+        :param name:
+            The name of the state.
+        :return self.index[name]:
+            The index of the state's row and column.
+
+        """
+        return self.index[name]
+
+    def get_matrix(self):
+        """
+        Retrieves the full similarity matrix.
+
+        :return self.sims:
+            Read-only square array of similarity coefficients.
+
+        """
+        return self.sims
+
+    def get_row(self, name):
+        """
+        Retrieves the similarities between one state and every state.
+
+        :param name:
+            The name of the state.
+        :return row:
+            Read-only array of similarity coefficients, in the order of
+            self.state_names.
+
+        """
+        return self.sims[self.index[name]]
+
+    def get_neighbours(self, name):
+        """
+        Retrieves the states a state is compared to and their similarities.
+
+        :param name:
+            The name of the state.
+        :return positions:
+            slice(None), as every state is a neighbour. Indexing an array
+            with it takes a view of the whole array.
+        :return sims:
+            Read-only array of similarity coefficients, in the order of
+            self.state_names.
+
+        """
+        return slice(None), self.sims[self.index[name]]
+
+    def get_sims(self, name):
+        """
+        Retrieves the similarities between one state and every other state as
+        a dict.
+
+        :param name:
+            The name of the state.
+        :return sims:
+            Dict keying the names of other states to similarity coefficients.
+
+        """
+        row = self.get_row(name)
+        sims = {}
+        for i in range(len(self.state_names)):
+            if self.state_names[i] != name:
+                sims[self.state_names[i]] = float(row[i])
+        return sims
+
+class SparseSimilarities(StateSimilarities):
+    """
+    Stores only each state's most similar neighbours, as a sparse matrix in
+    compressed sparse row form, so that comparisons take time proportional
+    to the number of neighbours rather than the number of states.
+
+    """
+    def __init__(self, state_names, indptr, indices, sims, num_neighbours):
+        """
+        Initialises a sparse state similarities object.
+
+        :param state_names:
+            List of state names giving the order of the rows and columns.
+        :param indptr:
+            Integer array where the neighbours of the ith state are stored
+            from indptr[i] up to indptr[i + 1] in indices and sims.
+        :param indices:
+            Integer array of the column of each neighbour.
+        :param sims:
+            Array of the similarity coefficient between 0 and 1 of each
+            neighbour.
+        :param num_neighbours:
+            The largest number of neighbours kept for each state.
+
+        """
+        indptr = numpy.array(indptr, dtype=numpy.int64)
+        indices = numpy.array(indices, dtype=numpy.int64)
+        sims = numpy.array(sims, dtype=float)
+        assert indptr.shape == (len(state_names) + 1,), \
+            "Row pointers do not match the list of states."
+        assert indices.shape == sims.shape == (indptr[-1],), \
+            "Number of neighbours does not match the row pointers."
+        assert numpy.all(sims >= 0), "State similarity is negative."
+        assert numpy.all(sims <= 1), "State similarity is > 1."
+        for array in [indptr, indices, sims]:
+            array.flags.writeable = False
+
+        self.state_names = tuple(state_names)
+        self.indptr = indptr
+        self.indices = indices
+        self.sims = sims
+        self.num_neighbours = num_neighbours
+        self.index = {}
+        for i in range(len(self.state_names)):
+            self.index[self.state_names[i]] = i
+
+    def get_matrix(self):
+        """
+        Builds the full similarity matrix, with zero similarity between
+        states which are not neighbours.
+
+        :return matrix:
+            Read-only square array of similarity coefficients.
+
+        """
+        matrix = numpy.zeros((len(self.state_names), len(self.state_names)))
+        rows = numpy.repeat(numpy.arange(len(self.state_names)),
+                            numpy.diff(self.indptr))
+        matrix[rows, self.indices] = self.sims
+        matrix.flags.writeable = False
+        return matrix
+
+    def get_row(self, name):
+        """
+        Builds the similarities between one state and every state.
+
+        :param name:
+            The name of the state.
+        :return row:
+            Array of similarity coefficients, in the order of
+            self.state_names, which are zero for states which are not
+            neighbours.
+
+        """
+        positions, sims = self.get_neighbours(name)
+        row = numpy.zeros(len(self.state_names))
+        row[positions] = sims
+        return row
+
+    def get_neighbours(self, name):
+        """
+        Retrieves a state's most similar neighbours and their similarities.
+
+        :param name:
+            The name of the state.
+        :return positions:
+            Read-only integer array of the position of each neighbour in
+            self.state_names.
+        :return sims:
+            Read-only array of the similarity coefficient of each neighbour.
+
+        """
+        i = self.index[name]
+        start = self.indptr[i]
+        stop = self.indptr[i + 1]
+        return self.indices[start:stop], self.sims[start:stop]
+
 class PrimaryDate:
     """Represents a single day of primaries."""
     def __init__(self, date, primaries):
@@ -568,6 +1358,180 @@ class Poll:
         """
         return self.date
 
+class PollIndex:
+    """
+    Indexes polls by location, keeping each location's polls sorted by date
+    so the polls in a range of dates can be found by binary search. The
+    index's version changes whenever polls are added, so results found from
+    its polls can be cached.
+
+    """
+    def __init__(self, polls=[]):
+        """
+        Creates an index of polls.
+
+        :param polls:
+            List of Poll objects to index.
+
+        """
+        # Each location is keyed to a list of its polls' dates as ordinals,
+        # and a list of the polls in the same order.
+        self.dates = {}
+        self.polls = {}
+
+        # Each location's polls are also kept as a PollMatrix object once
+        # needed, until more polls are added to the location.
+        self.matrices = {}
+        self.version = next(poll_versions)
+        self.add_polls(polls)
+
+    def add_polls(self, polls):
+        """
+        Adds polls to the index, giving it a new version number if there are
+        any.
+
+        :param polls:
+            List of Poll objects to add.
+
+        """
+        if len(polls) > 0:
+            self.version = next(poll_versions)
+        for poll in polls:
+            location = poll.get_location()
+            if location not in self.dates:
+                self.dates[location] = []
+                self.polls[location] = []
+            self.matrices.pop(location, None)
+            dates = self.dates[location]
+            date = poll.get_date().toordinal()
+
+            # Polls usually arrive in date order, so can be added to the end.
+            # Otherwise, insert them after any polls from the same date.
+            if dates == [] or date >= dates[-1]:
+                dates.append(date)
+                self.polls[location].append(poll)
+            else:
+                i = bisect.bisect_right(dates, date)
+                dates.insert(i, date)
+                self.polls[location].insert(i, poll)
+
+    def get_locations(self):
+        """
+        Retrieves the locations with polls in the index.
+
+        :return locations:
+            List of location names.
+
+        """
+        return list(self.polls)
+
+    def get_window(self, location, start=None, stop=None):
+        """
+        Finds a location's polls from a range of dates.
+
+        :param location:
+            The name of the location.
+        :param start:
+            datetime.date object giving the earliest date included, or None
+            for no limit.
+        :param stop:
+            datetime.date object giving the latest date included, or None for
+            no limit.
+        :return polls:
+            List of the Poll objects in the range, in date order.
+
+        """
+        if location not in self.dates:
+            return []
+        dates = self.dates[location]
+        first = 0
+        last = len(dates)
+        if start is not None:
+            first = bisect.bisect_left(dates, start.toordinal())
+        if stop is not None:
+            last = bisect.bisect_right(dates, stop.toordinal())
+        return self.polls[location][first:last]
+
+    def get_matrix(self, location, candidates):
+        """
+        Retrieves a location's polls as arrays.
+
+        :param location:
+            The name of the location.
+        :param candidates:
+            List of candidates giving the order of the result columns.
+        :return matrix:
+            A PollMatrix object containing the location's polls in date
+            order.
+
+        """
+        candidates = tuple(candidates)
+        matrix = self.matrices.get(location)
+        if matrix is None or matrix.candidates != candidates:
+            matrix = PollMatrix(self.polls.get(location, []), candidates)
+            self.matrices[location] = matrix
+        return matrix
+
+class PollMatrix:
+    """
+    Stores polls as arrays, with a row for each poll and a column for each
+    candidate.
+
+    """
+    def __init__(self, polls, candidates):
+        """
+        Converts polls to arrays.
+
+        :param polls:
+            List of Poll objects, in date order if get_rows is to be used.
+        :param candidates:
+            Tuple of candidate names giving the order of the columns.
+
+        """
+        self.polls = polls
+        self.candidates = tuple(candidates)
+        self.weights = numpy.array([poll.get_weight() for poll in polls],
+                                   dtype=float)
+        self.dates = numpy.array([poll.get_date().toordinal()
+                                  for poll in polls], dtype=numpy.int64)
+
+        # Candidates not included in a poll are missing, and have a result of
+        # zero in the results array.
+        self.results = numpy.array(
+            [list(map(poll.get_result().get, self.candidates))
+             for poll in polls], dtype=float).reshape(len(polls),
+                                                      len(self.candidates))
+        self.missing = numpy.isnan(self.results)
+        self.results[self.missing] = 0
+
+    def __len__(self):
+        """Returns the number of polls."""
+        return len(self.polls)
+
+    def get_rows(self, start=None, stop=None):
+        """
+        Finds the rows of the polls from a range of dates.
+
+        :param start:
+            datetime.date object giving the earliest date included, or None
+            for no limit.
+        :param stop:
+            datetime.date object giving the latest date included, or None for
+            no limit.
+        :return rows:
+            Slice object selecting the rows.
+
+        """
+        first = 0
+        last = len(self.dates)
+        if start is not None:
+            first = int(numpy.searchsorted(self.dates, start.toordinal(),
+                                           side="left"))
+        if stop is not None:
+            last = int(numpy.searchsorted(self.dates, stop.toordinal(),
+                                          side="right"))
+        return slice(first, last)
+
 class PrimarySimulationResults:
     """Stores the results of a Democratic 2020 primary simulation"""
     def __init__(self, winner=None, final_delegates={}, most_delegates=None):
@@ -616,9 +1580,8 @@ class PrimarySimulationResults:
             candidate has a first ballot majority.
         
         """
-        total_pledged_delegates = 3769
         for candidate in final_delegates:
-            if final_delegates[candidate] > total_pledged_delegates/2:
+            if final_delegates[candidate] > TOTAL_PLEDGED_DELEGATES/2:
                 return candidate
         return "No majority"
 
@@ -639,4 +1602,564 @@ class PrimarySimulationResults:
             if final_delegates[candidate] > highest_max_dels:
                 highest_max_dels = final_delegates[candidate]
                 highest_candidate = candidate
-        return highest_candidate
\ No newline at end of file
+        return highest_candidate
+
+class BatchSimulationResults:
+    """Stores the results of many Democratic 2020 primary simulations."""
+    def __init__(self, candidates, final_delegates):
+        """
+        Creates a new object to store the results of a batch of simulations.
+
+        :param candidates:
+            List of candidate names giving the order of the columns of
+            final_delegates.
+        :param final_delegates:
+            Integer array with one row per simulation, giving each candidate's
+            pledged delegate count at the end of the primary.
+
+        """
+        self.candidates = list(candidates)
+        self.final_delegates = final_delegates
+        self.winners, self.most_delegates = self.determine_outcomes(
+            final_delegates)
+
+    def __len__(self):
+        """Returns the number of simulations stored."""
+        return len(self.final_delegates)
+
+    def __iter__(self):
+        """Yields a PrimarySimulationResults object for each simulation."""
+        for i in range(len(self)):
+            yield self.get_result(i)
+
+    def determine_outcomes(self, final_delegates):
+        """
+        Determines the winner of each simulation and which candidate has the
+        most delegates, as in PrimarySimulationResults.determine_winner and
+        PrimarySimulationResults.determine_most_delegates.
+
+        :param final_delegates:
+            Integer array of final delegate counts, one row per simulation.
+        :return winners:
+            Array containing the name of the winner of each simulation, or
+            "No majority" if no candidate has a first ballot majority.
+        :return most_delegates:
+            Array containing the name of the candidate with the most pledged
+            delegates in each simulation, or None if no candidate has any.
+
+        """
+        winners, most_delegates = find_outcome_columns(final_delegates)
+        labels = numpy.array(self.candidates + ["No majority"], dtype=object)
+        names = numpy.array(self.candidates + [None], dtype=object)
+        return labels[winners], names[most_delegates]
+
+    def get_result(self, i):
+        """
+        Retrieves the results of a single simulation.
+
+        :param i:
+            The index of the simulation.
+        :return result:
+            A PrimarySimulationResults object for the simulation.
+
+        """
+        final_delegates = {}
+        for j in range(len(self.candidates)):
+            final_delegates[self.candidates[j]] = int(
+                self.final_delegates[i, j])
+        return PrimarySimulationResults(self.winners[i], final_delegates,
+                                        self.most_delegates[i])
+
+class SimulationSummary:
+    """
+    Accumulates the results of Democratic 2020 primary simulations without
+    storing each simulation.
+
+    """
+    def __init__(self, candidates, max_delegates=TOTAL_PLEDGED_DELEGATES):
+        """
+        Creates a new, empty summary.
+
+        :param candidates:
+            List of candidate names giving the order of the summary's arrays.
+        :param max_delegates:
+            The largest delegate count recorded in the histograms. Higher
+            counts are recorded in the last bin.
+
+        """
+        self.candidates = list(candidates)
+        self.max_delegates = max_delegates
+        self.num_sims = 0
+        self.win_counts = numpy.zeros(len(self.candidates), dtype=numpy.int64)
+        self.no_majority_count = 0
+        self.most_delegates_counts = numpy.zeros(len(self.candidates),
+                                                 dtype=numpy.int64)
+        # Delegate totals and squared totals are kept as exact integers, so
+        # summaries give the same mean and variance whatever order they are
+        # merged in.
+        self.delegate_sums = numpy.zeros(len(self.candidates),
+                                         dtype=numpy.int64)
+        self.delegate_square_sums = numpy.zeros(len(self.candidates),
+                                                dtype=numpy.int64)
+        self.histograms = numpy.zeros(
+            (len(self.candidates), max_delegates + 1), dtype=numpy.int64)
+        # Sums of the likelihood ratio weight of each simulation, and of its
+        # square, for importance sampling. The win sums are only over the
+        # simulations each candidate, then no candidate, wins a majority in.
+        self.weight_sum = 0.0
+        self.weight_square_sum = 0.0
+        self.win_weight_sums = numpy.zeros(len(self.candidates) + 1)
+        self.win_weight_square_sums = numpy.zeros(len(self.candidates) + 1)
+
+    def __len__(self):
+        """Returns the number of simulations summarised."""
+        return self.num_sims
+
+    def add_result(self, result):
+        """
+        Adds the result of one simulation to the summary.
+
+        :param result:
+            A PrimarySimulationResults object.
+
+        """
+        final_delegates = [result.final_delegates[candidate]
+                           for candidate in self.candidates]
+        self.add_final_delegates(numpy.array([final_delegates]))
+
+    def add_results(self, results):
+        """
+        Adds the results of many simulations to the summary.
+
+        :param results:
+            An iterable of PrimarySimulationResults objects, or a
+            BatchSimulationResults object.
+
+        """
+        if isinstance(results, BatchSimulationResults):
+            final_delegates = numpy.zeros((len(results), len(self.candidates)),
+                                          dtype=numpy.int64)
+            for j in range(len(self.candidates)):
+                final_delegates[:, j] = results.final_delegates[
+                    :, results.candidates.index(self.candidates[j])]
+            self.add_final_delegates(final_delegates)
+        else:
+            for result in results:
+                self.add_result(result)
+
+    def add_final_delegates(self, final_delegates, weights=None):
+        """
+        Adds a batch of simulations to the summary.
+
+        :param final_delegates:
+            Integer array with one row per simulation, giving each candidate's
+            pledged delegate count at the end of the primary in the order of
+            the summary's candidates.
+        :param weights:
+            Array of the likelihood ratio weight of each simulation when
+            importance sampling, or None to give each simulation a weight of
+            1. Only the weighted methods account for the weights.
+
+        """
+        final_delegates = numpy.asarray(final_delegates, dtype=numpy.int64)
+        if numpy.any(final_delegates < 0):
+            raise ValueError("Cannot have negative numbers of delegates")
+        if weights is None:
+            weights = numpy.ones(len(final_delegates))
+        weights = numpy.asarray(weights, dtype=float)
+        if weights.shape != (len(final_delegates),):
+            raise ValueError("Each simulation must have one weight.")
+        if numpy.any(weights < 0):
+            raise ValueError("Weights cannot be negative.")
+        self.num_sims = self.num_sims + len(final_delegates)
+
+        # Count majority winners, and the candidates with the most delegates
+        # when no candidate has a majority.
+        majority = final_delegates > TOTAL_PLEDGED_DELEGATES/2
+        self.win_counts += majority.sum(axis=0)
+        no_majority = ~majority.any(axis=1)
+        self.no_majority_count = (self.no_majority_count +
+                                  int(no_majority.sum()))
+        no_majority_delegates = final_delegates[no_majority]
+        has_delegates = no_majority_delegates.max(axis=1, initial=0) > 0
+        most_delegates = numpy.argmax(no_majority_delegates[has_delegates],
+                                      axis=1)
+        self.most_delegates_counts += numpy.bincount(
+            most_delegates, minlength=len(self.candidates))
+
+        # Add up the weights of the simulations with each outcome.
+        outcomes = numpy.append(majority, no_majority[:, None], axis=1)
+        self.weight_sum = self.weight_sum + float(weights.sum())
+        self.weight_square_sum = (self.weight_square_sum +
+                                  float((weights**2).sum()))
+        self.win_weight_sums += weights @ outcomes
+        self.win_weight_square_sums += weights**2 @ outcomes
+
+        # Add to the running totals and the histograms.
+        self.delegate_sums += final_delegates.sum(axis=0)
+        self.delegate_square_sums += (final_delegates**2).sum(axis=0)
+        bins = numpy.minimum(final_delegates, self.max_delegates)
+        bins = bins + numpy.arange(len(self.candidates))*(
+            self.max_delegates + 1)
+        self.histograms += numpy.bincount(
+            bins.ravel(), minlength=self.histograms.size).reshape(
+                self.histograms.shape)
+
+    def merge(self, other):
+        """
+        Adds the simulations in another summary, such as one made by another
+        process, to this summary.
+
+        :param other:
+            The SimulationSummary object to merge in, which must have the same
+            candidates and max_delegates.
+        :return self:
+            The summary.
+
+        """
+        if (other.candidates != self.candidates or
+                other.max_delegates != self.max_delegates):
+            raise ValueError("Summaries must have the same candidates and "
+                             "histogram size.")
+        self.num_sims = self.num_sims + other.num_sims
+        self.win_counts += other.win_counts
+        self.no_majority_count = (self.no_majority_count +
+                                  other.no_majority_count)
+        self.most_delegates_counts += other.most_delegates_counts
+        self.delegate_sums += other.delegate_sums
+        self.delegate_square_sums += other.delegate_square_sums
+        self.histograms += other.histograms
+        self.weight_sum = self.weight_sum + other.weight_sum
+        self.weight_square_sum = (self.weight_square_sum +
+                                  other.weight_square_sum)
+        self.win_weight_sums += other.win_weight_sums
+        self.win_weight_square_sums += other.win_weight_square_sums
+        return self
+
+    def get_win_counts(self):
+        """
+        Retrieves the number of simulations each candidate wins a majority in.
+
+        :return win_counts:
+            Dict keying the names of candidates who win at least once, and
+            "No majority" if no candidate wins at least once, to the number of
+            simulations they occur in.
+
+        """
+        win_counts = {}
+        for j in range(len(self.candidates)):
+            if self.win_counts[j] > 0:
+                win_counts[self.candidates[j]] = int(self.win_counts[j])
+        if self.no_majority_count > 0:
+            win_counts["No majority"] = self.no_majority_count
+        return win_counts
+
+    def get_most_delegates_counts(self):
+        """
+        Retrieves the number of simulations with no majority in which each
+        candidate has the most delegates.
+
+        :return most_delegates_counts:
+            Dict keying the names of candidates who have the most delegates at
+            least once to the number of such simulations.
+
+        """
+        most_delegates_counts = {}
+        for j in range(len(self.candidates)):
+            if self.most_delegates_counts[j] > 0:
+                most_delegates_counts[self.candidates[j]] = int(
+                    self.most_delegates_counts[j])
+        return most_delegates_counts
+
+    def get_win_standard_errors(self):
+        """
+        Retrieves the standard error of the estimated probability of each
+        candidate winning a majority, and of no candidate winning one.
+
+        :return standard_errors:
+            Dict keying every candidate name and "No majority" to the standard
+            error of its probability.
+
+        """
+        if self.num_sims <= 0:
+            raise ValueError("No simulations have been summarised.")
+        counts = numpy.append(self.win_counts, self.no_majority_count)
+        standard_errors = proportion_standard_errors(counts, self.num_sims)
+        return dict(zip(self.candidates + ["No majority"],
+                        standard_errors.tolist()))
+
+    def get_most_delegates_standard_errors(self):
+        """
+        Retrieves the standard error of the estimated probability of each
+        candidate having the most delegates when no candidate has a majority.
+
+        :return standard_errors:
+            Dict keying candidate names to the standard error of their
+            probability, which is zero for every candidate if no simulation
+            has ended without a majority.
+
+        """
+        standard_errors = proportion_standard_errors(
+            self.most_delegates_counts, self.no_majority_count)
+        return dict(zip(self.candidates, standard_errors.tolist()))
+
+    def get_weighted_win_probabilities(self):
+        """
+        Estimates the probability of each candidate winning a majority, and
+        of no candidate winning one, from simulations weighted by their
+        likelihood ratios. Without importance sampling, these are the
+        proportions of simulations won.
+
+        :return probabilities:
+            Dict keying every candidate name and "No majority" to its
+            probability.
+
+        """
+        if self.num_sims <= 0:
+            raise ValueError("No simulations have been summarised.")
+        probabilities = self.win_weight_sums/self.num_sims
+        return dict(zip(self.candidates + ["No majority"],
+                        probabilities.tolist()))
+
+    def get_weighted_win_standard_errors(self):
+        """
+        Retrieves the standard error of each probability estimated by
+        get_weighted_win_probabilities.
+
+        :return standard_errors:
+            Dict keying every candidate name and "No majority" to the standard
+            error of its probability.
+
+        """
+        if self.num_sims <= 0:
+            raise ValueError("No simulations have been summarised.")
+        probabilities = self.win_weight_sums/self.num_sims
+        variance = self.win_weight_square_sums/self.num_sims - probabilities**2
+        standard_errors = numpy.sqrt(numpy.maximum(variance, 0)/self.num_sims)
+        return dict(zip(self.candidates + ["No majority"],
+                        standard_errors.tolist()))
+
+    def get_effective_sample_size(self):
+        """
+        Finds the number of unweighted simulations the weighted simulations
+        are worth, which is the number of simulations if every weight is the
+        same.
+
+        :return effective_sample_size:
+            The effective sample size, or zero if every weight is zero.
+
+        """
+        if self.weight_square_sum == 0:
+            return 0.0
+        return self.weight_sum**2/self.weight_square_sum
+
+    def get_mean_delegates(self):
+        """
+        Retrieves the mean final delegate count of each candidate.
+
+        :return mean_delegates:
+            Dict keying candidate names to their mean delegate count.
+
+        """
+        if self.num_sims <= 0:
+            raise ValueError("No simulations have been summarised.")
+        means = self.delegate_sums/self.num_sims
+        return dict(zip(self.candidates, means.tolist()))
+
+    def get_delegate_variance(self):
+        """
+        Retrieves the sample variance of each candidate's final delegate
+        count.
+
+        :return variance:
+            Dict keying candidate names to the variance of their delegate
+            count.
+
+        """
+        if self.num_sims <= 1:
+            raise ValueError("At least two simulations are needed.")
+        means = self.delegate_sums/self.num_sims
+        variance = ((self.delegate_square_sums - self.delegate_sums*means)/
+                    (self.num_sims - 1))
+        return dict(zip(self.candidates, variance.tolist()))
+
+    def get_histogram(self, candidate):
+        """
+        Retrieves the histogram of a candidate's final delegate counts.
+
+        :param candidate:
+            The name of the candidate.
+        :return histogram:
+            Integer array whose ith entry is the number of simulations in
+            which the candidate finishes with i delegates.
+
+        """
+        return self.histograms[self.candidates.index(candidate)].copy()
+
+class BacktestResults:
+    """
+    Stores the model's probabilities on each day of a backtest compactly, as
+    one row of float32 arrays per day.
+
+    """
+    def __init__(self, candidates, dates):
+        """
+        Creates results for a range of days, with no days filled in.
+
+        :param candidates:
+            List of candidate names giving the order of the columns.
+        :param dates:
+            List of datetime.date objects giving the day of each row.
+
+        """
+        self.candidates = list(candidates)
+        self.dates = numpy.array([date.toordinal() for date in dates],
+                                 dtype=numpy.int32)
+        # Days without any simulations have zero simulations and NaN
+        # probabilities.
+        self.num_sims = numpy.zeros(len(dates), dtype=numpy.int32)
+        self.win_probabilities = numpy.full(
+            (len(dates), len(self.candidates)), numpy.nan,
+            dtype=numpy.float32)
+        self.no_majority_probabilities = numpy.full(len(dates), numpy.nan,
+                                                    dtype=numpy.float32)
+        self.most_delegates_probabilities = numpy.full_like(
+            self.win_probabilities, numpy.nan)
+        self.mean_delegates = numpy.full_like(self.win_probabilities,
+                                              numpy.nan)
+
+    def __len__(self):
+        """Returns the number of days in the results."""
+        return len(self.dates)
+
+    def get_dates(self):
+        """
+        Retrieves the day of each row.
+
+        :return dates:
+            List of datetime.date objects.
+
+        """
+        return [datetime.date.fromordinal(int(date)) for date in self.dates]
+
+    def set_day(self, i, summary):
+        """
+        Fills in a day's row from the simulations run as of that day.
+
+        :param i:
+            The index of the day.
+        :param summary:
+            The SimulationSummary object containing the day's results, with
+            the same candidates as the backtest.
+
+        """
+        if summary.candidates != self.candidates:
+            raise ValueError("Summary must have the backtest's candidates.")
+        if len(summary) <= 0:
+            raise ValueError("No simulations have been summarised.")
+        self.num_sims[i] = len(summary)
+        self.win_probabilities[i] = summary.win_counts/len(summary)
+        self.no_majority_probabilities[i] = (summary.no_majority_count/
+                                             len(summary))
+        # Probabilities of having the most delegates are out of the
+        # simulations without a majority.
+        if summary.no_majority_count > 0:
+            self.most_delegates_probabilities[i] = (
+                summary.most_delegates_counts/summary.no_majority_count)
+        self.mean_delegates[i] = summary.delegate_sums/len(summary)
+
+    def get_win_probabilities(self, candidate):
+        """
+        Retrieves the time series of a candidate's probability of winning a
+        majority.
+
+        :param candidate:
+            The name of the candidate, or "No majority".
+        :return probabilities:
+            Array of the probability on each day, NaN on days not simulated.
+
+        """
+        if candidate == "No majority":
+            return self.no_majority_probabilities.copy()
+        j = self.candidates.index(candidate)
+        return self.win_probabilities[:, j].copy()
+
+    def save(self, path):
+        """
+        Saves the results to a compressed .npz file.
+
+        :param path:
+            The path of the file.
+
+        """
+        numpy.savez_compressed(
+            path, candidates=numpy.array(self.candidates), dates=self.dates,
+            num_sims=self.num_sims, win_probabilities=self.win_probabilities,
+            no_majority_probabilities=self.no_majority_probabilities,
+            most_delegates_probabilities=self.most_delegates_probabilities,
+            mean_delegates=self.mean_delegates)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads results saved by save.
+
+        :param path:
+            The path of the file.
+        :return results:
+            The BacktestResults object.
+
+        """
+        with numpy.load(path) as arrays:
+            results = cls(arrays["candidates"].tolist(), [])
+            results.dates = arrays["dates"]
+            results.num_sims = arrays["num_sims"]
+            results.win_probabilities = arrays["win_probabilities"]
+            results.no_majority_probabilities = arrays[
+                "no_majority_probabilities"]
+            results.most_delegates_probabilities = arrays[
+                "most_delegates_probabilities"]
+            results.mean_delegates = arrays["mean_delegates"]
+        return results
+
+def find_outcome_columns(final_delegates):
+    """
+    Finds the columns of the winner and of the candidate with the most
+    delegates in each of a batch of simulations.
+
+    :param final_delegates:
+        Integer array of final delegate counts, one row per simulation.
+    :return winners:
+        Array of the column of each simulation's winner, or the number of
+        columns if no candidate has a first ballot majority.
+    :return most_delegates:
+        Array of the column of the candidate with the most pledged delegates
+        in each simulation, or -1 if no candidate has any.
+
+    """
+    final_delegates = numpy.asarray(final_delegates)
+    majority = final_delegates > TOTAL_PLEDGED_DELEGATES/2
+    winners = numpy.where(majority.any(axis=1), numpy.argmax(majority, axis=1),
+                          final_delegates.shape[1])
+    most_delegates = numpy.where(final_delegates.max(axis=1, initial=0) > 0,
+                                 numpy.argmax(final_delegates, axis=1), -1)
+    return winners, most_delegates
+
+def proportion_standard_errors(counts, total):
+    """
+    Finds the standard errors of proportions estimated from counts of
+    simulations.
+
+    :param counts:
+        Array of the number of simulations with each outcome.
+    :param total:
+        The number of simulations the proportions are out of.
+    :return standard_errors:
+        Array of the standard error of each proportion, all zero if total is
+        zero.
+
+    """
+    if total <= 0:
+        return numpy.zeros(len(counts))
+    proportions = numpy.asarray(counts)/total
+    return numpy.sqrt(proportions*(1 - proportions)/total)
\ No newline at end of file
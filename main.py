@@ -1,32 +1,103 @@
 """Probabilistic model of the 2020 Democratic Primary."""
 
+import numpy
 import populate
 import database
-import simulate.primary_simulation as ps
+import simulate.batch_simulation as bs
+import simulate.parallel_simulation as pars
+import simulate.adaptive_simulation as adas
+import simulate.profiling as profiling
 import analyse.plot as plot
+import analyse.outcomes as outcomes
 
 # Define constants.
 NUM_SIMULATIONS = 1000
+# Largest standard error allowed for any candidate's probability of winning.
+# If set, simulations run in batches until every error is below it, instead of
+# running NUM_SIMULATIONS simulations.
+TOLERANCE = None
+# Number of seconds after which adaptive runs stop, None for no limit.
+TIME_BUDGET = None
+# Run every simulation at once with the array-based engine.
+USE_BATCH_ENGINE = False
+# Number of processes to run simulations on, None to use every CPU.
+NUM_WORKERS = None
+# Seed for the random numbers, None for a different run every time.
+SEED = None
+# The bit generator the random numbers are drawn with, "PCG64" or "Philox".
+BIT_GENERATOR = "PCG64"
+# How the random draws of each simulation are made, from
+# simulate.sampling.SAMPLERS. "antithetic" and "sobol" reduce the variance of
+# the results. "importance" moves TILT_CANDIDATE's national support up by
+# TILT standard deviations and weights each simulation, to estimate their
+# chance of a majority when it is small. Runs with a TOLERANCE or the batch
+# engine always use "random", so cannot be importance sampled.
+SAMPLER = "random"
+TILT_CANDIDATE = None
+TILT = 2
+# Time each stage of the simulations and print a breakdown at the end. This
+# can also be turned on by setting the PRIMARY_PROFILE environment variable.
+# The batch engine is not profiled.
+PROFILE = False
+# Directory to write the outcome of every simulation to, None to only keep a
+# summary of the results.
+OUTCOMES_PATH = None
 
-# Carry out the simulations.
-results = []
-for simulation in range(NUM_SIMULATIONS):
+if __name__ == "__main__":
+    if SAMPLER == "importance" and (TOLERANCE is not None or
+                                    USE_BATCH_ENGINE):
+        raise ValueError("Importance sampling cannot be used with a "
+                         "TOLERANCE or the batch engine.")
 
-    # Create a clean database containing required information.
-    db = populate.populate()
+    # Create a read-only database containing required information, shared by
+    # every simulation.
+    snapshot = database.ModelSnapshot(populate.populate())
+    base_nat_environment = snapshot.get_nat_primary_environment()
+    candidates = snapshot.get_primary_candidates()
+    primary_calendar = snapshot.get_primary_calendar()
 
-    # Initialise other variables.
-    base_nat_environment = db.get_nat_primary_environment()
-    candidates = db.get_primary_candidates()
+    # Set up the files storing every simulation's outcome, if required.
+    store = None
+    if OUTCOMES_PATH is not None:
+        store = outcomes.OutcomeWriter(OUTCOMES_PATH, candidates,
+                                       NUM_SIMULATIONS)
 
-    # Set up to iterate through the primary calendar.
-    primary_calendar = db.get_primary_calendar()
+    # Time the stages of the simulations if profiling is turned on.
+    profiler = None
+    if PROFILE:
+        profiler = profiling.StageProfiler()
+    profiler = profiling.get_profiler(profiler)
 
-    result = ps.simulate(db, base_nat_environment, candidates,
-                          primary_calendar)
-    results.append(result)
+    # Carry out the simulations, keeping a running summary of the results.
+    if TOLERANCE is not None:
+        summary, precise = adas.run_until_precise(
+            snapshot, TOLERANCE, TIME_BUDGET, SEED, NUM_WORKERS,
+            USE_BATCH_ENGINE, store=store, profiler=profiler)
+        if not precise:
+            print("Time budget ran out before the target precision was "
+                  "reached.")
+    elif USE_BATCH_ENGINE:
+        summary = bs.summarise_batch(snapshot, base_nat_environment,
+                                     candidates, primary_calendar,
+                                     NUM_SIMULATIONS,
+                                     numpy.random.default_rng(SEED),
+                                     store=store)
+    else:
+        summary = pars.run_simulations(snapshot, NUM_SIMULATIONS, SEED,
+                                       NUM_WORKERS, store=store,
+                                       profiler=profiler, sampler=SAMPLER,
+                                       candidate=TILT_CANDIDATE, tilt=TILT,
+                                       bit_generator=BIT_GENERATOR)
+    if store is not None:
+        store.close()
+    if profiler.enabled:
+        profiler.report()
 
-# Analyse and present the results.
-plot.winners_pie_chart(results)
-plot.most_delegates_pie_chart(results)
-plot.mean_final_delegates(results, NUM_SIMULATIONS, candidates)
\ No newline at end of file
+    # Analyse and present the results. Importance sampled simulations are
+    # only meaningful once weighted.
+    if SAMPLER == "importance":
+        plot.print_weighted_win_probabilities(summary)
+    else:
+        plot.winners_pie_chart(summary)
+        plot.most_delegates_pie_chart(summary)
+        plot.mean_final_delegates(summary, len(summary), candidates)
\ No newline at end of file
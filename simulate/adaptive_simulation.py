@@ -0,0 +1,122 @@
+"""Runs simulations of the 2020 Democratic Primary until they are precise."""
+
+import time
+import numpy
+import database
+import simulate.batch_simulation as bs
+import simulate.parallel_simulation as pars
+
+# Define constants.
+BATCH_SIZE = 1000
+MIN_SIMULATIONS = 1000
+
+def run_until_precise(snapshot, tolerance, time_budget=None, seed=None,
+                      workers=None, use_batch_engine=False,
+                      batch_size=BATCH_SIZE, min_sims=MIN_SIMULATIONS,
+                      max_sims=None, store=None, profiler=None):
+    """
+    Runs simulations in batches until the standard error of every
+    candidate's probability of winning a majority, and of winning the most
+    delegates when there is no majority, is below a tolerance.
+
+    :param snapshot:
+        The ModelSnapshot object containing the model.
+    :param tolerance:
+        The largest standard error allowed, as a probability between 0 and 1.
+    :param time_budget:
+        The number of seconds after which no more batches are started, or
+        None for no limit.
+    :param seed:
+        Integer seed for the random numbers, or None for a random seed.
+    :param workers:
+        The number of processes to use when not using the batch engine, as in
+        pars.run_simulations. The processes are started once and used for
+        every batch.
+    :param use_batch_engine:
+        Whether to run the simulations with the array-based batch engine.
+    :param batch_size:
+        The number of simulations run between checks of the errors.
+    :param min_sims:
+        The number of simulations run before the errors are trusted, so rare
+        outcomes have a chance to appear.
+    :param max_sims:
+        The largest number of simulations to run, or None for no limit.
+    :param store:
+        An OutcomeWriter object to write the outcome of every simulation to,
+        or None to only keep the summary.
+    :param profiler:
+        The StageProfiler object to record the time taken by each stage in
+        when not using the batch engine, or None as in pars.run_simulations.
+    :return summary:
+        A SimulationSummary object containing the results.
+    :return precise:
+        Whether every standard error is below the tolerance.
+
+    """
+    if tolerance <= 0:
+        raise ValueError("Tolerance must be positive.")
+    if batch_size <= 0:
+        raise ValueError("Batch size must be positive.")
+    start_time = time.monotonic()
+    base_nat_environment = snapshot.get_nat_primary_environment()
+    candidates = snapshot.get_primary_candidates()
+    primary_calendar = snapshot.get_primary_calendar()
+    summary = database.SimulationSummary(candidates)
+
+    # Each batch draws from its own stream spawned from the seed.
+    seed_sequence = numpy.random.SeedSequence(seed)
+    rng = numpy.random.default_rng(seed_sequence)
+
+    # Start the pool once, so the snapshot is not sent again for each batch.
+    executor = None
+    if not use_batch_engine and workers != 1:
+        executor = pars.make_executor(snapshot, workers)
+
+    precise = False
+    try:
+        while True:
+            num_sims = batch_size
+            if max_sims is not None:
+                num_sims = min(num_sims, max_sims - len(summary))
+            if num_sims <= 0:
+                break
+
+            # Run a batch of simulations and add it to the summary.
+            if use_batch_engine:
+                bs.summarise_batch(snapshot, base_nat_environment, candidates,
+                                   primary_calendar, num_sims, rng, summary,
+                                   store)
+            else:
+                batch_seed = seed_sequence.spawn(1)[0]
+                summary.merge(pars.run_simulations(
+                    snapshot, num_sims, batch_seed, workers, store=store,
+                    profiler=profiler, executor=executor))
+
+            # Stop once the errors are small enough or the time is up.
+            precise = (len(summary) >= min_sims and
+                       get_largest_error(summary) < tolerance)
+            out_of_time = (time_budget is not None and
+                           time.monotonic() - start_time >= time_budget)
+            if precise or out_of_time:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return summary, precise
+
+def get_largest_error(summary):
+    """
+    Finds the largest standard error of any probability in a summary.
+
+    :param summary:
+        The SimulationSummary object.
+    :return largest_error:
+        The largest standard error of the probabilities of winning a majority
+        and of winning the most delegates when there is no majority.
+
+    """
+    win_errors = summary.get_win_standard_errors()
+    most_delegates_errors = summary.get_most_delegates_standard_errors()
+    return max(list(win_errors.values()) +
+               list(most_delegates_errors.values()))
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""Rebuilds the model as of each day of a date range to see how it changed."""
+
+import datetime
+import concurrent.futures
+import numpy
+import database
+import collect.process_polls as pp
+import simulate.batch_simulation as bs
+
+# Define constants.
+NUM_SIMULATIONS = 1000
+
+# The database each day's model is built from in a worker process, set when
+# the worker starts so it is only sent to each process once.
+worker_base = None
+
+def run_backtest(db, start, stop, num_sims=NUM_SIMULATIONS, seed=None,
+                 workers=None):
+    """
+    Builds the model as of each day from start to stop, using only the polls
+    finished by that day, and simulates the primary on each day with the
+    batch engine.
+
+    Each day draws its random numbers from its own numpy.random.Generator,
+    seeded from a SeedSequence spawned from seed, so the same seed gives the
+    same results however many processes are used.
+
+    :param db:
+        The database containing the states, candidates, calendar, state
+        similarities and every poll. It is not modified.
+    :param start:
+        datetime.date object giving the first day.
+    :param stop:
+        datetime.date object giving the last day.
+    :param num_sims:
+        The number of simulations to run on each day.
+    :param seed:
+        Integer seed or numpy.random.SeedSequence for the random numbers, or
+        None for a random seed.
+    :param workers:
+        The number of processes to use. If None, one is used per CPU. If 1,
+        the days are run in this process.
+    :return results:
+        A BacktestResults object with one row per day. Days before there is
+        any national polling are left empty.
+
+    """
+    if stop < start:
+        raise ValueError("The last day cannot be before the first.")
+    if num_sims <= 0:
+        raise ValueError("Number of simulations must be positive.")
+    days = [start + datetime.timedelta(days=i)
+            for i in range((stop - start).days + 1)]
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    seeds = seed.spawn(len(days))
+
+    # Build the matrices of every location's polls once, so the days share
+    # them instead of each building its own.
+    poll_index = db.get_poll_index()
+    candidates = tuple(db.get_primary_candidates())
+    for location in ["USA"] + list(db.get_states_dict()):
+        poll_index.get_matrix(location, candidates)
+
+    results = database.BacktestResults(candidates, days)
+    if workers == 1:
+        set_worker_base(db)
+        summaries = map(backtest_day, days, [num_sims]*len(days), seeds)
+        add_summaries(results, summaries)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=set_worker_base,
+                initargs=(db,)) as executor:
+            summaries = executor.map(backtest_day, days,
+                                     [num_sims]*len(days), seeds)
+            add_summaries(results, summaries)
+
+    return results
+
+def set_worker_base(db):
+    """
+    Stores the database each day's model is built from in this process.
+
+    :param db:
+        The database containing every poll.
+
+    """
+    global worker_base
+    worker_base = db
+
+def backtest_day(day, num_sims, seed):
+    """
+    Builds the model as of a day from the database stored in this process,
+    and simulates the primary.
+
+    :param day:
+        datetime.date object giving the day.
+    :param num_sims:
+        The number of simulations to run.
+    :param seed:
+        The numpy.random.SeedSequence to seed the day's random numbers with.
+    :return summary:
+        A SimulationSummary object containing the day's results, or None if
+        there is no national polling by the day.
+
+    """
+    db = pp.attach_primary_polls_to_states(worker_base.as_of(day))
+    base_nat_environment = db.get_nat_primary_environment()
+    if not numpy.any(base_nat_environment.values > 0):
+        return None
+
+    return bs.summarise_batch(db, base_nat_environment,
+                              db.get_primary_candidates(),
+                              db.get_primary_calendar(), num_sims,
+                              numpy.random.default_rng(seed))
+
+def add_summaries(results, summaries):
+    """
+    Adds each day's summary to the results as it finishes.
+
+    :param results:
+        The BacktestResults object.
+    :param summaries:
+        Iterable of the summary returned by backtest_day for each day, in
+        order.
+
+    """
+    for i, summary in enumerate(summaries):
+        if summary is not None:
+            results.set_day(i, summary)
\ No newline at end of file
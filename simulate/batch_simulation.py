@@ -0,0 +1,324 @@
+"""Simulates many runs of the 2020 Democratic Primary at once using arrays."""
+
+import datetime
+import numpy
+import database
+import simulate.voting_patterns as vp
+import simulate.state_similarities as ss
+
+# Define constants.
+CHUNK_SIZE = 5000
+
+def simulate_batch(db, base_nat_environment, candidates, primary_calendar,
+                   num_sims, rng=None):
+    """
+    Simulates the 2020 Democratic Primary num_sims times, carrying each step of
+    simulate.primary_simulation.simulate out for every simulation at once.
+
+    :param db:
+        The database object storing the data. It is not modified.
+    :param base_nat_environment:
+        CandidateVector, or dict with a "confidence" key, of candidates'
+        standings in national polls.
+    :param candidates:
+        List of candidates in the race. These should match the candidates in
+        the state polling averages.
+    :param primary_calendar:
+        List of PrimaryDate objects in chronological order, forming a calendar
+        containing every primary and caucus in the primary process.
+    :param num_sims:
+        The number of simulations to run.
+    :param rng:
+        The numpy.random.Generator to draw random numbers from. If None, the
+        global numpy.random state is used.
+    :return results:
+        A BatchSimulationResults object storing the results of every
+        simulation.
+
+    """
+    final_delegates = numpy.zeros((num_sims, len(candidates)), dtype=int)
+    chunks = simulate_chunks(db, base_nat_environment, candidates,
+                             primary_calendar, num_sims, rng)
+    for start, chunk in chunks:
+        final_delegates[start:start + len(chunk)] = chunk
+
+    return database.BatchSimulationResults(candidates, final_delegates)
+
+def summarise_batch(db, base_nat_environment, candidates, primary_calendar,
+                    num_sims, rng=None, summary=None, store=None):
+    """
+    Simulates the 2020 Democratic Primary num_sims times as in simulate_batch,
+    adding each chunk of simulations to a summary instead of keeping every
+    result.
+
+    :param db:
+        The database object storing the data. It is not modified.
+    :param base_nat_environment:
+        CandidateVector, or dict with a "confidence" key, of candidates'
+        standings in national polls.
+    :param candidates:
+        List of candidates in the race.
+    :param primary_calendar:
+        List of PrimaryDate objects in chronological order.
+    :param num_sims:
+        The number of simulations to run.
+    :param rng:
+        The numpy.random.Generator to draw random numbers from. If None, the
+        global numpy.random state is used.
+    :param summary:
+        The SimulationSummary object to add the results to. If None, a new
+        summary is created.
+    :param store:
+        An OutcomeWriter object to write the outcome of every simulation to,
+        or None to only keep the summary.
+    :return summary:
+        The SimulationSummary object containing the results.
+
+    """
+    if summary is None:
+        summary = database.SimulationSummary(candidates)
+    chunks = simulate_chunks(db, base_nat_environment, candidates,
+                             primary_calendar, num_sims, rng)
+    for start, chunk in chunks:
+        summary.add_final_delegates(chunk)
+        if store is not None:
+            store.add_final_delegates(chunk)
+
+    return summary
+
+def simulate_chunks(db, base_nat_environment, candidates, primary_calendar,
+                    num_sims, rng=None):
+    """
+    Simulates the primary num_sims times in chunks of at most CHUNK_SIZE
+    simulations, to limit memory use.
+
+    :param db:
+        The database object storing the data.
+    :param base_nat_environment:
+        CandidateVector, or dict with a "confidence" key, of candidates'
+        standings in national polls.
+    :param candidates:
+        List of candidates in the race.
+    :param primary_calendar:
+        List of PrimaryDate objects in chronological order.
+    :param num_sims:
+        The number of simulations to run.
+    :param rng:
+        The numpy.random.Generator to draw random numbers from. If None, the
+        global numpy.random state is used.
+    :return chunks:
+        Generator yielding the index of the first simulation in each chunk and
+        the integer array of the chunk's final delegate counts.
+
+    """
+    if len(candidates) == 0:
+        raise ValueError("No candidates provided.")
+    base_nat_environment = database.as_candidate_vector(base_nat_environment)
+    if numpy.any(base_nat_environment.values < 0):
+        raise ValueError("Candidates cannot have negative support.")
+    if num_sims <= 0:
+        raise ValueError("Number of simulations must be positive.")
+    if rng is None:
+        rng = numpy.random
+
+    # Convert the parts of the database used by every simulation to arrays.
+    state_names = list(db.get_states_dict())
+    polling = numpy.zeros((len(state_names), len(candidates)))
+    confidence = numpy.zeros(len(state_names))
+    for i in range(len(state_names)):
+        state_polling = db.get_state(state_names[i]).get_primary_polling()
+        confidence[i] = state_polling.confidence
+        polling[i] = state_polling.take(candidates).values
+    neighbours = ss.comparison_neighbours(db, state_names)
+
+    # Simulate each chunk only when it is asked for.
+    chunks = ((start, simulate_chunk(db, base_nat_environment, candidates,
+                                     primary_calendar,
+                                     min(CHUNK_SIZE, num_sims - start),
+                                     state_names, polling, confidence,
+                                     neighbours, rng))
+              for start in range(0, num_sims, CHUNK_SIZE))
+
+    return chunks
+
+def simulate_chunk(db, base_nat_environment, candidates, primary_calendar,
+                   num_sims, state_names, polling, confidence, neighbours,
+                   rng):
+    """
+    Simulates the primary num_sims times, holding every simulation in memory.
+
+    :param db:
+        The database object storing the data.
+    :param base_nat_environment:
+        CandidateVector of candidates' standings in national polls.
+    :param candidates:
+        List of candidates in the race.
+    :param primary_calendar:
+        List of PrimaryDate objects in chronological order.
+    :param num_sims:
+        The number of simulations to run.
+    :param state_names:
+        List of state names giving the order of the state axis of the arrays.
+    :param polling:
+        Array of each state's polling average for each candidate.
+    :param confidence:
+        Array of the confidence in each state's polling average.
+    :param neighbours:
+        List of the positions and weights of the states used to infer support
+        in each state, as returned by ss.comparison_neighbours.
+    :param rng:
+        The numpy.random.Generator, or the numpy.random module, to draw random
+        numbers from.
+    :return total_delegates:
+        Integer array of each candidate's final delegate count in each
+        simulation.
+
+    """
+    state_index = {}
+    for i in range(len(state_names)):
+        state_index[state_names[i]] = i
+
+    # Draw the national environment for every simulation.
+    base_nat = base_nat_environment.take(candidates).values
+    standard_deviation = vp.get_standard_deviation(
+        0, base_nat_environment.confidence)
+    nat_environment = rng.normal(base_nat, standard_deviation,
+                                 (num_sims, len(candidates)))
+    nat_environment = rebalance_rows(nat_environment)
+    nat_environment = rebalance_rows(numpy.maximum(nat_environment, 0))
+
+    # Each simulation keeps its own confidence-weighted polling for every
+    # state, as states are overwritten with results once they have voted.
+    weighted_polling = numpy.repeat(
+        (confidence[:, None]*polling)[:, None, :], num_sims, axis=1)
+    sim_confidence = numpy.repeat(confidence[:, None], num_sims, axis=1)
+    total_delegates = numpy.zeros((num_sims, len(candidates)), dtype=int)
+
+    # Track the candidates still in the race in each simulation. The arrays
+    # only keep the columns of candidates still in at least one simulation,
+    # in the order of columns.
+    columns = numpy.arange(len(candidates))
+    active = numpy.ones((num_sims, len(candidates)), dtype=bool)
+    all_active = True
+
+    today = db.get_as_of_date()
+    for primary_date in primary_calendar:
+        for state_name in primary_date.get_primaries():
+            i = state_index[state_name]
+            state = db.get_state(state_name)
+
+            # Apply the national environment of each simulation to the state
+            # polls.
+            state_environment = polling[i] + nat_environment - base_nat
+
+            # Adjust the result to account for state similarities, except in
+            # simulations where no similar state has any data.
+            positions, weights = neighbours[i]
+            total_weight = (weights @ sim_confidence[positions])[:, None]
+            has_data = total_weight > 0
+            inferred_support = (numpy.tensordot(weights,
+                                                weighted_polling[positions],
+                                                axes=1)/
+                                numpy.where(has_data, total_weight, 1))
+            state_environment = numpy.where(
+                has_data,
+                (confidence[i]*state_environment +
+                 ss.INFERRED_WEIGHT*inferred_support)/
+                (ss.INFERRED_WEIGHT + confidence[i]),
+                state_environment)
+
+            # Apply random variation to the state results.
+            days_left = (today - state.get_date())/datetime.timedelta(days=1)
+            if days_left < 0:
+                days_left = 0
+            standard_deviation = vp.get_standard_deviation(days_left,
+                                                           confidence[i])
+            result = rng.normal(state_environment, standard_deviation)
+            if not all_active:
+                result = numpy.where(active, result, 0)
+            result = rebalance_rows(result)
+            result = rebalance_rows(numpy.maximum(result, 0))
+
+            # Save the result, which has confidence 1.
+            weighted_polling[i] = result
+            sim_confidence[i] = 1
+
+            total_delegates[:, columns] += vp.allocate_delegates(
+                result, state.get_delegates())
+
+        # Poorly placed candidates lose support as voters make tactical choices.
+        # Candidates who have dropped out are ranked last.
+        active_delegates = numpy.where(active, total_delegates[:, columns], 0)
+        nat_environment = primary_tactical_voting(
+            nat_environment, numpy.where(active, active_delegates, -1))
+
+        # Candidates left with too little support and too few delegates drop
+        # out, sharing their support between the rest.
+        viable = vp.find_viable(nat_environment, active_delegates)
+        if numpy.any(active & ~viable):
+            active = active & viable
+            all_active = False
+            nat_environment = rebalance_rows(numpy.where(active,
+                                                         nat_environment, 0))
+
+            # Remove the columns of candidates out of every simulation.
+            keep = active.any(axis=0)
+            if not keep.all():
+                columns = columns[keep]
+                active = active[:, keep]
+                nat_environment = nat_environment[:, keep]
+                polling = polling[:, keep]
+                base_nat = base_nat[keep]
+                weighted_polling = weighted_polling[:, :, keep]
+
+    return total_delegates
+
+def rebalance_rows(polling):
+    """
+    Rebalances each row of an array of support levels to add to 100.
+
+    :param polling:
+        Array with one row per simulation and one column per candidate.
+    :return polling:
+        The rebalanced array.
+
+    """
+    totals = polling.sum(axis=1)
+    assert numpy.all(totals != 0), "No support detected - divide by zero error."
+    return polling/(totals[:, None]/100)
+
+def primary_tactical_voting(nat_environment, total_delegates):
+    """
+    Models supporters of candidates doing poorly switching their support to
+    candidates with a better chance of winning, as in
+    vp.primary_tactical_voting.
+
+    :param nat_environment:
+        Array of each candidate's national support in each simulation.
+    :param total_delegates:
+        Array of each candidate's current delegate count in each simulation.
+    :return nat_environment:
+        The adjusted national support levels.
+
+    """
+    tac_coeffs = numpy.array(vp.TAC_COEFFS)
+    nat_environment = nat_environment*tac_coeffs[get_ranks(total_delegates)]
+    return rebalance_rows(nat_environment)
+
+def get_ranks(values):
+    """
+    Ranks the candidates in each row in descending order, with ties keeping
+    the order of the candidates list as sorted() does.
+
+    :param values:
+        Array with one row per simulation and one column per candidate.
+    :return ranks:
+        Integer array giving the position of each candidate in their row's
+        leaderboard, with 0 for the leader.
+
+    """
+    order = numpy.argsort(-values, axis=1, kind="stable")
+    ranks = numpy.empty_like(order)
+    rows = numpy.arange(len(values))[:, None]
+    ranks[rows, order] = numpy.arange(values.shape[1])
+    return ranks
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""Runs simulations of the 2020 Democratic Primary over a pool of processes."""
+
+import concurrent.futures
+import numpy
+import database
+import simulate.primary_simulation as ps
+import simulate.profiling as profiling
+import simulate.sampling as sampling
+
+# Define constants.
+CHUNK_SIZE = 50
+
+# The snapshot used by simulations in a worker process, set when the worker
+# starts so it is only sent to each process once.
+worker_snapshot = None
+
+def run_simulations(snapshot, num_sims, seed=None, workers=None,
+                    chunk_size=CHUNK_SIZE, store=None, profiler=None,
+                    sampler="random", candidate=None,
+                    tilt=sampling.IMPORTANCE_TILT,
+                    bit_generator=sampling.BIT_GENERATOR, executor=None):
+    """
+    Runs simulations in chunks over a pool of processes.
+
+    Each chunk draws its random numbers in blocks from its own
+    numpy.random.Generator, seeded from a SeedSequence spawned from seed.
+    Chunks do not depend on the number of workers, so the same seed gives the
+    same results however many processes are used.
+
+    :param snapshot:
+        The ModelSnapshot object containing the model.
+    :param num_sims:
+        The number of simulations to run.
+    :param seed:
+        Integer seed or numpy.random.SeedSequence for the random numbers, or
+        None for a random seed.
+    :param workers:
+        The number of processes to use. If None, one is used per CPU. If 1,
+        the simulations run in this process.
+    :param chunk_size:
+        The number of simulations in each chunk.
+    :param store:
+        An OutcomeWriter object to write the outcome of every simulation to,
+        in order, or None to only keep the summary.
+    :param profiler:
+        The StageProfiler object to add the time taken by each stage in every
+        process to. If None, stages are only timed if
+        profiling.ENVIRONMENT_VARIABLE turns profiling on.
+    :param sampler:
+        The name of the sampler giving the random draws, from
+        sampling.SAMPLERS. Sobol chunks use consecutive parts of one
+        sequence, and antithetic pairs are kept within chunks.
+    :param candidate:
+        The name of the candidate the importance sampler favours.
+    :param tilt:
+        The number of standard deviations the importance sampler moves their
+        national support by.
+    :param bit_generator:
+        The name of the bit generator to draw random numbers with, from
+        sampling.BIT_GENERATORS.
+    :param executor:
+        A pool from make_executor for the same snapshot to run the chunks
+        on, so repeated calls reuse its processes, or None to start a pool
+        for this call. If given, workers is ignored.
+    :return summary:
+        A SimulationSummary object containing the results of every
+        simulation, which is the same whatever the number of workers.
+
+    """
+    if num_sims <= 0:
+        raise ValueError("Number of simulations must be positive.")
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive.")
+    if sampler not in sampling.SAMPLERS:
+        raise ValueError("Unknown sampler: {}".format(sampler))
+    if (sampler == "importance" and
+            candidate not in snapshot.get_primary_candidates()):
+        raise ValueError("Importance sampling needs a candidate in the race.")
+    if bit_generator not in sampling.BIT_GENERATORS:
+        raise ValueError("Unknown bit generator: {}".format(bit_generator))
+
+    # Split the simulations into chunks, each with its own random stream.
+    chunk_sizes = []
+    starts = []
+    for start in range(0, num_sims, chunk_size):
+        chunk_sizes.append(min(chunk_size, num_sims - start))
+        starts.append(start)
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+
+    # Every chunk scrambles the Sobol sequence in the same way, so the
+    # results do not depend on the number of chunks.
+    sampler_seed = None
+    if sampler == "sobol":
+        sampler_seed = seed.spawn(1)[0]
+    seeds = seed.spawn(len(chunk_sizes))
+    samplers = [sampler]*len(chunk_sizes)
+    sampler_seeds = [sampler_seed]*len(chunk_sizes)
+    tilt_candidates = [candidate]*len(chunk_sizes)
+    tilts = [tilt]*len(chunk_sizes)
+    bit_generators = [bit_generator]*len(chunk_sizes)
+
+    # Each chunk times its stages with its own profiler if profiling is on.
+    profiler = profiling.get_profiler(profiler)
+    profile = [profiler.enabled]*len(chunk_sizes)
+    chunk_args = (chunk_sizes, seeds, profile, samplers, starts,
+                  sampler_seeds, tilt_candidates, tilts, bit_generators)
+    candidates = snapshot.get_primary_candidates()
+
+    if executor is not None:
+        chunks = executor.map(simulate_chunk, *chunk_args)
+        summary = merge_chunks(chunks, candidates, store, profiler)
+    elif workers == 1:
+        set_worker_snapshot(snapshot)
+        chunks = map(simulate_chunk, *chunk_args)
+        summary = merge_chunks(chunks, candidates, store, profiler)
+    else:
+        with make_executor(snapshot, workers) as executor:
+            chunks = executor.map(simulate_chunk, *chunk_args)
+            summary = merge_chunks(chunks, candidates, store, profiler)
+
+    return summary
+
+def make_executor(snapshot, workers=None):
+    """
+    Starts a pool of processes that each hold a copy of the snapshot, so it
+    is only sent to each process once however many times the pool is used.
+
+    :param snapshot:
+        The ModelSnapshot object containing the model.
+    :param workers:
+        The number of processes to use. If None, one is used per CPU.
+    :return executor:
+        The concurrent.futures.ProcessPoolExecutor object, which should be
+        shut down once finished with.
+
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=set_worker_snapshot,
+        initargs=(snapshot,))
+
+def set_worker_snapshot(snapshot):
+    """
+    Stores the snapshot to be used by simulations in this process.
+
+    :param snapshot:
+        The ModelSnapshot object containing the model.
+
+    """
+    global worker_snapshot
+    worker_snapshot = snapshot
+
+def simulate_chunk(num_sims, seed, profile=False, sampler="random", start=0,
+                   sampler_seed=None, candidate=None,
+                   tilt=sampling.IMPORTANCE_TILT,
+                   bit_generator=sampling.BIT_GENERATOR):
+    """
+    Runs a chunk of simulations on the snapshot stored in this process.
+
+    :param num_sims:
+        The number of simulations to run.
+    :param seed:
+        The numpy.random.SeedSequence to seed the chunk's random numbers with.
+    :param profile:
+        Whether to time the stages of the simulations.
+    :param sampler:
+        The name of the sampler giving the random draws, from
+        sampling.SAMPLERS.
+    :param start:
+        The index of the chunk's first simulation, giving its first Sobol
+        point.
+    :param sampler_seed:
+        The numpy.random.SeedSequence to scramble the Sobol sequence with.
+    :param candidate:
+        The name of the candidate the importance sampler favours.
+    :param tilt:
+        The number of standard deviations the importance sampler moves their
+        national support by.
+    :param bit_generator:
+        The name of the bit generator to draw random numbers with.
+    :return final_delegates:
+        Integer array of each candidate's final delegate count in each
+        simulation.
+    :return weights:
+        Array of the likelihood ratio weight of each simulation, all 1 unless
+        importance sampling.
+    :return profiler:
+        The StageProfiler object timing the chunk, or profiling.DISABLED.
+
+    """
+    # Draw the chunk's random numbers in blocks, as the simulations make many
+    # small draws.
+    rng = sampling.BlockSampler(sampling.make_generator(
+        seed, bit_generator=bit_generator))
+    base_nat_environment = worker_snapshot.get_nat_primary_environment()
+    candidates = worker_snapshot.get_primary_candidates()
+    primary_calendar = worker_snapshot.get_primary_calendar()
+    rng = sampling.make_sampler(sampler, base_nat_environment.candidates,
+                                primary_calendar, rng, sampler_seed, start,
+                                candidate, tilt)
+
+    # Collect the chunk's delegate counts so they are summarised at once by
+    # the parent process, which keeps what is sent back small.
+    profiler = profiling.DISABLED
+    if profile:
+        profiler = profiling.StageProfiler()
+    final_delegates = numpy.zeros((num_sims, len(candidates)), dtype=int)
+    weights = numpy.ones(num_sims)
+    for simulation in range(num_sims):
+        result = ps.simulate(worker_snapshot.new_run(), base_nat_environment,
+                             candidates, primary_calendar, rng, profiler)
+        final_delegates[simulation] = [result.final_delegates[name]
+                                       for name in candidates]
+        if isinstance(rng, sampling.Sampler):
+            weights[simulation] = rng.get_weight()
+
+    return final_delegates, weights, profiler
+
+def merge_chunks(chunks, candidates, store=None, profiler=None):
+    """
+    Summarises chunks of simulations as they finish.
+
+    :param chunks:
+        Iterable of the final delegate counts, weights and profilers returned
+        by simulate_chunk.
+    :param candidates:
+        List of candidates in the race.
+    :param store:
+        An OutcomeWriter object to write each chunk's outcomes to, or None.
+    :param profiler:
+        The StageProfiler object to add each chunk's timings to, or None.
+    :return summary:
+        A single SimulationSummary object containing every result.
+
+    """
+    summary = database.SimulationSummary(candidates)
+    for final_delegates, weights, chunk_profiler in chunks:
+        summary.add_final_delegates(final_delegates, weights)
+        if store is not None:
+            store.add_final_delegates(final_delegates)
+        if profiler is not None:
+            profiler.merge(chunk_profiler)
+    return summary
\ No newline at end of file
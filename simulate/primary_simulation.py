@@ -1,20 +1,36 @@
 """Main file carrying out a simulation of the 2020 Democratic Primary."""
 
 import datetime
+import numpy
 import simulate.voting_patterns as vp
+import simulate.state_similarities as ss
+import simulate.profiling as profiling
+import simulate.sampling as sampling
 import database
 
-def simulate(db, base_nat_environment, candidates, primary_calendar):
+def simulate(db, base_nat_environment, candidates, primary_calendar,
+             rng=None, profiler=None):
     """
     Simulates the 2020 Democratic Primary.
 
     :param base_nat_environment:
-        Dict keying candidate names to their standings in national polls.
+        CandidateVector, or dict with a "confidence" key, of candidates'
+        standings in national polls.
     :param candidates:
-        List of candidates in the race.
+        List of candidates in the race. Candidates who fall below
+        vp.VIABILITY_FLOOR after a primary date drop out, and later dates
+        only simulate the candidates left.
     :primary_calendar:
         List of PrimaryDate objects in chronological order, forming a calendar
         containing every primary and caucus in the primary process.
+    :param rng:
+        The numpy.random.Generator to draw random numbers from, or a
+        sampling.Sampler object, which is moved on to the next simulation.
+        If None, the global numpy.random state is used.
+    :param profiler:
+        The StageProfiler object to record the time taken by each stage in. If
+        None, a profiler is only used if profiling.ENVIRONMENT_VARIABLE turns
+        profiling on.
     :return result_object:
         A PrimarySimulationResults object storing various information about the
         results of the simulation.
@@ -22,45 +38,88 @@ def simulate(db, base_nat_environment, candidates, primary_calendar):
     """
     if len(candidates) == 0:
         raise ValueError("No candidates provided.")
-    for candidate in base_nat_environment:
-        if base_nat_environment[candidate] < 0:
-            raise ValueError("Candidates cannot have negative support.")
+    base_nat_environment = database.as_candidate_vector(base_nat_environment)
+    if numpy.any(base_nat_environment.values < 0):
+        raise ValueError("Candidates cannot have negative support.")
+
+    profiler = profiling.get_profiler(profiler)
+    profiler.set_primary_date(None)
+    if isinstance(rng, sampling.Sampler):
+        rng.start_run()
 
     # Set up variables specific to this simulation.
     result_object = database.PrimarySimulationResults()
-    nat_environment = vp.random_variation(base_nat_environment, 0)
-    total_delegates = {}
+    with profiler.stage("national_draw"):
+        nat_environment = vp.random_variation(base_nat_environment.copy(), 0,
+                                              rng)
 
-    # Make sure no values in nat_environment are below zero.
-    for candidate in nat_environment:
-        if nat_environment[candidate] < 0:
-            nat_environment[candidate] = 0
-    nat_environment = vp.rebalance(nat_environment)
+        # Make sure no values in nat_environment are below zero.
+        nat_environment.clip(0)
+        nat_environment = vp.rebalance(nat_environment)
+    total_delegates = database.CandidateVector(candidates)
+    active = tuple(candidates)
 
-    for candidate in candidates:
-        total_delegates[candidate] = 0
+    # Keep running totals of state polling used to infer support from similar
+    # states, updating them as each state votes.
+    with profiler.stage("comparison_setup"):
+        comparison_totals = ss.ComparisonTotals(db,
+                                                db.get_primary_candidates())
 
     for primary_date in primary_calendar:
+        profiler.set_primary_date(primary_date.date)
         primaries = primary_date.get_primaries()
+        results = []
+        num_delegates = []
         for state_name in primaries:
             state = db.get_state(state_name)
             result = state.get_raw_primary_result(nat_environment,
                                                   base_nat_environment,
-                                                  candidates, db)
+                                                  active, db, rng,
+                                                  comparison_totals, profiler)
 
             # Save the result in the database.
-            state.primary_polling = result
+            with profiler.stage("comparison_update"):
+                state.primary_polling = result
+                comparison_totals.update(state_name, result)
+
+            results.append(result)
+            num_delegates.append(state.get_delegates())
 
-            # Convert the result to delegates and add to delegate totals.
-            delegates = state.distribute_delegates(result)
-            for candidate in candidates:
-                total_delegates[candidate] = (total_delegates[candidate] + 
-                                              delegates[candidate])
+        # Convert the day's results to delegates in one call, as the delegate
+        # totals are not used until every state on the date has voted, and
+        # add them to the delegate totals.
+        with profiler.stage("delegate_allocation"):
+            if results != []:
+                result_candidates = results[0].candidates
+                delegates = vp.allocate_delegates(
+                    [result.take(result_candidates).values
+                     for result in results], num_delegates)
+                delegates = database.CandidateVector(result_candidates,
+                                                     delegates.sum(axis=0))
+                total_delegates.add(delegates)
 
-        # Poorly placed candidates lose support as voters make tactical choices.
-        nat_environment = vp.primary_tactical_voting(nat_environment, total_delegates)
+        # Poorly placed candidates lose support to tactical voting, and
+        # candidates left with too little support and too few delegates drop
+        # out, sharing their support between the rest.
+        with profiler.stage("tactical_voting"):
+            active_delegates = total_delegates.take(active)
+            nat_environment = vp.primary_tactical_voting(nat_environment,
+                                                         active_delegates)
+            active_support = nat_environment.take(active).values
+            if active_support.min() < vp.VIABILITY_FLOOR:
+                viable = vp.find_viable(active_support,
+                                        active_delegates.values)
+            else:
+                viable = numpy.ones(len(active), dtype=bool)
+            if not viable.all():
+                active = tuple([active[j] for j in range(len(active))
+                                if viable[j]])
+                nat_environment = vp.rebalance(nat_environment.take(active))
+                base_nat_environment = base_nat_environment.take(active)
+    profiler.set_primary_date(None)
 
     # Add data regarding the final delegate total to the results object.
-    result_object.add_final_delegates(total_delegates)
+    final_delegates = total_delegates.values.astype(int).tolist()
+    result_object.add_final_delegates(dict(zip(candidates, final_delegates)))
 
     return result_object
@@ -0,0 +1,215 @@
+"""Records how long each stage of a simulation of the primary takes."""
+
+import os
+import time
+import contextlib
+
+# Define constants.
+# Setting this environment variable to anything other than "" or "0" turns
+# profiling on for runs that are not given a profiler.
+ENVIRONMENT_VARIABLE = "PRIMARY_PROFILE"
+
+# The profiler shared by runs enabled through the environment variable.
+environment_profiler = None
+
+class StageProfiler:
+    """Records the cumulative time and number of calls of each stage."""
+    enabled = True
+
+    def __init__(self):
+        """Creates a new profiler with no stages recorded."""
+        # Each stage, and each primary date and stage, is keyed to a list of
+        # its total time in seconds and its number of calls.
+        self.stages = {}
+        self.dates = {}
+        self.primary_date = None
+
+    def stage(self, name):
+        """
+        Times a stage of the simulation, for use in a with statement.
+
+        :param name:
+            The name of the stage.
+        :return timer:
+            A StageTimer object recording the stage when it exits.
+
+        """
+        return StageTimer(self, name)
+
+    def set_primary_date(self, primary_date):
+        """
+        Sets the primary date stages are currently recorded against.
+
+        :param primary_date:
+            The date of the PrimaryDate being simulated, or None for stages
+            that do not belong to a date.
+
+        """
+        self.primary_date = primary_date
+
+    def record(self, name, elapsed):
+        """
+        Adds a call of a stage to the totals.
+
+        :param name:
+            The name of the stage.
+        :param elapsed:
+            The time the call took in seconds.
+
+        """
+        add_call(self.stages, name, elapsed, 1)
+        if self.primary_date is not None:
+            add_call(self.dates, (self.primary_date, name), elapsed, 1)
+
+    def merge(self, other):
+        """
+        Adds the totals of another profiler, such as one from another
+        process, to this one.
+
+        :param other:
+            The StageProfiler object to merge in.
+        :return self:
+            The profiler.
+
+        """
+        for name in other.stages:
+            add_call(self.stages, name, *other.stages[name])
+        for key in other.dates:
+            add_call(self.dates, key, *other.dates[key])
+        return self
+
+    def get_table(self):
+        """
+        Creates a table of the time spent in each stage, then on each primary
+        date.
+
+        :return table:
+            String containing the table.
+
+        """
+        total_time = sum(total for total, calls in self.stages.values())
+        lines = ["{:<28} {:>10} {:>12} {:>12} {:>7}".format(
+            "Stage", "Calls", "Total (s)", "Mean (us)", "%")]
+        order = sorted(self.stages, key=lambda name: -self.stages[name][0])
+        for name in order:
+            total, calls = self.stages[name]
+            lines.append("{:<28} {:>10} {:>12.4f} {:>12.2f} {:>7.1f}".format(
+                name, calls, total, 1e6*total/calls,
+                100*total/total_time if total_time > 0 else 0))
+
+        # Add up the stages on each date.
+        date_totals = {}
+        for primary_date, name in self.dates:
+            total, calls = self.dates[(primary_date, name)]
+            add_call(date_totals, primary_date, total, calls)
+        if date_totals != {}:
+            lines.append("")
+            lines.append("{:<28} {:>10} {:>12} {:>12} {:>7}".format(
+                "Primary date", "Calls", "Total (s)", "Mean (us)", "%"))
+        for primary_date in sorted(date_totals):
+            total, calls = date_totals[primary_date]
+            lines.append("{:<28} {:>10} {:>12.4f} {:>12.2f} {:>7.1f}".format(
+                str(primary_date), calls, total, 1e6*total/calls,
+                100*total/total_time if total_time > 0 else 0))
+
+        return "\n".join(lines)
+
+    def report(self):
+        """Prints the breakdown table."""
+        print(self.get_table())
+
+class StageTimer:
+    """Times one call of a stage for a StageProfiler."""
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        """
+        Creates a timer for a stage.
+
+        :param profiler:
+            The StageProfiler object to record the call in.
+        :param name:
+            The name of the stage.
+
+        """
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        """Starts timing."""
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stops timing and records the call."""
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+class DisabledProfiler:
+    """Stands in for a StageProfiler, doing as little as possible."""
+    enabled = False
+    timer = contextlib.nullcontext()
+
+    def stage(self, name):
+        """Returns a timer which does nothing."""
+        return self.timer
+
+    def set_primary_date(self, primary_date):
+        """Ignores the primary date."""
+
+    def merge(self, other):
+        """Ignores the other profiler."""
+        return self
+
+# The profiler used when profiling is off.
+DISABLED = DisabledProfiler()
+
+def add_call(totals, key, elapsed, calls):
+    """
+    Adds time and calls to the totals for a key.
+
+    :param totals:
+        Dict keying stages or dates to a list of their total time and number
+        of calls.
+    :param key:
+        The key to add to.
+    :param elapsed:
+        The time to add in seconds.
+    :param calls:
+        The number of calls to add.
+
+    """
+    if key in totals:
+        totals[key][0] = totals[key][0] + elapsed
+        totals[key][1] = totals[key][1] + calls
+    else:
+        totals[key] = [elapsed, calls]
+
+def enabled_by_environment():
+    """
+    Checks whether profiling has been turned on with ENVIRONMENT_VARIABLE.
+
+    :return enabled:
+        Whether the environment variable is set to turn profiling on.
+
+    """
+    return os.environ.get(ENVIRONMENT_VARIABLE, "") not in ["", "0"]
+
+def get_profiler(profiler=None):
+    """
+    Finds the profiler a run should use.
+
+    :param profiler:
+        The StageProfiler object passed to the run, if any.
+    :return profiler:
+        The given profiler if there is one. Otherwise a profiler shared by
+        every run if ENVIRONMENT_VARIABLE turns profiling on, or DISABLED.
+
+    """
+    global environment_profiler
+    if profiler is not None:
+        return profiler
+    if not enabled_by_environment():
+        return DISABLED
+    if environment_profiler is None:
+        environment_profiler = StageProfiler()
+    return environment_profiler
\ No newline at end of file
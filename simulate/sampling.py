@@ -0,0 +1,439 @@
+"""Samplers supplying the normal random draws of the simulations, either
+cheaply in blocks or so that fewer simulations are needed for the same
+precision."""
+
+import numpy
+import scipy.stats
+import scipy.stats.qmc
+
+# Define constants.
+SAMPLERS = ["random", "antithetic", "sobol", "importance"]
+# Number of standard deviations the importance sampler moves the chosen
+# candidate's national support by.
+IMPORTANCE_TILT = 2
+# The bit generators random numbers can be drawn with, and the default.
+BIT_GENERATORS = {"PCG64":numpy.random.PCG64, "Philox":numpy.random.Philox}
+BIT_GENERATOR = "PCG64"
+# Number of standard normal values drawn at once by a BlockSampler.
+NORMAL_BLOCK_SIZE = 65536
+# Number of bits in each coordinate of a Sobol point.
+SOBOL_BITS = 30
+# Number of Sobol points generated at once.
+BLOCK_SIZE = 256
+
+class Sampler:
+    """
+    Base class of objects which stand in for a numpy.random.Generator, giving
+    the normal draws of each simulation. ps.simulate calls start_run at the
+    start of every simulation. Subclasses set rng to the generator they draw
+    from.
+
+    """
+    def start_run(self):
+        """Moves on to the next simulation, which changes nothing."""
+
+    def standard_normal(self, size=None):
+        """
+        Draws standard normal values.
+
+        :param size:
+            The shape of the array to draw, or None for a single value.
+        :return draws:
+            Array of standard normal values.
+
+        """
+        return self.rng.standard_normal(size)
+
+    def get_weight(self):
+        """
+        Retrieves the likelihood ratio of the current simulation's draws,
+        which is the weight it is given in the results.
+
+        :return weight:
+            The weight, which is 1 unless the sampler changes the
+            distribution of the draws.
+
+        """
+        return 1.0
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        """
+        Draws normal values, as numpy.random.Generator.normal does.
+
+        :param loc:
+            The mean of each value.
+        :param scale:
+            The standard deviation of each value.
+        :param size:
+            The shape of the array to draw. If None, the shape of loc and
+            scale broadcast together is used.
+        :return draws:
+            Array of normal values.
+
+        """
+        if size is None:
+            size = numpy.broadcast(loc, scale).shape
+        return loc + scale*self.standard_normal(size)
+
+class BlockSampler(Sampler):
+    """
+    Draws standard normal values from a numpy.random.Generator a block at a
+    time and hands out consecutive slices of the block, as one array draw
+    costs far less than many small draws.
+
+    """
+    def __init__(self, rng=None, block_size=NORMAL_BLOCK_SIZE):
+        """
+        Creates a sampler.
+
+        :param rng:
+            The numpy.random.Generator to draw the blocks from, such as one
+            returned by make_generator. If None, a randomly seeded
+            generator is used.
+        :param block_size:
+            The number of values in each block.
+
+        """
+        if block_size <= 0:
+            raise ValueError("Block size must be positive.")
+        if rng is None:
+            rng = make_generator()
+        self.rng = rng
+        self.block_size = block_size
+        self.block = numpy.zeros(0)
+        self.position = 0
+
+    def standard_normal(self, size=None):
+        """
+        Hands out the next standard normal values of the block, drawing a
+        new block once it runs out.
+
+        :param size:
+            The shape of the array to draw, or None for a single value.
+        :return draws:
+            Array of standard normal values. Later draws do not change it.
+
+        """
+        if size is None:
+            shape = ()
+            num_draws = 1
+        elif isinstance(size, (tuple, list)):
+            shape = tuple(size)
+            num_draws = 1
+            for length in shape:
+                num_draws *= length
+        else:
+            shape = (size,)
+            num_draws = size
+        if self.position + num_draws > len(self.block):
+            # A new array is drawn, rather than filling the old one, so that
+            # values already handed out are kept.
+            self.block = self.rng.standard_normal(max(self.block_size,
+                                                      num_draws))
+            self.position = 0
+        draws = self.block[self.position:self.position + num_draws]
+        self.position += num_draws
+        return draws.reshape(shape)
+
+class AntitheticSampler(Sampler):
+    """
+    Pairs the simulations, so the second of each pair makes the negatives of
+    the draws of the first. Draws are matched by the order they are made in,
+    and any draw the first simulation did not make is drawn at random.
+
+    """
+    def __init__(self, rng=None):
+        """
+        Creates a sampler.
+
+        :param rng:
+            The numpy.random.Generator to draw the first simulation of each
+            pair from. If None, the global numpy.random state is used.
+
+        """
+        if rng is None:
+            rng = numpy.random
+        self.rng = rng
+        # Simulations before the first call of start_run are not paired.
+        self.run = -1
+        self.draws = []
+        self.position = 0
+
+    def start_run(self):
+        """Moves on to the next simulation."""
+        self.run += 1
+        self.position = 0
+        if self.run % 2 == 0:
+            self.draws = []
+
+    def standard_normal(self, size=None):
+        """
+        Draws standard normal values.
+
+        :param size:
+            The shape of the array to draw, or None for a single value.
+        :return draws:
+            Array of standard normal values.
+
+        """
+        shape = () if size is None else size
+        num_draws = int(numpy.prod(shape))
+        if self.run % 2 == 0:
+            draws = self.rng.standard_normal(num_draws)
+            self.draws.append(draws)
+        else:
+            # Mirror the matching draws of the first simulation of the pair,
+            # drawing any more at random.
+            draws = self.rng.standard_normal(num_draws)
+            if self.position < len(self.draws):
+                mirrored = self.draws[self.position][:num_draws]
+                draws[:len(mirrored)] = -mirrored
+        self.position += 1
+        return draws.reshape(shape)
+
+class QuasiRandomSampler(Sampler):
+    """
+    Gives each simulation a point of a scrambled Sobol sequence from
+    scipy.stats.qmc.Sobol, which uses Joe and Kuo's direction numbers in up
+    to 21201 dimensions, converted to normal draws with the inverse normal
+    CDF. The nth draw a simulation makes uses the dimensions from
+    n*draw_size, so each draw keeps the same dimensions in every simulation.
+    Draws beyond the dimensions of the points are drawn at random.
+
+    """
+    def __init__(self, num_draws, draw_size, seed=None, start=0, rng=None,
+                 block_size=BLOCK_SIZE):
+        """
+        Creates a sampler.
+
+        :param num_draws:
+            The number of draws made by each simulation.
+        :param draw_size:
+            The largest number of values in a draw, such as the number of
+            candidates.
+        :param seed:
+            Integer seed or numpy.random.SeedSequence for the scrambling, or
+            None for a random seed. Samplers with the same seed use the same
+            sequence, so different parts of it can be used in parallel.
+        :param start:
+            The index of the first point to use.
+        :param rng:
+            The numpy.random.Generator to draw values beyond the points
+            from. If None, the global numpy.random state is used.
+        :param block_size:
+            The number of points generated at once, best a power of 2 so the
+            first block keeps the balance of the sequence.
+
+        """
+        if num_draws <= 0 or draw_size <= 0:
+            raise ValueError("Points must have at least one dimension.")
+        if start < 0:
+            raise ValueError("First point cannot be negative.")
+        if block_size <= 0:
+            raise ValueError("Block size must be positive.")
+        if rng is None:
+            rng = numpy.random
+        self.num_draws = num_draws
+        self.draw_size = draw_size
+        self.rng = rng
+        self.block_size = block_size
+
+        # The engine is given an integer seed, as it spawns from a generator
+        # it is given, which would change a shared SeedSequence.
+        if not isinstance(seed, numpy.random.SeedSequence):
+            seed = numpy.random.SeedSequence(seed)
+        self.engine = scipy.stats.qmc.Sobol(
+            num_draws*draw_size, bits=SOBOL_BITS,
+            rng=int(seed.generate_state(1, numpy.uint64)[0]))
+        if start > 0:
+            self.engine.fast_forward(start)
+        # Simulations before the first call of start_run use random draws.
+        self.point = start - 1
+        self.start = start
+        self.block_start = None
+        self.block = None
+        self.position = 0
+
+    def start_run(self):
+        """Moves on to the next simulation."""
+        self.point += 1
+        self.position = 0
+        if (self.block_start is None or
+                self.point >= self.block_start + len(self.block)):
+            # Move each point to the middle of its cell, so no coordinate is
+            # 0 and every draw is finite.
+            self.block_start = self.point
+            points = (self.engine.random(self.block_size) +
+                      0.5/2**SOBOL_BITS)
+            self.block = scipy.stats.norm.ppf(points)
+
+    def standard_normal(self, size=None):
+        """
+        Draws standard normal values.
+
+        :param size:
+            The shape of the array to draw, or None for a single value.
+        :return draws:
+            Array of standard normal values.
+
+        """
+        shape = () if size is None else size
+        num_draws = int(numpy.prod(shape))
+        if (self.point < self.start or self.position >= self.num_draws or
+                num_draws > self.draw_size):
+            draws = self.rng.standard_normal(num_draws)
+        else:
+            first = self.position*self.draw_size
+            draws = self.block[self.point - self.block_start,
+                               first:first + num_draws]
+        self.position += 1
+        return draws.reshape(shape)
+
+class ImportanceSampler(Sampler):
+    """
+    Moves a candidate's national support up in every simulation, so that
+    outcomes which are rare for them, such as winning a majority, happen
+    more often. Each simulation is weighted by the likelihood ratio of its
+    national draw, so weighted results estimate the probabilities of the
+    unchanged model.
+
+    """
+    def __init__(self, candidates, candidate, tilt=IMPORTANCE_TILT, rng=None):
+        """
+        Creates a sampler.
+
+        :param candidates:
+            List of candidates in the order of the national environment.
+        :param candidate:
+            The name of the candidate whose support is moved.
+        :param tilt:
+            The number of standard deviations their support is moved by.
+        :param rng:
+            The numpy.random.Generator to draw from. If None, the global
+            numpy.random state is used.
+
+        """
+        if candidate not in candidates:
+            raise ValueError("Unknown candidate: {}".format(candidate))
+        if rng is None:
+            rng = numpy.random
+        self.position = list(candidates).index(candidate)
+        self.num_candidates = len(candidates)
+        self.tilt = tilt
+        self.rng = rng
+        # Draws before the first call of start_run are not moved.
+        self.draw = None
+        self.weight = 1.0
+
+    def start_run(self):
+        """Moves on to the next simulation."""
+        self.draw = 0
+        self.weight = 1.0
+
+    def standard_normal(self, size=None):
+        """
+        Draws standard normal values, moving the candidate's value in the
+        national draw, which is the first of each simulation.
+
+        :param size:
+            The shape of the array to draw, or None for a single value.
+        :return draws:
+            Array of normal values.
+
+        """
+        shape = () if size is None else size
+        draws = self.rng.standard_normal(shape)
+        if self.draw == 0:
+            if numpy.shape(draws) != (self.num_candidates,):
+                raise ValueError("National draw does not match the "
+                                 "candidates.")
+            draws[self.position] += self.tilt
+            self.weight = float(numpy.exp(
+                -self.tilt*draws[self.position] + self.tilt**2/2))
+        if self.draw is not None:
+            self.draw += 1
+        return draws
+
+    def get_weight(self):
+        """
+        Retrieves the likelihood ratio of the current simulation's national
+        draw under the unchanged model compared to the moved one.
+
+        :return weight:
+            The weight of the current simulation.
+
+        """
+        return self.weight
+
+def make_sampler(name, candidates, primary_calendar, rng=None, seed=None,
+                 start=0, candidate=None, tilt=IMPORTANCE_TILT):
+    """
+    Creates the sampler to pass to ps.simulate as its random number
+    generator.
+
+    :param name:
+        The name of the sampler, from SAMPLERS.
+    :param candidates:
+        List of candidates in the order of the national environment.
+    :param primary_calendar:
+        List of PrimaryDate objects in chronological order.
+    :param rng:
+        The numpy.random.Generator to draw random values from.
+    :param seed:
+        Integer seed or numpy.random.SeedSequence for the scrambling of the
+        Sobol sequence.
+    :param start:
+        The index of the first Sobol point to use.
+    :param candidate:
+        The name of the candidate the importance sampler favours.
+    :param tilt:
+        The number of standard deviations the importance sampler moves their
+        national support by.
+    :return rng:
+        rng itself for "random", or a Sampler object.
+
+    """
+    if name == "random":
+        return rng
+    if name == "antithetic":
+        return AntitheticSampler(rng)
+    if name == "sobol":
+        # Each simulation draws the national environment, then the result of
+        # each state.
+        num_draws = 1
+        for primary_date in primary_calendar:
+            num_draws += len(primary_date.get_primaries())
+        return QuasiRandomSampler(num_draws, len(candidates), seed, start,
+                                  rng)
+    if name == "importance":
+        return ImportanceSampler(candidates, candidate, tilt, rng)
+    raise ValueError("Unknown sampler: {}".format(name))
+
+def make_generator(seed=None, stream=None, bit_generator=BIT_GENERATOR):
+    """
+    Creates a numpy.random.Generator from a seed and a stream number, so
+    that runs can be reproduced and parallel runs draw independent numbers.
+
+    :param seed:
+        Integer seed or numpy.random.SeedSequence, or None for a random seed.
+    :param stream:
+        The number of the stream to draw from, giving the same numbers as the
+        child of that number spawned from the seed, or None to draw from the
+        seed itself.
+    :param bit_generator:
+        The name of the bit generator, from BIT_GENERATORS.
+    :return rng:
+        The numpy.random.Generator.
+
+    """
+    if bit_generator not in BIT_GENERATORS:
+        raise ValueError("Unknown bit generator: {}".format(bit_generator))
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    if stream is not None:
+        if stream < 0:
+            raise ValueError("Stream cannot be negative.")
+        seed = numpy.random.SeedSequence(seed.entropy,
+                                         spawn_key=seed.spawn_key + (stream,),
+                                         pool_size=seed.pool_size)
+    return numpy.random.Generator(BIT_GENERATORS[bit_generator](seed))
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""Builds what-if versions of the model on top of a base database."""
+
+import database
+import collect.process_polls as pp
+import simulate.state_similarities as ss
+
+class Scenario:
+    """
+    Records changes to a base database, such as candidates dropping out or
+    primaries moving, and builds the changed model by only recalculating the
+    polling averages and state similarities the changes affect.
+
+    The base database is never changed, so many scenarios can be built from
+    the same populated database.
+
+    """
+    def __init__(self, base):
+        """
+        Creates a scenario with no changes.
+
+        :param base:
+            The populated Database object, with polling averages and state
+            similarities.
+
+        """
+        self.base = base
+        self.dropped_candidates = []
+        # Each moved state is keyed to its new date, or None if it no longer
+        # holds a primary.
+        self.primary_dates = {}
+        # Each location whose polls are replaced is keyed to its new polls.
+        self.location_polls = {}
+        self.added_polls = []
+        # Each changed state is keyed to a dict of its new attributes.
+        self.state_changes = {}
+
+    def drop_candidates(self, candidates):
+        """
+        Removes candidates from the race.
+
+        :param candidates:
+            List of the names of the candidates who drop out.
+        :return self:
+            The scenario.
+
+        """
+        for candidate in candidates:
+            if candidate not in self.base.get_primary_candidates():
+                raise ValueError("Unknown candidate: {}".format(candidate))
+            if candidate not in self.dropped_candidates:
+                self.dropped_candidates.append(candidate)
+        return self
+
+    def move_primary(self, state_name, date):
+        """
+        Moves a state's primary or caucus to another date.
+
+        :param state_name:
+            The name of the state.
+        :param date:
+            datetime.date object giving the new date, or None to cancel the
+            state's primary.
+        :return self:
+            The scenario.
+
+        """
+        if state_name not in self.base.get_states_dict():
+            raise ValueError("Unknown state: {}".format(state_name))
+        self.primary_dates[state_name] = date
+        return self
+
+    def set_polls(self, location, polls):
+        """
+        Replaces the polls of a location.
+
+        :param location:
+            "USA" or the name of a state.
+        :param polls:
+            List of Poll objects, all from the location.
+        :return self:
+            The scenario.
+
+        """
+        for poll in polls:
+            if poll.get_location() != location:
+                raise ValueError("Polls must be from {}.".format(location))
+        self.location_polls[location] = list(polls)
+        return self
+
+    def add_polls(self, polls):
+        """
+        Adds polls to those in the base database.
+
+        :param polls:
+            List of Poll objects.
+        :return self:
+            The scenario.
+
+        """
+        self.added_polls.extend(polls)
+        return self
+
+    def update_state(self, state_name, **attributes):
+        """
+        Changes the data of a state, such as its PVI or demographics.
+
+        :param state_name:
+            The name of the state.
+        :param attributes:
+            The new values of the state's attributes, keyed by the names used
+            by State, such as PVI=5.
+        :return self:
+            The scenario.
+
+        """
+        state = self.base.get_state(state_name)
+        for name in attributes:
+            if name in ["name", "date", "primary_polling", "state_sims"] or \
+                    not hasattr(state, name):
+                raise ValueError("Cannot change a state's {}.".format(name))
+        self.state_changes.setdefault(state_name, {}).update(attributes)
+        return self
+
+    def get_polls(self):
+        """
+        Finds every poll in the scenario.
+
+        :return polls:
+            List of the base database's polls, less those of locations whose
+            polls are replaced, followed by the replacement and added polls.
+
+        """
+        polls = [poll for poll in self.base.get_polls()
+                 if poll.get_location() not in self.location_polls]
+        for location in self.location_polls:
+            polls.extend(self.location_polls[location])
+        return polls + self.added_polls
+
+    def get_touched_locations(self):
+        """
+        Finds the locations whose polls have changed.
+
+        :return locations:
+            Set of "USA" and state names.
+
+        """
+        locations = set(self.location_polls)
+        for poll in self.added_polls:
+            locations.add(poll.get_location())
+        return locations
+
+    def build(self):
+        """
+        Builds a database of the scenario, sharing everything the changes do
+        not affect with the base database.
+
+        :return db:
+            A new Database object, ready to be simulated.
+
+        """
+        base = self.base
+        db = base.as_of(base.as_of_date)
+        candidates = [candidate for candidate in base.get_primary_candidates()
+                      if candidate not in self.dropped_candidates]
+        db.set_primary_candidates(candidates)
+
+        # Apply the changes to the copies of the states.
+        for state_name in self.state_changes:
+            state = db.get_state(state_name)
+            for name, value in self.state_changes[state_name].items():
+                setattr(state, name, value)
+        for state_name in self.primary_dates:
+            db.get_state(state_name).date = self.primary_dates[state_name]
+        db.primary_calendar = move_primaries(base.get_primary_calendar(),
+                                             self.primary_dates)
+
+        # Drop candidates from the base averages, which does not change the
+        # other candidates' averages, then average the polls of the locations
+        # whose polls have changed.
+        db.nat_primary_environment = base.get_nat_primary_environment().take(
+            candidates)
+        for state_name in db.get_states_dict():
+            state = db.get_state(state_name)
+            state.primary_polling = state.get_primary_polling().take(
+                candidates)
+        touched = self.get_touched_locations()
+        if touched != set():
+            db.polls = self.get_polls()
+            touched_polls = [poll for poll in db.polls
+                             if poll.get_location() in touched]
+            averages = pp.find_averages(database.PollIndex(touched_polls),
+                                        sorted(touched), candidates,
+                                        db.get_as_of_date())
+            for location in averages:
+                if location == "USA":
+                    db.nat_primary_environment = averages[location].copy()
+                elif location in db.states:
+                    db.states[location].primary_polling = averages[
+                        location].copy()
+
+        # Only find the similarities of states which have changed or whose
+        # primaries have been added.
+        changed = set(self.state_changes)
+        db.set_state_similarities(ss.update_state_similarities(
+            base.get_state_similarities(), db.get_states_dict(), changed))
+
+        return db
+
+def move_primaries(primary_calendar, primary_dates):
+    """
+    Creates a primary calendar with some states' primaries moved.
+
+    :param primary_calendar:
+        List of PrimaryDate objects, which are not changed.
+    :param primary_dates:
+        Dict keying the names of moved states to their new date, or None if
+        they no longer hold a primary.
+    :return primary_calendar:
+        List of new PrimaryDate objects. Dates left without primaries are
+        removed, and new dates are placed before the first later date.
+
+    """
+    calendar = []
+    for primary_date in primary_calendar:
+        primaries = [state_name for state_name in primary_date.get_primaries()
+                     if state_name not in primary_dates]
+        calendar.append(database.PrimaryDate(primary_date.date, primaries))
+
+    for state_name in primary_dates:
+        date = primary_dates[state_name]
+        if date is None:
+            continue
+        dates = [primary_date.date for primary_date in calendar]
+        if date in dates:
+            calendar[dates.index(date)].primaries.append(state_name)
+        else:
+            later = [i for i in range(len(dates)) if dates[i] > date]
+            position = later[0] if later != [] else len(calendar)
+            calendar.insert(position, database.PrimaryDate(date,
+                                                           [state_name]))
+
+    return [primary_date for primary_date in calendar
+            if primary_date.get_primaries() != []]
\ No newline at end of file
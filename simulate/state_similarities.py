@@ -1,38 +1,222 @@
-"""Creates the dicts describing how similar states are politically."""
+"""Creates the matrix describing how similar states are politically."""
 
+import numpy
 import database
 
 # Define constants for the module.
 HIGH_DEM_DIFFERENCE_COEFFICIENT = 50
 HIGH_PVI_DIFFERENCE = 30
+# How heavily to weight inferred support compared to a weight of 0-1 for state
+# level polling.
+INFERRED_WEIGHT = 0.22
+# Number of most similar states each state infers support from, or None to
+# infer support from every state.
+NUM_NEIGHBOURS = None
+# Number of rows of similarities found at once when keeping only the most
+# similar neighbours, to limit memory use.
+BLOCK_SIZE = 256
 
-def save_state_similarities(db):
+def save_state_similarities(db, num_neighbours=NUM_NEIGHBOURS):
     """
     Calculates state similarities and adds them to the database.
 
     :param db:
         The database object containing data about the states.
+    :param num_neighbours:
+        The number of most similar states to keep for each state, or None to
+        keep every state.
     :return db:
-        The updated database with state similarity dicts added.
+        The updated database with the state similarity matrix added.
     
     """
-    # Iterate through each pair of states, adding the similarities for each.
+    # Only states holding a primary or caucus are compared.
     states = db.get_states_dict()
-    for state_1_name in states:
-        state_1 = states[state_1_name]
-        if state_1.get_date() != None:
-            state_1_sims = state_1.get_state_sims()
-            for state_2_name in states:
-                if state_1_name != state_2_name:
-                    state_2 = states[state_2_name]
-                    if state_2.get_date() != None:
-                        sim = find_similarity(state_1, state_2)
-                        state_1_sims[state_2_name] = sim
-            # Save the updated similarities dict to the database.
-            state_1.set_state_sims(state_1_sims)
+    state_names = []
+    for state_name in states:
+        if states[state_name].get_date() != None:
+            state_names.append(state_name)
+    state_list = [states[state_name] for state_name in state_names]
+    if num_neighbours is None:
+        similarities = database.StateSimilarities(
+            state_names, find_similarity_matrix(state_list))
+    else:
+        similarities = find_sparse_similarities(state_names, state_list,
+                                                num_neighbours)
+
+    # Save the similarity matrix to the database.
+    db.set_state_similarities(similarities)
 
     return db
 
+def find_sparse_similarities(state_names, states, num_neighbours,
+                             block_size=BLOCK_SIZE):
+    """
+    Finds each state's most similar neighbours, calculating the similarities
+    a block of rows at a time so the full matrix is never held in memory.
+
+    :param state_names:
+        List of the names of the states.
+    :param states:
+        List of state objects in the order of state_names.
+    :param num_neighbours:
+        The largest number of neighbours to keep for each state. Neighbours
+        with zero similarity are left out.
+    :param block_size:
+        The number of rows to calculate at once.
+    :return similarities:
+        A SparseSimilarities object.
+
+    """
+    if num_neighbours <= 0:
+        raise ValueError("Number of neighbours must be positive.")
+    if block_size <= 0:
+        raise ValueError("Block size must be positive.")
+    num_kept = min(num_neighbours, len(states) - 1)
+    indptr = [0]
+    indices = []
+    sims = []
+    for start in range(0, len(states), block_size):
+        rows = find_similarity_rows(states[start:start + block_size], states)
+        block = numpy.arange(len(rows))
+        rows[block, start + block] = 0
+
+        # Keep the most similar states in each row, most similar first, then
+        # leave out any with zero similarity.
+        if num_kept > 0:
+            top = numpy.argpartition(-rows, num_kept - 1,
+                                     axis=1)[:, :num_kept]
+            order = numpy.argsort(-rows[block[:, None], top], axis=1,
+                                  kind="stable")
+            top = top[block[:, None], order]
+        else:
+            top = numpy.zeros((len(rows), 0), dtype=int)
+        for j in range(len(rows)):
+            neighbours = top[j][rows[j, top[j]] > 0]
+            indices.append(neighbours)
+            sims.append(rows[j, neighbours])
+            indptr.append(indptr[-1] + len(neighbours))
+
+    return database.SparseSimilarities(state_names, indptr,
+                                       numpy.concatenate(indices + [[]]),
+                                       numpy.concatenate(sims + [[]]),
+                                       num_neighbours)
+
+def find_similarity_matrix(states):
+    """
+    Calculates the similarity coefficient of find_similarity for every pair of
+    states at once.
+
+    :param states:
+        List of state objects.
+    :return sims:
+        Square array where sims[i, j] is the political similarity coefficient
+        between states[i] and states[j], and the diagonal is zero.
+
+    """
+    sims = find_similarity_rows(states, states)
+    numpy.fill_diagonal(sims, 0)
+
+    return sims
+
+def find_similarity_rows(row_states, states):
+    """
+    Calculates the similarity coefficient of find_similarity between some
+    states and every state.
+
+    :param row_states:
+        List of state objects giving the rows.
+    :param states:
+        List of state objects giving the columns.
+    :return sims:
+        Array where sims[i, j] is the political similarity coefficient
+        between row_states[i] and states[j]. A state compared to itself has
+        a similarity of 1.
+
+    """
+    # Calculate a demographic similarity coefficient, adding up the difference
+    # one demographic at a time to limit memory use.
+    diff = numpy.zeros((len(row_states), len(states)))
+    for getter in (database.State.get_pcwhite, database.State.get_pcblack,
+                   database.State.get_pchispanic, database.State.get_pcasian,
+                   database.State.get_pcnative):
+        row_values = numpy.array([getter(state) for state in row_states],
+                                 dtype=float)
+        values = numpy.array([getter(state) for state in states], dtype=float)
+        diff += numpy.abs(row_values[:, None] - values[None, :])
+    dem_sim = numpy.maximum(1 - diff/HIGH_DEM_DIFFERENCE_COEFFICIENT, 0)
+
+    # Calculate a partisan similarity coefficient.
+    row_pvi = numpy.array([state.get_PVI() for state in row_states],
+                          dtype=float)
+    pvi = numpy.array([state.get_PVI() for state in states], dtype=float)
+    pvi_diff = numpy.abs(row_pvi[:, None] - pvi[None, :])
+    par_sim = numpy.maximum(1 - pvi_diff/HIGH_PVI_DIFFERENCE, 0)
+
+    # Calculate a regional similarity coefficient.
+    regions = {}
+    row_codes = numpy.array([regions.setdefault(state.get_region(),
+                                                len(regions))
+                             for state in row_states], dtype=int)
+    region_codes = numpy.array([regions.setdefault(state.get_region(),
+                                                   len(regions))
+                                for state in states], dtype=int)
+    reg_sim = (row_codes[:, None] == region_codes[None, :]).astype(float)
+
+    # Average the coefficients to find the overall similarity.
+    sims = (dem_sim + par_sim + reg_sim)/3
+
+    return sims
+
+def update_state_similarities(similarities, states, changed):
+    """
+    Finds the similarity matrix of the states holding a primary or caucus,
+    reusing an existing matrix and only calculating the rows of states which
+    have changed or were not in it.
+
+    :param similarities:
+        The existing StateSimilarities object.
+    :param states:
+        Dict keying state names to state objects, as in the database.
+    :param changed:
+        Collection of the names of states whose data has changed.
+    :return similarities:
+        A new StateSimilarities object, equal to the one
+        save_state_similarities would find. If the existing similarities
+        are a SparseSimilarities object, every state's neighbours may have
+        changed, so they are all found again.
+
+    """
+    # Only states holding a primary or caucus are compared.
+    state_names = []
+    for state_name in states:
+        if states[state_name].get_date() != None:
+            state_names.append(state_name)
+    if isinstance(similarities, database.SparseSimilarities):
+        return find_sparse_similarities(
+            state_names, [states[state_name] for state_name in state_names],
+            similarities.num_neighbours)
+
+    # Copy the similarities of unchanged states from the existing matrix.
+    kept = numpy.array([state_name in similarities.index and
+                        state_name not in changed
+                        for state_name in state_names], dtype=bool)
+    positions = numpy.array([similarities.index.get(state_name, -1)
+                             for state_name in state_names], dtype=int)
+    sims = numpy.zeros((len(state_names), len(state_names)))
+    sims[numpy.ix_(kept, kept)] = similarities.get_matrix()[
+        numpy.ix_(positions[kept], positions[kept])]
+
+    # Calculate the rows, and so the columns, of the other states.
+    new = numpy.flatnonzero(~kept)
+    rows = find_similarity_rows([states[state_names[i]] for i in new],
+                                [states[state_name]
+                                 for state_name in state_names])
+    sims[new] = rows
+    sims[:, new] = rows.T
+    sims[new, new] = 0
+
+    return database.StateSimilarities(state_names, sims)
+
 def find_similarity(state_1, state_2):
     """
     Calculates a coefficient of similarity between 0 and 1 between 2 states.
@@ -76,59 +260,201 @@ def find_similarity(state_1, state_2):
 
     return sim
 
-def apply_comparison(state_environment, db, state_sims):
+def comparison_weights(db, state_names):
+    """
+    Builds the matrix of weights apply_comparison gives to each state when
+    inferring support in another state.
+
+    :param db:
+        The database containing the state similarity matrix.
+    :param state_names:
+        List of state names giving the order of the rows and columns.
+    :return weights:
+        Array where weights[i, j] is the similarity weight given to the state
+        named state_names[j] when inferring support in the state named
+        state_names[i]. States missing from the similarity matrix have no
+        weight.
+
+    """
+    similarities = db.get_state_similarities()
+    positions = []
+    for state_name in state_names:
+        if state_name in similarities.index:
+            positions.append(similarities.get_index(state_name))
+        else:
+            positions.append(-1)
+    positions = numpy.array(positions, dtype=int)
+    found = positions >= 0
+
+    weights = numpy.zeros((len(state_names), len(state_names)))
+    weights[numpy.ix_(found, found)] = similarities.get_matrix()[
+        numpy.ix_(positions[found], positions[found])]
+
+    return weights
+
+def comparison_neighbours(db, state_names):
+    """
+    Finds the states apply_comparison compares each state to, and the weight
+    given to each.
+
+    :param db:
+        The database containing the state similarities.
+    :param state_names:
+        List of state names giving the order of the states.
+    :return neighbours:
+        List with an entry for each state, holding the positions in
+        state_names of the states it is compared to and an array of their
+        weights. With a full similarity matrix, the positions are
+        slice(None) and the weights are a row of comparison_weights.
+
+    """
+    similarities = db.get_state_similarities()
+    if not isinstance(similarities, database.SparseSimilarities):
+        weights = comparison_weights(db, state_names)
+        return [(slice(None), weights[i]) for i in range(len(state_names))]
+
+    # Convert each neighbour's position in the similarities to its position
+    # in state_names, leaving out states not in state_names.
+    name_positions = numpy.full(len(similarities.get_state_names()), -1)
+    for i in range(len(state_names)):
+        if state_names[i] in similarities.index:
+            name_positions[similarities.get_index(state_names[i])] = i
+    neighbours = []
+    for state_name in state_names:
+        if state_name not in similarities.index:
+            neighbours.append((numpy.zeros(0, dtype=int), numpy.zeros(0)))
+            continue
+        positions, sims = similarities.get_neighbours(state_name)
+        positions = name_positions[positions]
+        found = positions >= 0
+        neighbours.append((positions[found], sims[found]))
+
+    return neighbours
+
+def apply_comparison(state_environment, db, state_name,
+                     comparison_totals=None):
     """
     Adjusts a non-randomised state primary popular vote result to include
     information inferred from polling and results in other states.
 
     :param state_environment:
-        Dict keying candidate names to their percentage popular vote support,
-        and a "confidence" key representing the confidence in the result. This
-        confidence value ranges from 0 to 1.
+        CandidateVector of candidates' percentage popular vote support, with a
+        confidence in the result ranging from 0 to 1.
     :param db:
         The database in which the state similarity data is stored.
-    :param state_sims:
-        Dict keying state names to similarity coefficients between 0 and 1
-        decribing the similarity between the current state and the state named
-        in the key.
+    :param state_name:
+        The name of the state the environment belongs to.
+    :param comparison_totals:
+        ComparisonTotals object holding the current polling of every state. If
+        None, one is built from the polling stored in the database.
     :return state_environment:
-        An updated state environment dict with adjusted support levels.
+        The updated state environment with adjusted support levels.
     
     """
-    # Define how heavily to weight inferred support compared to a weight of 0-1
-    # for state level polling.
-    INFERRED_WEIGHT = 0.22
+    if comparison_totals is None:
+        comparison_totals = ComparisonTotals(db, db.get_primary_candidates())
 
-    # Set up a dict to collect support totals ready to find a weighted average.
-    total_weight = 0
-    inferred_support = {}
-    for candidate in state_environment:
-        if candidate != "confidence":
-            inferred_support[candidate] = 0
-    
-    # Iterate through the states, creating weighted support totals based on
-    # the confidence level of predictions for each state.
-    for state_name in state_sims:
-        state = db.get_state(state_name)
-        polling = state.get_primary_polling()
-        confidence = polling["confidence"]
-        total_weight = total_weight + confidence
-        for candidate in inferred_support:
-            inferred_support[candidate] = (inferred_support[candidate] + 
-                                           confidence*polling[candidate])
-    
-    # Divide through by total weight to find the weighted average.
-    for candidate in inferred_support:
-        inferred_support[candidate] = inferred_support[candidate]/total_weight
+    # Find the average support in other states, weighted by their similarity
+    # to this state and the confidence level of predictions for each state.
+    # If no similar state has any data, nothing can be inferred.
+    inferred_support = comparison_totals.get_inferred_support(state_name)
+    if inferred_support is None:
+        return state_environment
+    positions = comparison_totals.get_positions(state_environment.candidates)
     
     # Find the weighted average of the inferred and polled support.
-    state_confidence = state_environment["confidence"]
+    state_confidence = state_environment.confidence
     weight = INFERRED_WEIGHT + state_confidence
-    for candidate in state_environment:
-        if candidate != "confidence":
-            state_environment[candidate] = (
-                state_confidence*state_environment[candidate] + 
-                INFERRED_WEIGHT*inferred_support[candidate])
-            state_environment[candidate] = state_environment[candidate]/weight
+    state_environment.values = (
+        state_confidence*state_environment.values + 
+        INFERRED_WEIGHT*inferred_support.values[positions])/weight
             
-    return state_environment
\ No newline at end of file
+    return state_environment
+
+class ComparisonTotals:
+    """
+    Keeps the confidence-weighted polling of every state, so that support can
+    be inferred from similar states without rescanning the database.
+
+    """
+    def __init__(self, db, candidates):
+        """
+        Initialises the totals from the polling stored in the database.
+
+        :param db:
+            The database containing the states and their similarity matrix.
+        :param candidates:
+            List of candidates to keep totals for.
+
+        """
+        self.similarities = db.get_state_similarities()
+        self.candidates = tuple(candidates)
+        self.index = database.CandidateVector(self.candidates).index
+        # Each tuple of candidates is keyed to their positions in the arrays.
+        self.positions = {}
+        state_names = self.similarities.get_state_names()
+        self.weighted_polling = numpy.zeros((len(state_names),
+                                             len(self.candidates)))
+        self.confidence = numpy.zeros(len(state_names))
+        for state_name in state_names:
+            state = db.get_state(state_name)
+            self.update(state_name, state.get_primary_polling())
+
+    def update(self, state_name, polling):
+        """
+        Replaces the polling held for a state, such as when it has voted.
+
+        :param state_name:
+            The name of the state.
+        :param polling:
+            CandidateVector of candidates' support in the state. Candidates
+            not in it have no support.
+
+        """
+        i = self.similarities.get_index(state_name)
+        polling = database.as_candidate_vector(polling)
+        self.confidence[i] = polling.confidence
+        if polling.candidates == self.candidates:
+            values = polling.values
+        else:
+            # Candidates missing from the polling, such as those who have
+            # dropped out, have no support.
+            values = numpy.zeros(len(self.candidates))
+            values[self.get_positions(polling.candidates)] = polling.values
+        self.weighted_polling[i] = polling.confidence*values
+
+    def get_positions(self, candidates):
+        """
+        Finds the positions of candidates in the totals.
+
+        :param candidates:
+            Tuple of candidate names, all of which must be in the totals.
+        :return positions:
+            Integer array of the position of each candidate.
+
+        """
+        if candidates not in self.positions:
+            self.positions[candidates] = numpy.array(
+                [self.index[candidate] for candidate in candidates],
+                dtype=int)
+        return self.positions[candidates]
+
+    def get_inferred_support(self, state_name):
+        """
+        Finds the average support in other states, weighted by their
+        similarity to a state and the confidence in their polling.
+
+        :param state_name:
+            The name of the state to infer support in.
+        :return inferred_support:
+            CandidateVector of candidates' inferred support, or None if no
+            similar state has any data.
+
+        """
+        positions, sims = self.similarities.get_neighbours(state_name)
+        total_weight = sims @ self.confidence[positions]
+        if total_weight == 0:
+            return None
+        support = (sims @ self.weighted_polling[positions])/total_weight
+        return database.CandidateVector(self.candidates, support,
+                                        index=self.index)
\ No newline at end of file
@@ -1,6 +1,7 @@
 """Contains helper functions simulating variations in voting patterns."""
 
 import numpy
+import database
 
 # Define constants.
 BASE_STANDARD_DEVIATION = 1.31
@@ -8,51 +9,77 @@ MAX_STANDARD_DEVIATION = 4.3
 SD_PER_DAY = 0.13
 TAC_COEFFS = [1, 1, 0.97, 0.93, 0.89, 0.83, 0.78, 0.71, 0.66, 0.58, 0.52, 0.44,
               0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4]
-
-def random_variation(polling_averages, days_left):
+# Expected % of delegates a candidate wins, indexed by their % of the popular
+# vote up to 25%, where delegate share becomes proportional to vote share.
+DELEGATE_CONVERSION = numpy.array([0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 5,
+                                   12, 14, 15, 17, 18, 19, 20, 21, 23, 24, 25])
+# Candidates with less than this % of national support and of the delegates
+# won so far drop out, and their support is shared between the rest. Set to 0
+# to keep every candidate in the race.
+VIABILITY_FLOOR = 1
+
+def random_variation(polling_averages, days_left, rng=None):
     """
     Accounts for uncertainty in a polling average by adding random variation
     between candidates, then adjusting the numbers such that they add to 100%
     again.
 
     :param polling_averages:
-        Dict keying candidate names to their support in the polls in percent.
-        Also contains a "confidence" key indicating the quality and quantity of
-        data gone into forming this polling average, between 0 and 1.
+        CandidateVector of candidates' support in the polls in percent, with a
+        confidence indicating the quality and quantity of data gone into
+        forming this polling average, between 0 and 1. A dict with a
+        "confidence" key is converted to a CandidateVector.
     :param days_left:
         Days until the election.
+    :param rng:
+        The numpy.random.Generator, or sampling.Sampler object such as a
+        BlockSampler, to draw random numbers from. If None, the global
+        numpy.random state is used.
     :return polling_averages:
         The polling averages with random variation applied.
     
     """
+    polling_averages = database.as_candidate_vector(polling_averages)
     if days_left < 0:
         raise ValueError("Days until the election cannot be negative.")
-    if (polling_averages["confidence"] < 0 or 
-        polling_averages["confidence"] > 1):
+    if (polling_averages.confidence < 0 or 
+        polling_averages.confidence > 1):
         raise ValueError("Confidence must be between zero and one.")
+    if rng is None:
+        rng = numpy.random
 
     # Calculate the standard deviation to use.
+    standard_deviation = get_standard_deviation(days_left,
+                                                polling_averages.confidence)
+
+    # Add the random variation, then divide each value through by the
+    # total/100 to ensure they add to 100%.
+    polling_averages.values = rng.normal(polling_averages.values,
+                                         standard_deviation)
+    divisor = polling_averages.values.sum()/100
+    polling_averages.values /= divisor
+
+    return polling_averages
+
+def get_standard_deviation(days_left, confidence):
+    """
+    Calculates the standard deviation of the random variation applied to a
+    polling average.
+
+    :param days_left:
+        Days until the election.
+    :param confidence:
+        The confidence in the polling average, between 0 and 1.
+    :return standard_deviation:
+        The standard deviation in percentage points.
+
+    """
     standard_deviation = BASE_STANDARD_DEVIATION + days_left*SD_PER_DAY
-    standard_deviation = standard_deviation/(0.5 + 
-                                              polling_averages["confidence"]/2)
+    standard_deviation = standard_deviation/(0.5 + confidence/2)
     if standard_deviation > MAX_STANDARD_DEVIATION:
         standard_deviation = MAX_STANDARD_DEVIATION
 
-    # Add the random variation and sum the results.
-    total_new_votes = 0
-    for key in polling_averages:
-        if key != "confidence":
-            polling_averages[key] = numpy.random.normal(polling_averages[key], 
-                                                        standard_deviation)
-            total_new_votes = total_new_votes + polling_averages[key]
-
-    # Divide each value through by the total/100 to ensure they add to 100%.
-    divisor = total_new_votes/100
-    for key in polling_averages:
-        if key != "confidence":
-            polling_averages[key] = polling_averages[key]/divisor
-
-    return polling_averages
+    return standard_deviation
 
 def primary_tactical_voting(nat_environment, total_delegates):
     """
@@ -60,128 +87,139 @@ def primary_tactical_voting(nat_environment, total_delegates):
     candidates with a better chance of winning the primary.
 
     :param nat_environment:
-        Dict keying candidates to their national support levels.
+        CandidateVector of candidates' national support levels. A dict is
+        converted to a CandidateVector.
     :param total_delegates:
-        Dict keying candidates to their current total delegate count.
+        CandidateVector or dict of candidates' current total delegate count.
     :return nat_environment:
-        An adjusted dict reflecting changes due to tactical voting.
+        An adjusted CandidateVector reflecting changes due to tactical voting.
 
     """
-    for candidate in nat_environment:
-        if nat_environment[candidate] < 0:
-            raise ValueError("Candidates cannot have negative support.")
-    for candidate in total_delegates:
-        if total_delegates[candidate] < 0:
-            raise ValueError("Cannot have negative numbers of delegates")
+    nat_environment = database.as_candidate_vector(nat_environment)
+    total_delegates = database.as_candidate_vector(total_delegates)
+    if numpy.any(nat_environment.values < 0):
+        raise ValueError("Candidates cannot have negative support.")
+    if numpy.any(total_delegates.values < 0):
+        raise ValueError("Cannot have negative numbers of delegates")
 
-    # Order the candidates by their delegate count (descending order).
-    leaderboard = sorted(total_delegates, key=total_delegates.__getitem__,
-                         reverse=True)
+    # Order the candidates by their delegate count (descending order), keeping
+    # tied candidates in their original order.
+    leaderboard = numpy.argsort(-total_delegates.values, kind="stable")
 
     # Multiply candidates national support levels by tactical voting
     # coefficients to gauge how many voters abandon them. Then rebalance the
     # votes so they add to 100 again.
-    for i in range(len(leaderboard)):
-        candidate = leaderboard[i]
-        nat_environment[candidate] = nat_environment[candidate]*TAC_COEFFS[i]
+    tac_coeffs = database.CandidateVector(total_delegates.candidates,
+                                          index=total_delegates.index)
+    tac_coeffs.values[leaderboard] = TAC_COEFFS[:len(leaderboard)]
+    nat_environment.multiply(tac_coeffs)
     nat_environment = rebalance(nat_environment)
 
     return nat_environment
 
+def find_viable(nat_support, total_delegates, floor=None):
+    """
+    Finds the candidates still in the race, for one simulation or many at
+    once.
+
+    :param nat_support:
+        Array of candidates' national support in percent, with candidates
+        along the last axis.
+    :param total_delegates:
+        Array of candidates' delegate counts so far, the same shape as
+        nat_support.
+    :param floor:
+        The % of national support and of the delegates won so far below
+        which a candidate drops out. If None, VIABILITY_FLOOR is used.
+    :return viable:
+        Boolean array the shape of nat_support, true for candidates at or
+        above the floor in either measure. The leader in national support is
+        always viable, so someone is left in the race.
+
+    """
+    if floor is None:
+        floor = VIABILITY_FLOOR
+    nat_support = numpy.asarray(nat_support, dtype=float)
+    total_delegates = numpy.asarray(total_delegates, dtype=float)
+    total = total_delegates.sum(axis=-1, keepdims=True)
+    delegate_share = 100*total_delegates/numpy.where(total > 0, total, 1)
+    viable = (nat_support >= floor) | (delegate_share >= floor)
+    viable |= nat_support == nat_support.max(axis=-1, keepdims=True)
+
+    return viable
+
 def rebalance(polling):
     """
     Rebalances a set of polling results or election results such that the
     percentages add to 100.
 
     :param polling:
-        A dict keying various options to their percentage support.
+        A CandidateVector of various options' percentage support. A dict is
+        converted to a CandidateVector.
     :return polling:
-        The same dict, with the values rebalanced such that they add to 100.
+        The same vector, with the values rebalanced such that they add to 100.
     
     """
-    for candidate in polling:
-        if polling[candidate] < 0:
-            raise ValueError("Candidates cannot have negative support.")
-
-    # Add up the numbers to find the necessary divisor.
-    total = 0
-    for key in polling:
-        if key != "confidence":
-            total = total + polling[key]
-    divisor = total/100
-    assert divisor != 0, "No support detected - divide by zero error."
-
-    # Divide each number by the divisor such that they add to 100.
-    for key in polling:
-        if key != "confidence":
-            polling[key] = polling[key]/divisor
+    polling = database.as_candidate_vector(polling)
+    if numpy.any(polling.values < 0):
+        raise ValueError("Candidates cannot have negative support.")
+
+    # Divide each number by the total/100 such that they add to 100.
+    polling.normalize()
 
     return polling
 
-def assign_leftover_delegates(delegates, pc_dels, unassigned_dels):
-    """
-    Assigns leftover delegates to candidates.
-
-    :param delegates:
-        Dict keying candidate names to delegate counts from this primary.
-    :param pc_dels:
-        The expected percentage of delegates each candidate should win.
-    :param unassigned_dels:
-        The number of delegates so far not assigned to candidates.
-    :return delegates:
-        Updated dict keying candidate names to delegate counts from this
-        primary.
-    """
-    for candidate in delegates:
-        if delegates[candidate] < 0:
-            raise ValueError("Cannot have negative numbers of delegates")
-    for candidate in pc_dels:
-        if pc_dels[candidate] < 0:
-            raise ValueError("Cannot have negative percentage of delegates")
-    if unassigned_dels < 0:
-        raise ValueError("unassigned_dels must be a natural number.")
-
-    # Order the candidates by their delegate count (descending order).
-    leaderboard = sorted(pc_dels, key=pc_dels.__getitem__, reverse=True)
-
-    # Add the delegates to the leading candidates' totals.
-    for i in range(unassigned_dels):
-        candidate = leaderboard[i]
-        delegates[candidate] = delegates[candidate] + 1
-
-    return delegates
-
-def unassign_extra_delegates(delegates, pc_dels, extra_dels):
+def allocate_delegates(vote_shares, num_delegates):
     """
-    Removes delegates from candidates in the situation where too many
-    delegates have been assigned due to rounding.
-
-    :param delegates:
-        Dict keying candidate names to delegate counts from this primary.
-    :param pc_dels:
-        The expected percentage of delegates each candidate should win.
-    :param extra_dels:
-        The number of excess delegates assigned so far.
+    Approximates the distribution of delegates in many primaries at once.
+
+    Vote shares up to 25% are converted to an expected percentage of delegates
+    with DELEGATE_CONVERSION, and larger shares are kept as they are. Each row
+    is then rebalanced and its delegates are shared out by largest remainder,
+    so every row hands out exactly its number of delegates.
+
+    :param vote_shares:
+        Array with one row per primary and one column per candidate, giving
+        each candidate's percentage of the vote.
+    :param num_delegates:
+        The number of pledged delegates available in each row, either as an
+        integer shared by every row or as an array with one entry per row.
     :return delegates:
-        Updated dict keying candidate names to delegate counts from this
-        primary.
+        Integer array of the number of delegates each candidate wins in each
+        row.
 
     """
-    for candidate in delegates:
-        if delegates[candidate] < 0:
-            raise ValueError("Cannot have negative numbers of delegates")
-    for candidate in pc_dels:
-        if pc_dels[candidate] < 0:
-            raise ValueError("Cannot have negative percentage of delegates")
-    if extra_dels < 0:
-        raise ValueError("extra_dels must be a natural number.")
-
-    # Order the candidates by their delegate count (descending order).
-    leaderboard = sorted(pc_dels, key=pc_dels.__getitem__, reverse=True)
-
-    # Remove the delegates from the leading candidates' totals.
-    for i in range(extra_dels):
-        candidate = leaderboard[i]
-        delegates[candidate] = delegates[candidate] - 1
+    vote_shares = numpy.asarray(vote_shares, dtype=float)
+    num_delegates = numpy.asarray(num_delegates)
+    if (vote_shares < 0).any():
+        raise ValueError("Candidates cannot have negative support.")
+    if (num_delegates < 0).any():
+        raise ValueError("Cannot have negative numbers of delegates")
+
+    # Find the expected percentage of delegates each candidate should win.
+    rounded_votes = numpy.round(numpy.minimum(vote_shares, 25)).astype(int)
+    pc_dels = numpy.where(vote_shares > 25, vote_shares,
+                          DELEGATE_CONVERSION[rounded_votes])
+    totals = pc_dels.sum(axis=1)
+    assert numpy.all(totals != 0), "No support detected - divide by zero error."
+
+    # Give each candidate the whole part of their quota of delegates.
+    quotas = pc_dels*(num_delegates/totals)[:, None]
+    delegates = numpy.floor(quotas).astype(int)
+    remainders = quotas - delegates
+    unassigned_dels = num_delegates - delegates.sum(axis=1)
+
+    # Give the leftover delegates to the candidates with the largest
+    # remainders. Only the top few columns of each row need ordering, so they
+    # are found with a partition before sorting.
+    most_unassigned = min(int(unassigned_dels.max()), vote_shares.shape[1])
+    if most_unassigned > 0:
+        rows = numpy.arange(len(vote_shares))[:, None]
+        top = numpy.argpartition(-remainders, most_unassigned - 1,
+                                 axis=1)[:, :most_unassigned]
+        order = numpy.argsort(-remainders[rows, top], axis=1, kind="stable")
+        top = top[rows, order]
+        delegates[rows, top] += (numpy.arange(most_unassigned) <
+                                 unassigned_dels[:, None])
 
     return delegates
\ No newline at end of file
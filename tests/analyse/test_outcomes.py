@@ -0,0 +1,104 @@
+"""Testing functionality for the outcomes module."""
+
+import unittest
+import unittest.mock
+import tempfile
+import threading
+import numpy
+import constants as c
+import database
+import analyse.outcomes as outcomes
+
+class TestOutcomeStore(unittest.TestCase):
+    """
+    Tests the OutcomeWriter and OutcomeStore classes, which write and read the
+    outcome of every simulation.
+
+    """
+    def test_standard_case(self):
+        """Checks the stored outcomes match the simulations written."""
+        candidates = [c.C_BIDEN, c.C_WARREN, c.C_SANDERS]
+        final_delegates = numpy.array([[2000, 1000, 769], [1000, 1500, 1269],
+                                       [0, 0, 0]])
+        with tempfile.TemporaryDirectory() as path:
+            with outcomes.OutcomeWriter(path, candidates) as writer:
+                writer.add_final_delegates(final_delegates)
+            store = outcomes.OutcomeStore(path)
+            self.assertEqual(len(store), 3)
+            self.assertIsInstance(store.final_delegates, numpy.memmap)
+            self.assertEqual(store.final_delegates.dtype, numpy.int16)
+            self.assertEqual(store.winners.dtype, numpy.uint8)
+            self.assertTrue(numpy.array_equal(store.final_delegates,
+                                              final_delegates))
+            self.assertEqual([result.winner for result in store],
+                             [c.C_BIDEN, "No majority", "No majority"])
+            self.assertEqual([result.most_delegates for result in store],
+                             [c.C_BIDEN, c.C_WARREN, None])
+            del store
+
+    def test_growth(self):
+        """Checks the files grow when more simulations than expected arrive."""
+        candidates = [c.C_BIDEN, c.C_WARREN]
+        final_delegates = numpy.random.randint(0, 3769, (25, 2))
+        with tempfile.TemporaryDirectory() as path:
+            writer = outcomes.OutcomeWriter(path, candidates, capacity=4,
+                                            buffer_size=3)
+            for i in range(0, 25, 5):
+                writer.add_final_delegates(final_delegates[i:i + 5])
+            writer.close()
+            store = outcomes.OutcomeStore(path)
+            self.assertTrue(numpy.array_equal(store.final_delegates,
+                                              final_delegates))
+            del store
+
+    def test_background_writes(self):
+        """Checks full buffers are written by another thread."""
+        candidates = [c.C_BIDEN, c.C_WARREN]
+        final_delegates = numpy.random.randint(0, 3769, (10, 2))
+        threads = []
+        write = outcomes.OutcomeWriter.write
+        def record_thread(writer, batch):
+            threads.append(threading.current_thread())
+            write(writer, batch)
+        with tempfile.TemporaryDirectory() as path:
+            with unittest.mock.patch.object(outcomes.OutcomeWriter, "write",
+                                            record_thread):
+                with outcomes.OutcomeWriter(path, candidates,
+                                            buffer_size=4) as writer:
+                    writer.add_final_delegates(final_delegates)
+            self.assertEqual(len(threads), 3)
+            self.assertNotIn(threading.current_thread(), threads)
+            store = outcomes.OutcomeStore(path)
+            self.assertTrue(numpy.array_equal(store.final_delegates,
+                                              final_delegates))
+            del store
+
+    def test_write_error(self):
+        """Tests the case where writing to the files fails."""
+        with tempfile.TemporaryDirectory() as path:
+            writer = outcomes.OutcomeWriter(path, [c.C_BIDEN, c.C_WARREN])
+            with unittest.mock.patch.object(outcomes.OutcomeWriter, "write",
+                                            side_effect=OSError):
+                writer.add_final_delegates([[2000, 1769]])
+                with self.assertRaises(OSError):
+                    writer.close()
+
+    def test_summarise(self):
+        """Checks the summary of a store matches summarising the results."""
+        candidates = [c.C_BIDEN, c.C_WARREN]
+        final_delegates = numpy.random.randint(0, 3769, (40, 2))
+        expected = database.SimulationSummary(candidates)
+        expected.add_final_delegates(final_delegates)
+        with tempfile.TemporaryDirectory() as path:
+            with outcomes.OutcomeWriter(path, candidates) as writer:
+                writer.add_final_delegates(final_delegates)
+            store = outcomes.OutcomeStore(path)
+            summary = store.summarise(chunk_size=7)
+            self.assertEqual(summary.get_win_counts(),
+                             expected.get_win_counts())
+            self.assertTrue(numpy.array_equal(summary.histograms,
+                                              expected.histograms))
+            del store
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""Testing functionality for the benchmark module."""
+
+import unittest
+import datetime
+import constants as c
+import database
+import benchmarks.benchmark as bm
+
+class TestMakePolls(unittest.TestCase):
+    """
+    Tests the make_polls function, which copies polls with their dates moved
+    forward.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        db = database.Database(states={}, primary_calendar=[], polls=[
+            database.Poll(c.Q_PRIMARY, c.S_USA, 2, {c.C_BIDEN:40,
+                          c.C_WARREN:60}, bm.POLL_DATE),
+            database.Poll(c.Q_PRIMARY, c.S_IOWA, 1, {c.C_BIDEN:50,
+                          c.C_WARREN:50}, datetime.date(2019, 10, 2))])
+        polls = bm.make_polls(db, 3)
+        self.assertEqual(len(polls), 6)
+        self.assertEqual(polls[0].get_date(), datetime.date.today())
+        self.assertEqual(polls[1].get_date(),
+                         datetime.date.today() - datetime.timedelta(days=31))
+        self.assertEqual(polls[3].get_location(), c.S_IOWA)
+        self.assertIsNot(polls[0], polls[2])
+
+class TestCompareToBaseline(unittest.TestCase):
+    """
+    Tests the compare_to_baseline function, which finds benchmarks that have
+    slowed down.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        timings = {"simulate[1]":1.5, "simulate[10]":10.5, "populate[1]":1}
+        baseline = {"simulate[1]":1, "simulate[10]":10}
+        regressions = bm.compare_to_baseline(timings, baseline, 0.2)
+        self.assertEqual(regressions, {"simulate[1]":1.5})
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
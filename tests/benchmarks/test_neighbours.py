@@ -0,0 +1,32 @@
+"""Testing functionality for the neighbours benchmark module."""
+
+import unittest
+import datetime
+import numpy
+import constants as c
+import database
+import benchmarks.neighbours as nb
+
+class TestMakeUnits(unittest.TestCase):
+    """
+    Tests the make_units function, which makes synthetic units from copies of
+    the states.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        db = database.Database(states={})
+        db.set_primary_candidates([c.C_BIDEN, c.C_WARREN])
+        db.add_state(database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0,
+                     1.7, 5.4, c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_DC, -43, 3, 11.0, 36.5, 45.3, 4.0, 0.2,
+                     c.T_DC, 0.80, 702, None, 17, c.R_SOUTH))
+        units_db = nb.make_units(db, 3, numpy.random.default_rng(0))
+        self.assertEqual(list(units_db.get_states_dict()),
+                         [c.S_NORTH_DAKOTA, c.S_NORTH_DAKOTA + " 1",
+                          c.S_NORTH_DAKOTA + " 2"])
+        self.assertEqual(units_db.get_state(c.S_NORTH_DAKOTA).get_PVI(), 17)
+        self.assertNotEqual(
+            units_db.get_state(c.S_NORTH_DAKOTA + " 1").get_PVI(), 17)
+        self.assertEqual(db.get_state(c.S_NORTH_DAKOTA).get_PVI(), 17)
\ No newline at end of file
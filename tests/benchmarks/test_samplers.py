@@ -0,0 +1,36 @@
+"""Testing functionality for the samplers benchmark module."""
+
+import unittest
+import numpy
+import tests.helpers as helpers
+import benchmarks.samplers as sb
+
+class TestGetReductions(unittest.TestCase):
+    """
+    Tests the get_reductions function, which compares each sampler's
+    variances to those of random sampling.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        report = {"random":(numpy.array([4.0, 0]), numpy.array([9.0])),
+                  "sobol":(numpy.array([1.0, 0]), numpy.array([3.0]))}
+        reductions = sb.get_reductions(report)
+        numpy.testing.assert_allclose(reductions["random"][1], [1])
+        numpy.testing.assert_allclose(reductions["sobol"][0], [4, numpy.nan])
+        numpy.testing.assert_allclose(reductions["sobol"][1], [3])
+
+class TestVarianceReport(unittest.TestCase):
+    """
+    Tests the variance_report function, which finds the variance between runs
+    with each sampler.
+
+    """
+    def test_standard_case(self):
+        """Checks the report runs with the default samplers."""
+        report = sb.variance_report(helpers.make_snapshot(), num_sims=4,
+                                    replications=2, workers=1)
+        self.assertEqual(list(report), sb.REPORT_SAMPLERS)
+        for win_variances, delegate_variances in report.values():
+            self.assertEqual(win_variances.shape, (3,))
+            self.assertEqual(delegate_variances.shape, (2,))
\ No newline at end of file
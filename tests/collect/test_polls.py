@@ -0,0 +1,118 @@
+"""Testing functionality for the polls module."""
+
+import os
+import json
+import unittest
+import tempfile
+import datetime
+import database
+import constants as c
+import collect.polls as cp
+
+class TestReadPolls(unittest.TestCase):
+    """
+    Tests the read_polls function, which reads the polls in a poll file a
+    chunk at a time.
+
+    """
+    def setUp(self):
+        """Creates a directory to write poll files to."""
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Deletes the directory."""
+        self.directory.cleanup()
+
+    def write_file(self, name, text):
+        """Writes a poll file and returns its path."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as poll_file:
+            poll_file.write(text)
+        return path
+
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        path = self.write_file("polls.csv",
+            "question,location,weight,date,Biden,C_WARREN\n"
+            "Primary,USA,1.5,2019-10-19,40,60\n"
+            "Q_PRIMARY,S_IOWA,2,2019-10-20,,55.5\n"
+            "Primary,Iowa,1,2019-10-21,45,55\n")
+        chunks = list(cp.read_polls(path, 2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        poll = chunks[0][1]
+        self.assertEqual(poll.question, c.Q_PRIMARY)
+        self.assertEqual(poll.get_location(), c.S_IOWA)
+        self.assertEqual(poll.get_weight(), 2)
+        self.assertEqual(poll.get_result(), {c.C_WARREN:55.5})
+        self.assertEqual(poll.get_date(), datetime.date(2019, 10, 20))
+        self.assertEqual(chunks[0][0].get_result(),
+                         {c.C_BIDEN:40, c.C_WARREN:60})
+
+    def test_jsonl(self):
+        """Tests case where the poll file is in JSONL format."""
+        lines = [{"question":"Primary", "location":"USA", "weight":1.5,
+                  "date":"2019-10-19", "result":{"Biden":40, "C_WARREN":60}},
+                 {"question":"Primary", "location":"S_NEVADA", "weight":1,
+                  "date":"2019-10-20", "result":{"Sanders":30}}]
+        path = self.write_file("polls.jsonl", "\n".join(
+            json.dumps(line) for line in lines) + "\n\n")
+        polls = [poll for chunk in cp.read_polls(path) for poll in chunk]
+        self.assertEqual(len(polls), 2)
+        self.assertEqual(polls[0].get_result(), {c.C_BIDEN:40, c.C_WARREN:60})
+        self.assertEqual(polls[1].get_location(), c.S_NEVADA)
+        self.assertEqual(polls[1].get_date(), datetime.date(2019, 10, 20))
+
+    def test_unknown_name(self):
+        """Tests case where the file names an unknown candidate."""
+        path = self.write_file("polls.csv",
+            "question,location,weight,date,Biden,Nobody\n"
+            "Primary,USA,1,2019-10-19,40,60\n")
+        with self.assertRaises(ValueError):
+            list(cp.read_polls(path))
+
+    def test_bad_header(self):
+        """Tests case where the file does not start with the right columns."""
+        path = self.write_file("polls.csv",
+            "location,question,weight,date,Biden\n"
+            "USA,Primary,1,2019-10-19,40\n")
+        with self.assertRaises(ValueError):
+            list(cp.read_polls(path))
+
+    def test_write_polls(self):
+        """Checks polls written by write_polls are read back unchanged."""
+        polls = [database.Poll(c.Q_PRIMARY, c.S_USA, 1.25, {c.C_BIDEN:40,
+                               c.C_WARREN:60}, datetime.date(2019, 10, 19)),
+                 database.Poll(c.Q_PRIMARY, c.S_IOWA, 2, {c.C_SANDERS:30},
+                               datetime.date(2019, 10, 20))]
+        path = os.path.join(self.directory.name, "polls.csv")
+        cp.write_polls(path, polls)
+        read = [poll for chunk in cp.read_polls(path) for poll in chunk]
+        for poll, read_poll in zip(polls, read):
+            self.assertEqual(read_poll.get_location(), poll.get_location())
+            self.assertEqual(read_poll.get_weight(), poll.get_weight())
+            self.assertEqual(read_poll.get_result(), poll.get_result())
+            self.assertEqual(read_poll.get_date(), poll.get_date())
+
+class TestAddToDatabase(unittest.TestCase):
+    """
+    Tests the add_to_database function, which adds the polls in a poll file
+    to the database.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        existing = database.Poll(c.Q_PRIMARY, c.S_USA, 1, {c.C_BIDEN:100},
+                                 datetime.date(2019, 10, 1))
+        db = database.Database(states={}, primary_calendar=[],
+                               polls=[existing])
+        polls = db.get_polls()
+        db = cp.add_to_database(db, chunk_size=5)
+        self.assertIs(db.get_polls(), polls)
+        self.assertIs(polls[0], existing)
+        self.assertEqual(len(polls), 33)
+        self.assertEqual(polls[1].get_location(), c.S_USA)
+        self.assertEqual(polls[1].get_result()[c.C_BIDEN], 25)
+        self.assertEqual(polls[-1].get_date(), datetime.date(2019, 11, 1))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
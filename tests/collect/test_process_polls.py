@@ -1,9 +1,12 @@
 """Testing functionality for the process_polls module."""
 
+import math
 import unittest
 import datetime
+import numpy
 import database
 import constants as c
+import tests.helpers as helpers
 import collect.process_polls as pp
 
 class TestDatePolls(unittest.TestCase):
@@ -30,5 +33,259 @@ class TestDatePolls(unittest.TestCase):
         with self.assertRaises(TypeError):
             dated_polls = pp.date_polls(polls, today)
 
+    def test_repeated(self):
+        """Checks the polls are unchanged, so dating them again is safe."""
+        today = datetime.date(2019, 11, 11)
+        polls = [database.Poll(c.Q_PRIMARY, c.S_USA, 2,
+                 {c.C_BIDEN:40, c.C_WARREN:60}, datetime.date(2019, 11, 1)),
+                 database.Poll(c.Q_PRIMARY, c.S_USA, 1,
+                 {c.C_BIDEN:50, c.C_WARREN:50}, datetime.date(2019, 9, 1))]
+        first = pp.date_polls(polls, today)
+        second = pp.date_polls(polls, today)
+        self.assertEqual(polls[0].get_weight(), 2)
+        self.assertEqual(len(first), 1)
+        self.assertAlmostEqual(first[0].get_weight(), 1.6)
+        self.assertEqual(second[0].get_weight(), first[0].get_weight())
+
+class TestAttachPrimaryPollsToStates(unittest.TestCase):
+    """
+    Tests the attach_primary_polls_to_states function, which adds polling
+    averages to the database.
+
+    """
+    def test_cache(self):
+        """Checks averages are reused until polls are added."""
+        today = datetime.date.today()
+        db = make_averages_database()
+        db.polls = [make_poll(c.S_IOWA, 1, 40, today),
+                    make_poll(c.S_USA, 1, 50, today)]
+        pp.average_cache.clear()
+        pp.attach_primary_polls_to_states(db)
+        self.assertEqual(len(pp.average_cache), 3)
+        pp.attach_primary_polls_to_states(db)
+        self.assertEqual(len(pp.average_cache), 3)
+        self.assertAlmostEqual(db.get_state(c.S_IOWA).get_primary_polling()[
+            c.C_BIDEN], 40)
+
+        # Adding a poll gives the polls a new version.
+        db.add_polls([make_poll(c.S_IOWA, 1, 60, today)])
+        pp.attach_primary_polls_to_states(db)
+        self.assertEqual(len(pp.average_cache), 6)
+        self.assertAlmostEqual(db.get_state(c.S_IOWA).get_primary_polling()[
+            c.C_BIDEN], 50)
+
+    def test_as_of_date(self):
+        """Checks only polls finished by the as-of date are averaged."""
+        today = datetime.date(2019, 10, 25)
+        db = pp.attach_primary_polls_to_states(
+            make_averages_database().as_of(today))
+        for location in [c.S_IOWA, c.S_NEW_HAMPSHIRE]:
+            average = db.get_state(location).get_primary_polling()
+            expected = reference_average(db, location, today)
+            numpy.testing.assert_allclose(average.values, expected.values)
+            self.assertAlmostEqual(average.confidence, expected.confidence)
+        self.assertEqual(db.get_nat_primary_environment().confidence, 0)
+
+class TestDailyAverages(unittest.TestCase):
+    """
+    Tests the daily_averages function, which finds the polling averages on
+    every day in a range.
+
+    """
+    def test_standard_case(self):
+        """Checks each day's averages use the polls finished by then."""
+        db = make_averages_database()
+        start = datetime.date(2019, 9, 20)
+        averages, confidence = pp.daily_averages(db, start,
+                                                 datetime.date(2019, 12, 31))
+        self.assertEqual(averages.shape, (103, 3, 2))
+        self.assertEqual(confidence.shape, (103, 3))
+        for day in [0, 11, 12, 30, 46, 60, 102]:
+            today = start + datetime.timedelta(days=day)
+            for code, location in enumerate([c.S_USA, c.S_IOWA]):
+                expected = reference_average(db, location, today)
+                numpy.testing.assert_allclose(averages[day, code],
+                                              expected.values, atol=1e-9)
+                self.assertAlmostEqual(confidence[day, code],
+                                       expected.confidence)
+
+        # Nevada has no polls.
+        self.assertEqual(averages[:, 2].max(), 0)
+        self.assertEqual(confidence[:, 2].max(), 0)
+
+class TestAverageCache(unittest.TestCase):
+    """
+    Tests the AverageCache class, which keeps the most recently used polling
+    averages.
+
+    """
+    def test_standard_case(self):
+        """Checks the least recently used average is dropped."""
+        cache = pp.AverageCache(2)
+        cache.add("a", 1)
+        cache.add("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.add("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(len(cache), 2)
+
+class TestWeightedAverage(unittest.TestCase):
+    """
+    Tests the weighted_average function, which averages a list of polls.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        db = database.Database(states={}, primary_calendar=[],
+                               primary_candidates=[c.C_BIDEN, c.C_WARREN])
+        polls = [database.Poll(c.Q_PRIMARY, c.S_USA, 3,
+                 {c.C_BIDEN:40, c.C_WARREN:60}, datetime.date(2019, 11, 1)),
+                 database.Poll(c.Q_PRIMARY, c.S_USA, 1,
+                 {c.C_BIDEN:60}, datetime.date(2019, 10, 1))]
+        average = pp.weighted_average(polls, db)
+        self.assertAlmostEqual(average[c.C_BIDEN], 45)
+        self.assertAlmostEqual(average[c.C_WARREN], 60)
+        self.assertAlmostEqual(average.confidence,
+                               1 - math.exp(-4/pp.HIGH_TOTAL_WEIGHT))
+
+    def test_no_polls(self):
+        """Tests case where the list of polls is empty."""
+        db = database.Database(states={}, primary_calendar=[],
+                               primary_candidates=[c.C_BIDEN, c.C_WARREN])
+        average = pp.weighted_average([], db)
+        self.assertEqual(average.to_dict(), {c.C_BIDEN:0, c.C_WARREN:0,
+                                             "confidence":0})
+
+class TestWeightedAverages(unittest.TestCase):
+    """
+    Tests the weighted_averages function, which averages the polls of every
+    location at once.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        results = numpy.array([[40, 60], [50, 50], [30, 0], [20, 80]],
+                              dtype=float)
+        missing = numpy.array([[False, False], [False, False], [False, True],
+                               [False, False]])
+        weights = numpy.array([1, 3, 2, 2], dtype=float)
+        location_codes = numpy.array([0, 0, 2, 2])
+        averages, confidence = pp.weighted_averages(results, missing, weights,
+                                                    location_codes, 3)
+        numpy.testing.assert_allclose(averages, [[47.5, 52.5], [0, 0],
+                                                 [25, 80]])
+        numpy.testing.assert_allclose(confidence, 1 - numpy.exp(
+            numpy.array([-4, 0, -4])/pp.HIGH_TOTAL_WEIGHT))
+
+def make_averages_database():
+    """Creates a database with two states and polls in one of them."""
+    db = helpers.make_database()
+    db.add_polls([make_poll(c.S_IOWA, 2, 40, datetime.date(2019, 10, 1)),
+                  make_poll(c.S_IOWA, 1, 55, datetime.date(2019, 10, 20)),
+                  make_poll(c.S_USA, 1, 45, datetime.date(2019, 11, 5))])
+    return db
+
+def make_poll(location, weight, biden, date):
+    """Creates a poll between Biden and Warren."""
+    return database.Poll(c.Q_PRIMARY, location, weight,
+                         {c.C_BIDEN:biden, c.C_WARREN:100 - biden}, date)
+
+def reference_average(db, location, today):
+    """
+    Averages copies of a location's polls finished by today with date_polls.
+
+    """
+    polls = [database.Poll(poll.question, poll.location, poll.weight,
+                           poll.result, poll.date)
+             for poll in db.get_polls() if poll.get_location() == location
+             and poll.get_date() <= today]
+    return pp.weighted_average(pp.date_polls(polls, today), db)
+
+class TestPollAverages(unittest.TestCase):
+    """
+    Tests the PollAverages class, which finds polling averages on any date
+    from running sums.
+
+    """
+    def test_standard_case(self):
+        """Checks the averages match those found with date_polls."""
+        db = make_averages_database()
+        averages = pp.PollAverages(db, datetime.date(2019, 11, 1))
+        for today in [datetime.date(2019, 10, 10), datetime.date(2019, 11, 1),
+                      datetime.date(2019, 11, 25)]:
+            for location in [c.S_USA, c.S_IOWA]:
+                expected = reference_average(db, location, today)
+                average = averages.get_average(location, today)
+                numpy.testing.assert_allclose(average.values, expected.values)
+                self.assertAlmostEqual(average.confidence,
+                                       expected.confidence)
+        average = averages.get_average(c.S_NEW_HAMPSHIRE,
+                                       datetime.date(2019, 11, 1))
+        self.assertEqual(average.confidence, 0)
+        self.assertEqual(list(average.values), [0, 0])
+
+    def test_as_of_date(self):
+        """
+        Checks the averages are found on the database's as-of date, and match
+        those attached to the states.
+
+        """
+        db = make_averages_database()
+        today = datetime.date(2019, 10, 25)
+        expected = pp.attach_primary_polls_to_states(db.as_of(today))
+        as_of_db = db.as_of(today)
+        pp.PollAverages(as_of_db).update_database()
+        for location in [c.S_IOWA, c.S_NEW_HAMPSHIRE]:
+            polling = as_of_db.get_state(location).get_primary_polling()
+            expected_polling = expected.get_state(
+                location).get_primary_polling()
+            numpy.testing.assert_allclose(polling.values,
+                                          expected_polling.values)
+            self.assertAlmostEqual(polling.confidence,
+                                   expected_polling.confidence)
+        average = as_of_db.get_nat_primary_environment()
+        expected_average = expected.get_nat_primary_environment()
+        numpy.testing.assert_allclose(average.values, expected_average.values)
+        self.assertAlmostEqual(average.confidence,
+                               expected_average.confidence)
+
+    def test_add_polls(self):
+        """Checks adding polls updates the averages in the database."""
+        db = make_averages_database()
+        today = datetime.date(2019, 11, 1)
+        averages = pp.PollAverages(db, today)
+        averages.update_database(today)
+        usa_average = db.get_nat_primary_environment()
+        averages.add_polls([make_poll(c.S_IOWA, 3, 20,
+                                      datetime.date(2019, 10, 25)),
+                            make_poll(c.S_IOWA, 1, 70,
+                                      datetime.date(2019, 10, 5))], today)
+        self.assertEqual(len(db.get_polls()), 5)
+        self.assertIs(db.get_nat_primary_environment(), usa_average)
+        expected = reference_average(db, c.S_IOWA, today)
+        polling = db.get_state(c.S_IOWA).get_primary_polling()
+        numpy.testing.assert_allclose(polling.values, expected.values)
+        self.assertAlmostEqual(polling.confidence, expected.confidence)
+
+    def test_add_back_dated_first(self):
+        """
+        Checks polls added after a back-dated poll in the same call are only
+        counted once.
+
+        """
+        db = make_averages_database()
+        today = datetime.date(2019, 11, 1)
+        averages = pp.PollAverages(db, today)
+        averages.add_polls([make_poll(c.S_IOWA, 1, 70,
+                                      datetime.date(2019, 10, 5)),
+                            make_poll(c.S_IOWA, 3, 20,
+                                      datetime.date(2019, 10, 25))], today)
+        self.assertEqual(len(averages.dates[c.S_IOWA]), 4)
+        expected = reference_average(db, c.S_IOWA, today)
+        polling = db.get_state(c.S_IOWA).get_primary_polling()
+        numpy.testing.assert_allclose(polling.values, expected.values)
+        self.assertAlmostEqual(polling.confidence, expected.confidence)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""Shared fixtures for the tests."""
+
+import datetime
+import constants as c
+import database
+import simulate.state_similarities as ss
+
+def make_database():
+    """Creates a small database with two states and two candidates."""
+    db = database.Database(states={}, primary_calendar=[],
+                           nat_primary_environment={c.C_BIDEN:55,
+                           c.C_WARREN:45, "confidence":0.8})
+    db.set_primary_candidates([c.C_BIDEN, c.C_WARREN])
+    db.add_state(database.State(c.S_IOWA, 3, 6, 6.2, 85.0, 3.8, 2.7, 0.6,
+                 c.T_STATE, 1.1, 3156, datetime.date(2019, 2, 3), 41,
+                 c.R_MIDWEST, {c.C_BIDEN:45, c.C_WARREN:55,
+                 "confidence":0.7}))
+    db.add_state(database.State(c.S_NEW_HAMPSHIRE, 0, 4, 3.9, 90.0, 1.7, 2.9,
+                 0.3, c.T_STATE, 1.2, 1356, datetime.date(2019, 2, 11), 24,
+                 c.R_NORTH, {c.C_BIDEN:50, c.C_WARREN:50,
+                 "confidence":0.6}))
+    db.add_primary_date(database.PrimaryDate(datetime.date(2019, 2, 3),
+                        [c.S_IOWA]))
+    db.add_primary_date(database.PrimaryDate(datetime.date(2019, 2, 11),
+                        [c.S_NEW_HAMPSHIRE]))
+    return ss.save_state_similarities(db)
+
+def make_snapshot():
+    """Creates a snapshot of the database from make_database."""
+    return database.ModelSnapshot(make_database())
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""Testing functionality for the adaptive_simulation module."""
+
+import unittest
+import numpy
+import tests.helpers as helpers
+import simulate.adaptive_simulation as adas
+
+class TestRunUntilPrecise(unittest.TestCase):
+    """
+    Tests the run_until_precise function, which runs simulations until the
+    estimated probabilities are precise enough.
+
+    """
+    def test_standard_case(self):
+        """Checks the run stops once the errors are below the tolerance."""
+        summary, precise = adas.run_until_precise(
+            helpers.make_snapshot(), 0.02, seed=1, use_batch_engine=True,
+            batch_size=100, min_sims=200)
+        self.assertTrue(precise)
+        self.assertGreaterEqual(len(summary), 200)
+        self.assertEqual(len(summary) % 100, 0)
+        self.assertLess(adas.get_largest_error(summary), 0.02)
+
+    def test_max_sims(self):
+        """Tests the case where the simulation limit is reached first."""
+        summary, precise = adas.run_until_precise(
+            helpers.make_snapshot(), 0.0001, seed=1, workers=1, batch_size=20,
+            min_sims=20, max_sims=50)
+        self.assertFalse(precise)
+        self.assertEqual(len(summary), 50)
+
+    def test_shared_pool(self):
+        """
+        Checks batches run on one pool of processes match batches run in this
+        process.
+
+        """
+        snapshot = helpers.make_snapshot()
+        serial, _ = adas.run_until_precise(snapshot, 0.0001, seed=3,
+                                           workers=1, batch_size=10,
+                                           max_sims=30)
+        parallel, _ = adas.run_until_precise(snapshot, 0.0001, seed=3,
+                                             workers=2, batch_size=10,
+                                             max_sims=30)
+        self.assertEqual(len(parallel), 30)
+        numpy.testing.assert_array_equal(parallel.delegate_sums,
+                                         serial.delegate_sums)
+
+    def test_time_budget(self):
+        """Tests the case where the time budget runs out first."""
+        summary, precise = adas.run_until_precise(
+            helpers.make_snapshot(), 0.0001, time_budget=0, seed=1,
+            use_batch_engine=True, batch_size=50)
+        self.assertFalse(precise)
+        self.assertEqual(len(summary), 50)
+
+    def test_no_tolerance(self):
+        """Tests the case where the tolerance is not positive."""
+        with self.assertRaises(ValueError):
+            summary, precise = adas.run_until_precise(helpers.make_snapshot(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
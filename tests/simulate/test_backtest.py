@@ -0,0 +1,72 @@
+"""Testing functionality for the backtest module."""
+
+import unittest
+import datetime
+import numpy
+import constants as c
+import database
+import tests.helpers as helpers
+import simulate.backtest as bt
+
+def make_database():
+    """Creates a database with two states and polls from October 2019."""
+    db = helpers.make_database()
+    db.add_polls([make_poll(c.S_USA, 70, 10), make_poll(c.S_USA, 30, 12),
+                  make_poll(c.S_IOWA, 40, 11)])
+    return db
+
+def make_poll(location, biden, day):
+    """Creates a poll between Biden and Warren from October 2019."""
+    return database.Poll(c.Q_PRIMARY, location, 1, {c.C_BIDEN:biden,
+                         c.C_WARREN:100 - biden}, datetime.date(2019, 10, day))
+
+class TestRunBacktest(unittest.TestCase):
+    """
+    Tests the run_backtest function, which simulates the primary as of each
+    day in a range.
+
+    """
+    def test_standard_case(self):
+        """Checks each day only uses the polls finished by that day."""
+        db = make_database()
+        polling = db.get_state(c.S_IOWA).get_primary_polling().to_dict()
+        results = bt.run_backtest(db, datetime.date(2019, 10, 9),
+                                  datetime.date(2019, 10, 12), 200, seed=1,
+                                  workers=1)
+        numpy.testing.assert_array_equal(results.num_sims, [0, 200, 200, 200])
+        self.assertTrue(numpy.isnan(results.win_probabilities[0]).all())
+
+        # Warren leads once the Iowa poll on the 11th is used. The two
+        # states' delegates are too few for a majority.
+        numpy.testing.assert_array_equal(results.get_win_probabilities(
+            "No majority")[1:], 1)
+        warren = results.most_delegates_probabilities[:, 1]
+        self.assertLess(warren[1], 0.9)
+        self.assertGreater(warren[2], 0.9)
+
+        # The database is not changed.
+        self.assertIsNone(db.as_of_date)
+        polling_after = db.get_state(c.S_IOWA).get_primary_polling()
+        self.assertEqual(polling_after.to_dict(), polling)
+
+    def test_workers(self):
+        """Checks the results do not depend on the number of processes."""
+        db = make_database()
+        start = datetime.date(2019, 10, 10)
+        stop = datetime.date(2019, 10, 12)
+        one_process = bt.run_backtest(db, start, stop, 100, seed=3, workers=1)
+        two_processes = bt.run_backtest(db, start, stop, 100, seed=3,
+                                        workers=2)
+        numpy.testing.assert_array_equal(one_process.win_probabilities,
+                                         two_processes.win_probabilities)
+        numpy.testing.assert_array_equal(one_process.mean_delegates,
+                                         two_processes.mean_delegates)
+
+    def test_invalid_range(self):
+        """Tests the case where the range ends before it starts."""
+        with self.assertRaises(ValueError):
+            bt.run_backtest(make_database(), datetime.date(2019, 10, 12),
+                            datetime.date(2019, 10, 10), workers=1)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Testing functionality for the batch_simulation module."""
+
+import unittest
+import datetime
+import numpy
+import constants as c
+import database
+import simulate.primary_simulation as ps
+import simulate.batch_simulation as bs
+import simulate.state_similarities as ss
+
+def make_database():
+    """Creates a small database with three states and three candidates."""
+    candidates = [c.C_BIDEN, c.C_WARREN, c.C_SANDERS]
+    db = database.Database(states={}, primary_calendar=[],
+                           nat_primary_environment={c.C_BIDEN:35,
+                           c.C_WARREN:35, c.C_SANDERS:30, "confidence":0.8})
+    db.set_primary_candidates(candidates)
+    db.add_state(database.State(c.S_IOWA, 3, 6, 6.2, 85.0, 3.8, 2.7, 0.6,
+                 c.T_STATE, 1.1, 3156, datetime.date(2019, 2, 3), 41,
+                 c.R_MIDWEST, {c.C_BIDEN:30, c.C_WARREN:40, c.C_SANDERS:30,
+                 "confidence":0.7}))
+    db.add_state(database.State(c.S_NEW_HAMPSHIRE, 0, 4, 3.9, 90.0, 1.7, 2.9,
+                 0.3, c.T_STATE, 1.2, 1356, datetime.date(2019, 2, 11), 24,
+                 c.R_NORTH, {c.C_BIDEN:25, c.C_WARREN:45, c.C_SANDERS:30,
+                 "confidence":0.6}))
+    db.add_state(database.State(c.S_SOUTH_CAROLINA, 8, 9, 5.7, 63.6, 26.8,
+                 1.5, 0.2, c.T_STATE, 0.97, 5084, datetime.date(2019, 2, 28),
+                 54, c.R_SOUTH, {c.C_BIDEN:50, c.C_WARREN:20, c.C_SANDERS:30,
+                 "confidence":0.9}))
+    db = ss.save_state_similarities(db)
+    db.add_primary_date(database.PrimaryDate(datetime.date(2019, 2, 3),
+                        [c.S_IOWA]))
+    db.add_primary_date(database.PrimaryDate(datetime.date(2019, 2, 11),
+                        [c.S_NEW_HAMPSHIRE, c.S_SOUTH_CAROLINA]))
+    return db
+
+def make_dropout_database():
+    """Creates the database of make_database with a fourth candidate."""
+    db = make_database()
+    db.set_primary_candidates(db.get_primary_candidates() + [c.C_YANG])
+    for state_name in db.get_states_dict():
+        state = db.get_state(state_name)
+        polling = state.get_primary_polling().to_dict()
+        polling[c.C_YANG] = 0.5
+        state.primary_polling = database.as_candidate_vector(polling)
+    return db
+
+class TestSimulateBatch(unittest.TestCase):
+    """
+    Tests the simulate_batch function, which runs many simulations of the
+    primary at once.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        db = make_database()
+        results = bs.simulate_batch(db, db.get_nat_primary_environment(),
+                                    db.get_primary_candidates(),
+                                    db.get_primary_calendar(), 50)
+        self.assertEqual(len(results), 50)
+        self.assertTrue(numpy.all(results.final_delegates.sum(axis=1) == 119))
+        for result in results:
+            self.assertNotEqual(result.winner, None)
+            self.assertIn(result.most_delegates, db.get_primary_candidates())
+
+    def test_matches_scalar_simulation(self):
+        """Checks the mean delegate totals agree with ps.simulate."""
+        numpy.random.seed(0)
+        db = make_database()
+        candidates = db.get_primary_candidates()
+        results = bs.simulate_batch(db, db.get_nat_primary_environment(),
+                                    candidates, db.get_primary_calendar(),
+                                    4000)
+        scalar_delegates = []
+        for simulation in range(400):
+            db = make_database()
+            result = ps.simulate(db, db.get_nat_primary_environment(),
+                                 candidates, db.get_primary_calendar())
+            scalar_delegates.append([result.final_delegates[candidate]
+                                     for candidate in candidates])
+        scalar_delegates = numpy.array(scalar_delegates)
+        difference = (results.final_delegates.mean(axis=0) -
+                      scalar_delegates.mean(axis=0))
+        error = scalar_delegates.std(axis=0)/numpy.sqrt(400)
+        self.assertTrue(numpy.all(numpy.abs(difference) < 4*error + 0.5))
+
+    def test_dropped_candidates(self):
+        """Checks candidates dropping out agrees with ps.simulate."""
+        numpy.random.seed(1)
+        candidates = [c.C_BIDEN, c.C_WARREN, c.C_SANDERS, c.C_YANG]
+        nat_environment = {c.C_BIDEN:40, c.C_WARREN:30, c.C_SANDERS:29.5,
+                           c.C_YANG:0.5, "confidence":0.8}
+        db = make_dropout_database()
+        results = bs.simulate_batch(db, nat_environment, candidates,
+                                    db.get_primary_calendar(), 4000)
+        scalar_delegates = []
+        for simulation in range(400):
+            db = make_dropout_database()
+            result = ps.simulate(db, nat_environment, candidates,
+                                 db.get_primary_calendar())
+            scalar_delegates.append([result.final_delegates[candidate]
+                                     for candidate in candidates])
+        scalar_delegates = numpy.array(scalar_delegates)
+        difference = (results.final_delegates.mean(axis=0) -
+                      scalar_delegates.mean(axis=0))
+        error = scalar_delegates.std(axis=0)/numpy.sqrt(400)
+        self.assertTrue(numpy.all(numpy.abs(difference) < 4*error + 0.5))
+        self.assertTrue(numpy.all(results.final_delegates.sum(axis=1) == 119))
+
+    def test_no_candidates(self):
+        """Tests the case where there are no candidates provided."""
+        db = make_database()
+        with self.assertRaises(ValueError):
+            results = bs.simulate_batch(db, db.get_nat_primary_environment(),
+                                        [], db.get_primary_calendar(), 10)
+
+    def test_no_simulations(self):
+        """Tests the case where the number of simulations is not positive."""
+        db = make_database()
+        with self.assertRaises(ValueError):
+            results = bs.simulate_batch(db, db.get_nat_primary_environment(),
+                                        db.get_primary_candidates(),
+                                        db.get_primary_calendar(), 0)
+
+class TestSummariseBatch(unittest.TestCase):
+    """
+    Tests the summarise_batch function, which runs many simulations of the
+    primary at once and summarises the results.
+
+    """
+    def test_matches_simulate_batch(self):
+        """Checks the summary agrees with the results of simulate_batch."""
+        db = make_database()
+        candidates = db.get_primary_candidates()
+        results = bs.simulate_batch(db, db.get_nat_primary_environment(),
+                                    candidates, db.get_primary_calendar(), 50,
+                                    numpy.random.default_rng(3))
+        summary = bs.summarise_batch(db, db.get_nat_primary_environment(),
+                                     candidates, db.get_primary_calendar(),
+                                     50, numpy.random.default_rng(3))
+        expected = database.SimulationSummary(candidates)
+        expected.add_results(results)
+        self.assertEqual(len(summary), 50)
+        self.assertEqual(summary.get_win_counts(), expected.get_win_counts())
+        self.assertTrue(numpy.array_equal(summary.histograms,
+                                          expected.histograms))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""Testing functionality for the parallel_simulation module."""
+
+import unittest
+import tempfile
+import numpy
+import constants as c
+import tests.helpers as helpers
+import simulate.parallel_simulation as pars
+import analyse.outcomes as outcomes
+
+class TestRunSimulations(unittest.TestCase):
+    """
+    Tests the run_simulations function, which runs simulations over a pool of
+    processes.
+
+    """
+    def test_standard_case(self):
+        """Checks method runs correctly under typical inputs."""
+        summary = pars.run_simulations(helpers.make_snapshot(), 25, seed=1, workers=1,
+                                       chunk_size=10)
+        self.assertEqual(len(summary), 25)
+        self.assertEqual(sum(summary.get_win_counts().values()), 25)
+        self.assertAlmostEqual(sum(summary.get_mean_delegates().values()), 65)
+
+    def test_reproducible_across_workers(self):
+        """Checks the same seed gives the same results for any worker count."""
+        snapshot = helpers.make_snapshot()
+        serial = pars.run_simulations(snapshot, 30, seed=7, workers=1,
+                                      chunk_size=4)
+        parallel = pars.run_simulations(snapshot, 30, seed=7, workers=2,
+                                        chunk_size=4)
+        self.assertEqual(serial.get_win_counts(), parallel.get_win_counts())
+        self.assertEqual(serial.get_mean_delegates(),
+                         parallel.get_mean_delegates())
+        self.assertTrue(numpy.array_equal(serial.histograms,
+                                          parallel.histograms))
+
+    def test_different_seeds(self):
+        """Checks different seeds give different results."""
+        snapshot = helpers.make_snapshot()
+        summary_1 = pars.run_simulations(snapshot, 20, seed=1, workers=1)
+        summary_2 = pars.run_simulations(snapshot, 20, seed=2, workers=1)
+        self.assertFalse(numpy.array_equal(summary_1.histograms,
+                                           summary_2.histograms))
+
+    def test_store(self):
+        """Checks every simulation's outcome is written to the store."""
+        with tempfile.TemporaryDirectory() as path:
+            snapshot = helpers.make_snapshot()
+            with outcomes.OutcomeWriter(path,
+                    snapshot.get_primary_candidates()) as writer:
+                summary = pars.run_simulations(snapshot, 30, seed=3,
+                                               workers=1, chunk_size=8,
+                                               store=writer)
+            store = outcomes.OutcomeStore(path)
+            self.assertEqual(len(store), 30)
+            self.assertTrue(numpy.array_equal(store.summarise().histograms,
+                                              summary.histograms))
+            del store
+
+    def test_sobol_independent_of_chunks(self):
+        """Checks Sobol results do not depend on the chunk size."""
+        snapshot = helpers.make_snapshot()
+        summary_1 = pars.run_simulations(snapshot, 20, seed=5, workers=1,
+                                         chunk_size=3, sampler="sobol")
+        summary_2 = pars.run_simulations(snapshot, 20, seed=5, workers=1,
+                                         chunk_size=7, sampler="sobol")
+        self.assertEqual(len(summary_1), 20)
+        self.assertTrue(numpy.array_equal(summary_1.histograms,
+                                          summary_2.histograms))
+
+    def test_importance(self):
+        """Checks importance sampled simulations are weighted."""
+        summary = pars.run_simulations(helpers.make_snapshot(), 200, seed=2,
+                                       workers=1, sampler="importance",
+                                       candidate=c.C_WARREN, tilt=1)
+        self.assertLess(summary.get_effective_sample_size(), 200)
+        probabilities = summary.get_weighted_win_probabilities()
+        errors = summary.get_weighted_win_standard_errors()
+        self.assertLess(abs(probabilities["No majority"] - 1),
+                        4*errors["No majority"])
+        with self.assertRaises(ValueError):
+            pars.run_simulations(helpers.make_snapshot(), 10, workers=1,
+                                 sampler="importance")
+
+    def test_bit_generator(self):
+        """Checks the bit generator changes the random numbers."""
+        snapshot = helpers.make_snapshot()
+        summary_1 = pars.run_simulations(snapshot, 20, seed=1, workers=1)
+        summary_2 = pars.run_simulations(snapshot, 20, seed=1, workers=1,
+                                         bit_generator="Philox")
+        self.assertFalse(numpy.array_equal(summary_1.histograms,
+                                           summary_2.histograms))
+        with self.assertRaises(ValueError):
+            pars.run_simulations(snapshot, 20, workers=1,
+                                 bit_generator="MT19937")
+
+    def test_unknown_sampler(self):
+        """Tests the case where the sampler does not exist."""
+        with self.assertRaises(ValueError):
+            pars.run_simulations(helpers.make_snapshot(), 10, workers=1,
+                                 sampler="latin")
+
+    def test_no_simulations(self):
+        """Tests the case where the number of simulations is not positive."""
+        with self.assertRaises(ValueError):
+            results = pars.run_simulations(helpers.make_snapshot(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""Testing functionality for the profiling module."""
+
+import unittest
+import unittest.mock
+import datetime
+import database
+import tests.helpers as helpers
+import simulate.primary_simulation as ps
+import simulate.parallel_simulation as pars
+import simulate.profiling as profiling
+
+class TestStageProfiler(unittest.TestCase):
+    """
+    Tests the StageProfiler class, which records the time taken by each stage
+    of a simulation.
+
+    """
+    def test_standard_case(self):
+        """Checks the stages of a simulation are recorded."""
+        db = helpers.make_database()
+        profiler = profiling.StageProfiler()
+        for simulation in range(3):
+            ps.simulate(helpers.make_database(), db.get_nat_primary_environment(),
+                        db.get_primary_candidates(), db.get_primary_calendar(),
+                        profiler=profiler)
+        self.assertEqual(profiler.stages["national_draw"][1], 3)
+        self.assertEqual(profiler.stages["random_variation"][1], 6)
+        self.assertEqual(profiler.stages["tactical_voting"][1], 6)
+        self.assertEqual(profiler.dates[(datetime.date(2019, 2, 3),
+                                         "apply_comparison")][1], 3)
+        self.assertNotIn((None, "national_draw"), profiler.dates)
+        self.assertIn("delegate_allocation", profiler.get_table())
+
+    def test_merge(self):
+        """Checks the timings of chunks run in other processes are merged."""
+        snapshot = database.ModelSnapshot(helpers.make_database())
+        profiler = profiling.StageProfiler()
+        pars.run_simulations(snapshot, 10, seed=1, workers=2, chunk_size=3,
+                             profiler=profiler)
+        self.assertEqual(profiler.stages["national_draw"][1], 10)
+
+    def test_environment_variable(self):
+        """Checks profiling is turned on by the environment variable."""
+        with unittest.mock.patch.dict("os.environ",
+                                      {profiling.ENVIRONMENT_VARIABLE:"1"}):
+            self.assertTrue(profiling.get_profiler().enabled)
+        with unittest.mock.patch.dict("os.environ",
+                                      {profiling.ENVIRONMENT_VARIABLE:"0"}):
+            self.assertIs(profiling.get_profiler(), profiling.DISABLED)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""Testing functionality for the sampling module."""
+
+import unittest
+import datetime
+import numpy
+import constants as c
+import database
+import simulate.sampling as sampling
+
+class TestSampler(unittest.TestCase):
+    """
+    Tests the Sampler class, which gives the normal draws of each simulation.
+
+    """
+    def test_standard_case(self):
+        """Checks the draws come straight from the generator."""
+        sampler = sampling.Sampler()
+        sampler.rng = sampling.make_generator(3)
+        rng = sampling.make_generator(3)
+        sampler.start_run()
+        numpy.testing.assert_array_equal(sampler.standard_normal(3),
+                                         rng.standard_normal(3))
+        numpy.testing.assert_array_equal(sampler.normal([1, 2], 2),
+                                         [1, 2] + 2*rng.standard_normal(2))
+        self.assertEqual(sampler.get_weight(), 1.0)
+
+class TestBlockSampler(unittest.TestCase):
+    """
+    Tests the BlockSampler class, which hands out slices of blocks of
+    standard normal values.
+
+    """
+    def test_standard_case(self):
+        """Checks the draws follow the generator's stream."""
+        sampler = sampling.BlockSampler(sampling.make_generator(3),
+                                        block_size=5)
+        rng = sampling.make_generator(3)
+        first = sampler.standard_normal(3)
+        numpy.testing.assert_array_equal(first, rng.standard_normal(5)[:3])
+        second = sampler.normal([1, 2, 3], 2)
+        expected = [1, 2, 3] + 2*rng.standard_normal(5)[:3]
+        numpy.testing.assert_array_equal(second, expected)
+        kept = first.copy()
+        self.assertEqual(sampler.standard_normal((2, 4)).shape, (2, 4))
+        self.assertEqual(numpy.shape(sampler.standard_normal()), ())
+        numpy.testing.assert_array_equal(first, kept)
+
+    def test_invalid_block_size(self):
+        """Tests the case where the block size is not positive."""
+        with self.assertRaises(ValueError):
+            sampling.BlockSampler(block_size=0)
+
+class TestMakeGenerator(unittest.TestCase):
+    """
+    Tests the make_generator function, which creates a generator from a seed
+    and a stream.
+
+    """
+    def test_streams(self):
+        """Checks each stream matches the child spawned from the seed."""
+        child = numpy.random.SeedSequence(5).spawn(3)[2]
+        numpy.testing.assert_array_equal(
+            sampling.make_generator(5, 2).standard_normal(4),
+            numpy.random.default_rng(child).standard_normal(4))
+        self.assertFalse(numpy.array_equal(
+            sampling.make_generator(5, 1).standard_normal(4),
+            sampling.make_generator(5, 2).standard_normal(4)))
+
+    def test_bit_generators(self):
+        """Checks the bit generator can be chosen."""
+        rng = sampling.make_generator(1, bit_generator="Philox")
+        self.assertIsInstance(rng.bit_generator, numpy.random.Philox)
+        with self.assertRaises(ValueError):
+            sampling.make_generator(1, bit_generator="MT19937")
+
+class TestAntitheticSampler(unittest.TestCase):
+    """
+    Tests the AntitheticSampler class, which pairs simulations with opposite
+    draws.
+
+    """
+    def test_standard_case(self):
+        """Checks the second run of a pair mirrors the first."""
+        sampler = sampling.AntitheticSampler(numpy.random.default_rng(0))
+        sampler.start_run()
+        first = [sampler.normal(0, 2, 3), sampler.standard_normal()]
+        sampler.start_run()
+        second = [sampler.normal(0, 2, 3), sampler.standard_normal()]
+        numpy.testing.assert_allclose(second[0], -first[0])
+        self.assertAlmostEqual(float(second[1]), -float(first[1]))
+
+        # The next pair makes new draws.
+        sampler.start_run()
+        third = sampler.normal(0, 2, 3)
+        self.assertFalse(numpy.allclose(third, first[0]))
+
+    def test_extra_draws(self):
+        """Checks draws the first run did not make are drawn at random."""
+        sampler = sampling.AntitheticSampler(numpy.random.default_rng(0))
+        sampler.start_run()
+        first = sampler.standard_normal(2)
+        sampler.start_run()
+        second = sampler.standard_normal(3)
+        extra = sampler.standard_normal(2)
+        numpy.testing.assert_allclose(second[:2], -first)
+        self.assertEqual(extra.shape, (2,))
+
+class TestQuasiRandomSampler(unittest.TestCase):
+    """
+    Tests the QuasiRandomSampler class, which gives each simulation a point
+    of a scrambled Sobol sequence.
+
+    """
+    def test_standard_case(self):
+        """Checks the draws are balanced standard normal values."""
+        sampler = sampling.QuasiRandomSampler(2, 3, seed=1, block_size=64)
+        draws = numpy.zeros((256, 5))
+        for i in range(256):
+            sampler.start_run()
+            draws[i, :3] = sampler.normal([1, 2, 3], 1) - [1, 2, 3]
+            draws[i, 3:] = sampler.standard_normal(2)
+        self.assertTrue(numpy.all(numpy.sum(draws < 0, axis=0) == 128))
+        numpy.testing.assert_allclose(draws.mean(axis=0), 0, atol=0.02)
+        numpy.testing.assert_allclose(draws.std(axis=0), 1, atol=0.05)
+
+    def test_high_dimensions(self):
+        """
+        Checks every dimension of a sequence as large as the model's is
+        evenly spread, and the dimensions are less correlated on average
+        than independent draws.
+
+        """
+        sampler = sampling.QuasiRandomSampler(60, 20, seed=1)
+        draws = numpy.zeros((1024, 1200))
+        for i in range(1024):
+            sampler.start_run()
+            for j in range(60):
+                draws[i, 20*j:20*j + 20] = sampler.standard_normal(20)
+        quartiles = numpy.searchsorted([-0.6744897502, 0, 0.6744897502],
+                                       draws)
+        for quartile in range(4):
+            self.assertTrue(numpy.all(numpy.sum(quartiles == quartile,
+                                                axis=0) == 256))
+        correlations = numpy.abs(numpy.corrcoef(draws.T)[
+            ~numpy.eye(1200, dtype=bool)])
+        self.assertLess(correlations.mean(),
+                        0.5*numpy.sqrt(2/numpy.pi/1024))
+
+    def test_start(self):
+        """Checks samplers with the same seed share one sequence."""
+        whole = sampling.QuasiRandomSampler(1, 2, seed=3)
+        part = sampling.QuasiRandomSampler(1, 2, seed=3, start=5)
+        for i in range(6):
+            whole.start_run()
+        part.start_run()
+        numpy.testing.assert_array_equal(whole.standard_normal(2),
+                                         part.standard_normal(2))
+
+    def test_extra_draws(self):
+        """Checks draws beyond the points are drawn at random."""
+        sampler = sampling.QuasiRandomSampler(1, 2, seed=3,
+                                              rng=numpy.random.default_rng(0))
+        sampler.start_run()
+        self.assertEqual(sampler.standard_normal(3).shape, (3,))
+        self.assertEqual(sampler.standard_normal(2).shape, (2,))
+
+class TestImportanceSampler(unittest.TestCase):
+    """
+    Tests the ImportanceSampler class, which moves a candidate's national
+    support and weights each simulation.
+
+    """
+    def test_standard_case(self):
+        """Checks only the candidate's national draw is moved."""
+        sampler = sampling.ImportanceSampler([c.C_BIDEN, c.C_WARREN],
+                                             c.C_WARREN, 1.5,
+                                             numpy.random.default_rng(0))
+        rng = numpy.random.default_rng(0)
+        sampler.start_run()
+        national = sampler.normal([50, 50], 2)
+        state = sampler.normal([50, 50], 2)
+        expected = rng.standard_normal(2)
+        numpy.testing.assert_allclose(national,
+                                      50 + 2*(expected + [0, 1.5]))
+        numpy.testing.assert_allclose(state, 50 + 2*rng.standard_normal(2))
+        self.assertAlmostEqual(sampler.get_weight(), numpy.exp(
+            -1.5*(expected[1] + 1.5) + 1.5**2/2))
+
+    def test_unbiased(self):
+        """Checks weighted draws estimate a tail probability."""
+        sampler = sampling.ImportanceSampler([c.C_BIDEN, c.C_WARREN],
+                                             c.C_WARREN, 3,
+                                             numpy.random.default_rng(1))
+        total = 0
+        for i in range(4000):
+            sampler.start_run()
+            if sampler.standard_normal(2)[1] > 3:
+                total += sampler.get_weight()
+        self.assertAlmostEqual(total/4000, 0.00135, delta=0.0001)
+
+    def test_unknown_candidate(self):
+        """Tests the case where the candidate is not in the race."""
+        with self.assertRaises(ValueError):
+            sampling.ImportanceSampler([c.C_BIDEN], c.C_WARREN)
+
+class TestMakeSampler(unittest.TestCase):
+    """
+    Tests the make_sampler function, which creates a sampler by name.
+
+    """
+    def test_standard_case(self):
+        """Checks each sampler is created with the right dimensions."""
+        rng = numpy.random.default_rng(0)
+        calendar = [database.PrimaryDate(datetime.date(2019, 2, 3),
+                                         [c.S_IOWA]),
+                    database.PrimaryDate(datetime.date(2019, 3, 3),
+                                         [c.S_MINNESOTA, c.S_TEXAS])]
+        candidates = [c.C_BIDEN, c.C_WARREN]
+        self.assertIs(sampling.make_sampler("random", candidates, calendar,
+                                            rng), rng)
+        self.assertIsInstance(sampling.make_sampler("antithetic", candidates,
+                                                    calendar, rng),
+                              sampling.AntitheticSampler)
+        sampler = sampling.make_sampler("sobol", candidates, calendar, rng)
+        self.assertEqual(sampler.num_draws, 4)
+        self.assertEqual(sampler.draw_size, 2)
+
+    def test_unknown_sampler(self):
+        """Tests the case where the sampler does not exist."""
+        with self.assertRaises(ValueError):
+            sampling.make_sampler("latin", [c.C_BIDEN], [])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
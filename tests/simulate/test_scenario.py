@@ -0,0 +1,113 @@
+"""Testing functionality for the scenario module."""
+
+import unittest
+import datetime
+import numpy
+import constants as c
+import database
+import collect.process_polls as pp
+import simulate.state_similarities as ss
+import tests.helpers as helpers
+import simulate.scenario as sc
+
+def make_database():
+    """Creates a populated database with three states and three candidates."""
+    db = helpers.make_database()
+    db.as_of_date = datetime.date(2019, 11, 1)
+    db.set_primary_candidates([c.C_BIDEN, c.C_WARREN, c.C_HARRIS])
+    db.add_state(database.State(c.S_NEVADA, -1, 6, 29.0, 48.7, 10.1, 8.7, 1.7,
+                 c.T_STATE, 1.0, 3034, datetime.date(2019, 2, 22), 36,
+                 c.R_WEST))
+    db.add_primary_date(database.PrimaryDate(datetime.date(2019, 2, 22),
+                        [c.S_NEVADA]))
+    db.add_polls([make_poll(c.S_USA, 40, 30, 20),
+                  make_poll(c.S_IOWA, 25, 35, 15),
+                  make_poll(c.S_NEVADA, 35, 20, 25)])
+    db = pp.attach_primary_polls_to_states(db)
+    db = ss.save_state_similarities(db)
+    return db
+
+def make_poll(location, biden, warren, harris, day=25):
+    """Creates a poll from October 2019."""
+    return database.Poll(c.Q_PRIMARY, location, 1, {c.C_BIDEN:biden,
+                         c.C_WARREN:warren, c.C_HARRIS:harris},
+                         datetime.date(2019, 10, day))
+
+class TestScenario(unittest.TestCase):
+    """
+    Tests the Scenario class, which builds changed versions of a base
+    database.
+
+    """
+    def test_matches_rebuild(self):
+        """Checks a scenario matches a database rebuilt from scratch."""
+        base = make_database()
+        new_poll = make_poll(c.S_IOWA, 10, 60, 30, 30)
+        scenario = sc.Scenario(base).drop_candidates([c.C_HARRIS])
+        scenario.move_primary(c.S_NEVADA, datetime.date(2019, 2, 1))
+        scenario.add_polls([new_poll])
+        scenario.update_state(c.S_NEW_HAMPSHIRE, PVI=10)
+        db = scenario.build()
+
+        # Make the same changes to a new database.
+        expected = make_database()
+        expected.set_primary_candidates([c.C_BIDEN, c.C_WARREN])
+        expected.get_state(c.S_NEVADA).date = datetime.date(2019, 2, 1)
+        expected.get_state(c.S_NEW_HAMPSHIRE).PVI = 10
+        expected.add_polls([new_poll])
+        expected = pp.attach_primary_polls_to_states(expected)
+        expected = ss.save_state_similarities(expected)
+
+        for state_name in expected.get_states_dict():
+            polling = db.get_state(state_name).get_primary_polling()
+            expected_polling = expected.get_state(
+                state_name).get_primary_polling()
+            self.assertEqual(polling.candidates, expected_polling.candidates)
+            numpy.testing.assert_allclose(polling.values,
+                                          expected_polling.values)
+            self.assertAlmostEqual(polling.confidence,
+                                   expected_polling.confidence)
+        numpy.testing.assert_allclose(
+            db.get_state_similarities().get_matrix(),
+            expected.get_state_similarities().get_matrix())
+        self.assertEqual([primary_date.get_primaries() for primary_date in
+                          db.get_primary_calendar()],
+                         [[c.S_NEVADA], [c.S_IOWA], [c.S_NEW_HAMPSHIRE]])
+
+    def test_base_unchanged(self):
+        """Checks building scenarios does not change the base database."""
+        base = make_database()
+        polling = base.get_state(c.S_IOWA).get_primary_polling().copy()
+        scenario = sc.Scenario(base).drop_candidates([c.C_HARRIS])
+        scenario.move_primary(c.S_IOWA, None)
+        scenario.set_polls(c.S_IOWA, [make_poll(c.S_IOWA, 50, 30, 20)])
+        scenario.update_state(c.S_IOWA, PVI=-5)
+        db = scenario.build()
+        self.assertEqual(len(db.get_primary_calendar()), 2)
+        self.assertNotIn(c.S_IOWA,
+                         db.get_state_similarities().get_state_names())
+        self.assertAlmostEqual(db.get_state(c.S_IOWA).get_primary_polling()[
+            c.C_BIDEN], 50)
+
+        self.assertEqual(len(base.get_primary_candidates()), 3)
+        self.assertEqual(len(base.get_primary_calendar()), 3)
+        self.assertEqual(len(base.get_polls()), 3)
+        self.assertEqual(base.get_state(c.S_IOWA).PVI, 3)
+        self.assertIn(c.S_IOWA,
+                      base.get_state_similarities().get_state_names())
+        numpy.testing.assert_array_equal(
+            base.get_state(c.S_IOWA).get_primary_polling().values,
+            polling.values)
+
+    def test_invalid_changes(self):
+        """Tests the case where changes refer to unknown data."""
+        scenario = sc.Scenario(make_database())
+        with self.assertRaises(ValueError):
+            scenario.drop_candidates([c.C_YANG])
+        with self.assertRaises(ValueError):
+            scenario.set_polls(c.S_IOWA, [make_poll(c.S_NEVADA, 50, 30, 20)])
+        with self.assertRaises(ValueError):
+            scenario.update_state(c.S_IOWA, date=None)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
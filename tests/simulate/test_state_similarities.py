@@ -1,6 +1,7 @@
 """Testing functionality for the state_similarities module."""
 
 import unittest
+import numpy
 import database
 import datetime
 import constants as c
@@ -30,5 +31,262 @@ class TestFindSimilarity(unittest.TestCase):
         self.assertLess(similarity, 0.1)
         self.assertGreaterEqual(similarity, 0)
 
+class TestFindSimilarityMatrix(unittest.TestCase):
+    """
+    Tests the find_similarity_matrix function, which calculates the political
+    similarity of every pair of states at once.
+
+    """
+    def test_matches_find_similarity(self):
+        """Checks each entry agrees with find_similarity."""
+        states = [
+            database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0, 1.7, 5.4,
+                           c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                           14, c.R_MIDWEST),
+            database.State(c.S_SOUTH_DAKOTA, 14, 3, 3.6, 82.3, 1.9, 1.2, 8.6,
+                           c.T_STATE, 1.01, 882, datetime.date(2019, 6, 2),
+                           14, c.R_MIDWEST),
+            database.State(c.S_DC, -43, 3, 11.0, 36.5, 45.3, 4.0, 0.2, c.T_DC,
+                           0.80, 702, datetime.date(2019, 6, 16), 17,
+                           c.R_SOUTH)]
+        sims = ss.find_similarity_matrix(states)
+        for i in range(len(states)):
+            self.assertEqual(sims[i, i], 0)
+            for j in range(len(states)):
+                if i != j:
+                    self.assertAlmostEqual(sims[i, j],
+                        ss.find_similarity(states[i], states[j]))
+
+class TestSaveStateSimilarities(unittest.TestCase):
+    """
+    Tests the save_state_similarities function, which adds the similarity
+    matrix to the database.
+
+    """
+    def test_undated_states_excluded(self):
+        """Checks states with no primary are left out of the matrix."""
+        db = database.Database(states={})
+        db.add_state(database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0,
+                     1.7, 5.4, c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_SOUTH_DAKOTA, 14, 3, 3.6, 82.3, 1.9,
+                     1.2, 8.6, c.T_STATE, 1.01, 882, datetime.date(2019, 6, 2),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_DC, -43, 3, 11.0, 36.5, 45.3, 4.0, 0.2,
+                     c.T_DC, 0.80, 702, None, 17, c.R_SOUTH))
+        db = ss.save_state_similarities(db)
+        similarities = db.get_state_similarities()
+        self.assertEqual(similarities.get_state_names(),
+                         (c.S_NORTH_DAKOTA, c.S_SOUTH_DAKOTA))
+        sims = db.get_state(c.S_NORTH_DAKOTA).get_state_sims()
+        self.assertEqual(list(sims), [c.S_SOUTH_DAKOTA])
+        self.assertGreater(sims[c.S_SOUTH_DAKOTA], 0.9)
+
+class TestFindSparseSimilarities(unittest.TestCase):
+    """
+    Tests the find_sparse_similarities function, which keeps only each
+    state's most similar neighbours.
+
+    """
+    def make_states(self):
+        """Creates four states with primaries."""
+        return [
+            database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0, 1.7, 5.4,
+                           c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                           14, c.R_MIDWEST),
+            database.State(c.S_SOUTH_DAKOTA, 14, 3, 3.6, 82.3, 1.9, 1.2, 8.6,
+                           c.T_STATE, 1.01, 882, datetime.date(2019, 6, 2),
+                           14, c.R_MIDWEST),
+            database.State(c.S_MINNESOTA, -1, 10, 5.5, 79.5, 6.8, 5.2, 1.4,
+                           c.T_STATE, 1.08, 5640, datetime.date(2019, 3, 3),
+                           75, c.R_MIDWEST),
+            database.State(c.S_DC, -43, 3, 11.0, 36.5, 45.3, 4.0, 0.2, c.T_DC,
+                           0.80, 702, datetime.date(2019, 6, 16), 17,
+                           c.R_SOUTH)]
+
+    def test_most_similar_kept(self):
+        """Checks each state keeps its most similar neighbours in order."""
+        states = self.make_states()
+        names = [state.name for state in states]
+        dense = ss.find_similarity_matrix(states)
+        sparse = ss.find_sparse_similarities(names, states, 2, block_size=3)
+        for i in range(len(states)):
+            positions, sims = sparse.get_neighbours(names[i])
+            expected = [j for j in numpy.argsort(-dense[i], kind="stable")
+                        if j != i and dense[i, j] > 0][:2]
+            self.assertEqual(list(positions), expected)
+            numpy.testing.assert_allclose(sims, dense[i, expected])
+
+    def test_all_neighbours(self):
+        """Checks keeping every neighbour gives the full matrix."""
+        states = self.make_states()
+        names = [state.name for state in states]
+        sparse = ss.find_sparse_similarities(names, states, len(states),
+                                             block_size=1)
+        dense = ss.find_similarity_matrix(states)
+        numpy.testing.assert_allclose(sparse.get_matrix(), dense)
+        sims = sparse.get_sims(c.S_DC)
+        self.assertEqual(list(sims), names[:3])
+        numpy.testing.assert_allclose(list(sims.values()), dense[3, :3])
+
+    def test_invalid_neighbours(self):
+        """Checks the number of neighbours must be positive."""
+        states = self.make_states()
+        with self.assertRaises(ValueError):
+            ss.find_sparse_similarities([state.name for state in states],
+                                        states, 0)
+
+class TestUpdateStateSimilarities(unittest.TestCase):
+    """
+    Tests the update_state_similarities function, which only recalculates
+    the similarities of changed states.
+
+    """
+    def test_standard_case(self):
+        """Checks the matrix matches one found from scratch."""
+        db = database.Database(states={})
+        db.add_state(database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0,
+                     1.7, 5.4, c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_SOUTH_DAKOTA, 14, 3, 3.6, 82.3, 1.9,
+                     1.2, 8.6, c.T_STATE, 1.01, 882, datetime.date(2019, 6, 2),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_DC, -43, 3, 11.0, 36.5, 45.3, 4.0, 0.2,
+                     c.T_DC, 0.80, 702, None, 17, c.R_SOUTH))
+        similarities = ss.save_state_similarities(
+            db).get_state_similarities()
+
+        # Change one state and give another a primary.
+        db.get_state(c.S_NORTH_DAKOTA).PVI = -20
+        db.get_state(c.S_DC).date = datetime.date(2019, 6, 16)
+        updated = ss.update_state_similarities(
+            similarities, db.get_states_dict(), [c.S_NORTH_DAKOTA])
+        expected = ss.save_state_similarities(db).get_state_similarities()
+        self.assertEqual(updated.get_state_names(),
+                         expected.get_state_names())
+        numpy.testing.assert_allclose(updated.get_matrix(),
+                                      expected.get_matrix())
+
+    def test_sparse(self):
+        """Checks sparse similarities keep their number of neighbours."""
+        db = database.Database(states={})
+        db.add_state(database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0,
+                     1.7, 5.4, c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_SOUTH_DAKOTA, 14, 3, 3.6, 82.3, 1.9,
+                     1.2, 8.6, c.T_STATE, 1.01, 882, datetime.date(2019, 6, 2),
+                     14, c.R_MIDWEST))
+        db.add_state(database.State(c.S_DC, -43, 3, 11.0, 36.5, 45.3, 4.0, 0.2,
+                     c.T_DC, 0.80, 702, datetime.date(2019, 6, 16), 17,
+                     c.R_SOUTH))
+        similarities = ss.save_state_similarities(
+            db, num_neighbours=1).get_state_similarities()
+
+        db.get_state(c.S_NORTH_DAKOTA).PVI = -40
+        updated = ss.update_state_similarities(
+            similarities, db.get_states_dict(), [c.S_NORTH_DAKOTA])
+        expected = ss.save_state_similarities(
+            db, num_neighbours=1).get_state_similarities()
+        self.assertIsInstance(updated, database.SparseSimilarities)
+        self.assertEqual(updated.num_neighbours, 1)
+        numpy.testing.assert_allclose(updated.get_matrix(),
+                                      expected.get_matrix())
+
+class TestComparisonTotals(unittest.TestCase):
+    """
+    Tests the ComparisonTotals class, which keeps running totals of polling
+    used to infer support from similar states.
+
+    """
+    def make_database(self):
+        """Creates a database with three states with polling averages."""
+        db = database.Database(states={})
+        db.set_primary_candidates([c.C_BIDEN, c.C_WARREN])
+        db.add_state(database.State(c.S_NORTH_DAKOTA, 17, 3, 3.5, 84.4, 3.0,
+                     1.7, 5.4, c.T_STATE, 0.98, 760, datetime.date(2019, 3, 10),
+                     14, c.R_MIDWEST, {c.C_BIDEN:60, c.C_WARREN:40,
+                     "confidence":0.5}))
+        db.add_state(database.State(c.S_SOUTH_DAKOTA, 14, 3, 3.6, 82.3, 1.9,
+                     1.2, 8.6, c.T_STATE, 1.01, 882, datetime.date(2019, 6, 2),
+                     14, c.R_MIDWEST, {c.C_BIDEN:40, c.C_WARREN:60,
+                     "confidence":0.2}))
+        db.add_state(database.State(c.S_MINNESOTA, -1, 10, 5.5, 79.5, 6.8,
+                     5.2, 1.4, c.T_STATE, 1.08, 5640, datetime.date(2019, 3, 3),
+                     75, c.R_MIDWEST, {c.C_BIDEN:0, c.C_WARREN:0,
+                     "confidence":0}))
+        return ss.save_state_similarities(db)
+
+    def test_standard_case(self):
+        """Checks the inferred support is the weighted average of polling."""
+        db = self.make_database()
+        totals = ss.ComparisonTotals(db, db.get_primary_candidates())
+        sims = db.get_state(c.S_MINNESOTA).get_state_sims()
+        weight_nd = sims[c.S_NORTH_DAKOTA]*0.5
+        weight_sd = sims[c.S_SOUTH_DAKOTA]*0.2
+        expected = (60*weight_nd + 40*weight_sd)/(weight_nd + weight_sd)
+        support = totals.get_inferred_support(c.S_MINNESOTA)
+        self.assertAlmostEqual(support[c.C_BIDEN], expected)
+
+    def test_update(self):
+        """Checks updating a state's polling changes the inferred support."""
+        db = self.make_database()
+        totals = ss.ComparisonTotals(db, db.get_primary_candidates())
+        totals.update(c.S_SOUTH_DAKOTA, {c.C_BIDEN:60, c.C_WARREN:40,
+                                         "confidence":1})
+        support = totals.get_inferred_support(c.S_MINNESOTA)
+        self.assertAlmostEqual(support[c.C_BIDEN], 60)
+        self.assertAlmostEqual(support[c.C_WARREN], 40)
+
+    def test_missing_candidates(self):
+        """Checks candidates missing from an update have no support."""
+        db = self.make_database()
+        totals = ss.ComparisonTotals(db, db.get_primary_candidates())
+        totals.update(c.S_NORTH_DAKOTA, {c.C_WARREN:100, "confidence":1})
+        totals.update(c.S_SOUTH_DAKOTA, {c.C_WARREN:100, "confidence":1})
+        support = totals.get_inferred_support(c.S_MINNESOTA)
+        self.assertAlmostEqual(support[c.C_BIDEN], 0)
+        self.assertAlmostEqual(support[c.C_WARREN], 100)
+
+    def test_no_data(self):
+        """Tests the case where no similar state has any data."""
+        db = self.make_database()
+        totals = ss.ComparisonTotals(db, db.get_primary_candidates())
+        totals.update(c.S_NORTH_DAKOTA, {c.C_BIDEN:0, c.C_WARREN:0,
+                                         "confidence":0})
+        totals.update(c.S_SOUTH_DAKOTA, {c.C_BIDEN:0, c.C_WARREN:0,
+                                         "confidence":0})
+        self.assertEqual(totals.get_inferred_support(c.S_MINNESOTA), None)
+
+    def test_sparse(self):
+        """Checks support is only inferred from the nearest neighbours."""
+        db = self.make_database()
+        similarities = db.get_state_similarities()
+        sims = similarities.get_sims(c.S_MINNESOTA)
+        nearest = max(sims, key=sims.get)
+        db = ss.save_state_similarities(db, num_neighbours=1)
+        totals = ss.ComparisonTotals(db, db.get_primary_candidates())
+        support = totals.get_inferred_support(c.S_MINNESOTA)
+        expected = db.get_state(nearest).get_primary_polling()
+        self.assertAlmostEqual(support[c.C_BIDEN], expected[c.C_BIDEN])
+
+class TestComparisonNeighbours(unittest.TestCase):
+    """
+    Tests the comparison_neighbours function, which finds the states each
+    state is compared to in the batch engine.
+
+    """
+    def test_sparse_matches_dense(self):
+        """Checks keeping every neighbour gives the dense weights."""
+        db = TestComparisonTotals().make_database()
+        state_names = [c.S_MINNESOTA, c.S_NORTH_DAKOTA, c.S_SOUTH_DAKOTA]
+        weights = ss.comparison_weights(db, state_names)
+        db = ss.save_state_similarities(db, num_neighbours=2)
+        neighbours = ss.comparison_neighbours(db, state_names)
+        for i in range(len(state_names)):
+            positions, sims = neighbours[i]
+            row = numpy.zeros(len(state_names))
+            row[positions] = sims
+            numpy.testing.assert_allclose(row, weights[i])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
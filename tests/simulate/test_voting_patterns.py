@@ -1,6 +1,8 @@
 """Testing functionality for the voting_patterns module."""
 
 import unittest
+import unittest.mock
+import numpy
 import constants as c
 import simulate.voting_patterns as vp
 
@@ -71,6 +73,37 @@ class TestPrimaryTacticalVoting(unittest.TestCase):
         with self.assertRaises(ValueError):
             result = vp.primary_tactical_voting(average, delegates)
 
+class TestFindViable(unittest.TestCase):
+    """
+    Tests the find_viable function, which finds the candidates still in the
+    race.
+
+    """
+    def test_standard_case(self):
+        """Checks candidates below the floor in both measures drop out."""
+        viable = vp.find_viable([60, 39.5, 0.3, 0.2], [50, 40, 10, 0], 1)
+        self.assertEqual(viable.tolist(), [True, True, True, False])
+
+    def test_many_simulations(self):
+        """Checks each row is treated as a separate simulation."""
+        viable = vp.find_viable([[60, 39.5, 0.5], [0.5, 0.5, 99]],
+                                [[0, 0, 0], [10, 0, 10]], 1)
+        self.assertEqual(viable.tolist(), [[True, True, False],
+                                           [True, False, True]])
+
+    def test_leader_viable(self):
+        """Tests the case where every candidate is below the floor."""
+        viable = vp.find_viable([40, 35, 25], [0, 0, 0], 50)
+        self.assertEqual(viable.tolist(), [True, False, False])
+
+    def test_default_floor(self):
+        """Checks the floor defaults to the current VIABILITY_FLOOR."""
+        with unittest.mock.patch.object(vp, "VIABILITY_FLOOR", 0):
+            viable = vp.find_viable([60, 39.5, 0.3, 0.2], [50, 40, 10, 0])
+        self.assertEqual(viable.tolist(), [True, True, True, True])
+        viable = vp.find_viable([60, 39.5, 0.3, 0.2], [50, 40, 10, 0])
+        self.assertEqual(viable.tolist(), [True, True, True, False])
+
 class TestRebalance(unittest.TestCase):
     """
     Tests the rebalance function, which adjusts a polling average or election
@@ -98,107 +131,37 @@ class TestRebalance(unittest.TestCase):
         with self.assertRaises(ValueError):
             result = vp.rebalance(average)
 
-class TestAssignLeftoverDelegates(unittest.TestCase):
+class TestAllocateDelegates(unittest.TestCase):
     """
-    Tests the assign_leftover_delegates function, which assists with correct
-    distribution of delegates in a primary.
+    Tests the allocate_delegates function, which distributes delegates in many
+    primaries at once.
     
     """
     def test_standard_case(self):
         """Checks method runs correctly under typical inputs."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        unassigned_dels = 2
-        result = vp.assign_leftover_delegates(delegates, pc_dels,
-                                              unassigned_dels)
-        self.assertEqual(result, {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                                  c.C_BUTTIGIEG:2})
+        vote_shares = numpy.array([[51.4, 34.6, 14.0], [24.6, 60.2, 15.2],
+                                   [33.3, 33.3, 33.4]])
+        result = vp.allocate_delegates(vote_shares, 41)
+        self.assertEqual(result.tolist(), [[23, 16, 2], [11, 25, 5],
+                                           [14, 13, 14]])
 
-    def test_negative_delegates(self):
-        """Tests case where one candidate has negative delegates."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:-2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        unassigned_dels = 2
-        with self.assertRaises(ValueError):
-            result = vp.assign_leftover_delegates(delegates, pc_dels,
-                                                  unassigned_dels)
-
-    def test_negative_pc_dels(self):
-        """Tests case where one candidate's entry in pc_dels is negative."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:-2}
-        unassigned_dels = 2
-        with self.assertRaises(ValueError):
-            result = vp.assign_leftover_delegates(delegates, pc_dels,
-                                                  unassigned_dels)
-    
-    def test_negative_unassigned_dels(self):
-        """Tests case where unassigned_dels is negative."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        unassigned_dels = -2
-        with self.assertRaises(ValueError):
-            result = vp.assign_leftover_delegates(delegates, pc_dels,
-                                                  unassigned_dels)
+    def test_delegates_per_row(self):
+        """Tests case where each row has a different number of delegates."""
+        vote_shares = numpy.array([[51.4, 34.6, 14.0], [24.6, 60.2, 15.2]])
+        result = vp.allocate_delegates(vote_shares, numpy.array([41, 7]))
+        self.assertEqual(result.sum(axis=1).tolist(), [41, 7])
 
-class TestUnassignExtraDelegates(unittest.TestCase):
-    """
-    Tests the unassign_extra_delegates function, which assists with correct
-    distribution of delegates in a primary.
-    
-    """
-    def test_standard_case(self):
-        """Checks method runs correctly under typical inputs."""
-        delegates = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        pc_dels = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        extra_dels = 2
-        result = vp.unassign_extra_delegates(delegates, pc_dels,
-                                             extra_dels)
-        self.assertEqual(result, {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                                  c.C_BUTTIGIEG:2})
-    
-    def test_negative_delegates(self):
-        """Tests case where one candidate has negative delegates."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:-2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        extra_dels = 2
-        with self.assertRaises(ValueError):
-            result = vp.unassign_extra_delegates(delegates, pc_dels, 
-                                                 extra_dels)
-
-    def test_negative_pc_dels(self):
-        """Tests case where one candidate's entry in pc_dels is negative."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:-2}
-        extra_dels = 2
-        with self.assertRaises(ValueError):
-            result = vp.unassign_extra_delegates(delegates, pc_dels,
-                                                 extra_dels)
-    
-    def test_negative_unassigned_dels(self):
-        """Tests case where unassigned_dels is negative."""
-        delegates = {c.C_BIDEN:51, c.C_WARREN:34, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        pc_dels = {c.C_BIDEN:52, c.C_WARREN:35, c.C_SANDERS:11,
-                     c.C_BUTTIGIEG:2}
-        extra_dels = -2
+    def test_largest_remainder(self):
+        """Checks leftover delegates go to the largest remainders."""
+        vote_shares = numpy.array([[45, 35, 20]])
+        result = vp.allocate_delegates(vote_shares, 10)
+        self.assertEqual(result.tolist(), [[5, 3, 2]])
+
+    def test_negative_support(self):
+        """Tests case where one candidate has negative support."""
+        vote_shares = numpy.array([[51.4, 34.6, 14.0], [60.2, 45.2, -5.4]])
         with self.assertRaises(ValueError):
-            result = vp.unassign_extra_delegates(delegates, pc_dels,
-                                                 extra_dels)
+            result = vp.allocate_delegates(vote_shares, 41)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
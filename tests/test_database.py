@@ -0,0 +1,327 @@
+"""Testing functionality for the database module."""
+
+import unittest
+import os
+import pickle
+import tempfile
+import datetime
+import numpy
+import constants as c
+import database
+import tests.helpers as helpers
+import simulate.primary_simulation as ps
+
+class TestModelSnapshot(unittest.TestCase):
+    """
+    Tests the ModelSnapshot class, which stores a read-only copy of a database
+    shared between simulations.
+
+    """
+    def test_repeated_simulations(self):
+        """Checks simulations on overlays leave the snapshot unchanged."""
+        db = helpers.make_database()
+        snapshot = database.ModelSnapshot(db)
+        polling = snapshot.get_state(c.S_IOWA).get_primary_polling().to_dict()
+        base_nat_environment = snapshot.get_nat_primary_environment().to_dict()
+        for simulation in range(3):
+            result = ps.simulate(snapshot.new_run(),
+                                 snapshot.get_nat_primary_environment(),
+                                 snapshot.get_primary_candidates(),
+                                 snapshot.get_primary_calendar())
+            self.assertEqual(sum(result.final_delegates.values()), 65)
+        polling_after = snapshot.get_state(c.S_IOWA).get_primary_polling()
+        self.assertEqual(polling_after.to_dict(), polling)
+        self.assertEqual(snapshot.get_nat_primary_environment().to_dict(),
+                         base_nat_environment)
+
+    def test_independent_of_database(self):
+        """Checks later changes to the database do not reach the snapshot."""
+        db = helpers.make_database()
+        snapshot = database.ModelSnapshot(db)
+        db.get_state(c.S_IOWA).primary_polling[c.C_BIDEN] = 0
+        self.assertEqual(snapshot.get_state(c.S_IOWA).get_primary_polling()[
+                         c.C_BIDEN], 45)
+
+    def test_read_only_polling(self):
+        """Checks the snapshot's polling averages cannot be modified."""
+        snapshot = database.ModelSnapshot(helpers.make_database())
+        with self.assertRaises(ValueError):
+            snapshot.get_state(c.S_IOWA).get_primary_polling()[c.C_BIDEN] = 0
+
+    def test_pickle(self):
+        """Checks a snapshot survives being pickled."""
+        snapshot = database.ModelSnapshot(helpers.make_database())
+        copied = pickle.loads(pickle.dumps(snapshot))
+        polling = snapshot.get_state(c.S_IOWA).get_primary_polling()
+        copied_polling = copied.get_state(c.S_IOWA).get_primary_polling()
+        self.assertEqual(copied_polling.to_dict(), polling.to_dict())
+        with self.assertRaises(ValueError):
+            copied_polling[c.C_BIDEN] = 0
+
+class TestSimulationOverlay(unittest.TestCase):
+    """
+    Tests the SimulationOverlay class, which stores the changes a single
+    simulation makes to a snapshot.
+
+    """
+    def test_writes_are_isolated(self):
+        """Checks results written to one overlay are not seen by another."""
+        snapshot = database.ModelSnapshot(helpers.make_database())
+        overlay_1 = snapshot.new_run()
+        overlay_2 = snapshot.new_run()
+        overlay_1.get_state(c.S_IOWA).primary_polling = {c.C_BIDEN:100,
+            c.C_WARREN:0, "confidence":1}
+        self.assertEqual(overlay_1.get_state(c.S_IOWA).get_primary_polling()[
+                         c.C_BIDEN], 100)
+        self.assertEqual(overlay_2.get_state(c.S_IOWA).get_primary_polling()[
+                         c.C_BIDEN], 45)
+
+class TestSimulationSummary(unittest.TestCase):
+    """
+    Tests the SimulationSummary class, which accumulates the results of
+    simulations.
+
+    """
+    def test_standard_case(self):
+        """Checks the summary agrees with the individual results."""
+        final_delegates = numpy.array([[2000, 1000, 769], [1000, 1500, 1269],
+                                       [1200, 1300, 1269]])
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN,
+                                              c.C_SANDERS])
+        summary.add_final_delegates(final_delegates)
+        self.assertEqual(len(summary), 3)
+        self.assertEqual(summary.get_win_counts(), {c.C_BIDEN:1,
+                                                    "No majority":2})
+        self.assertEqual(summary.get_most_delegates_counts(),
+                         {c.C_WARREN:2})
+        self.assertAlmostEqual(summary.get_mean_delegates()[c.C_WARREN],
+                               3800/3)
+        self.assertAlmostEqual(summary.get_delegate_variance()[c.C_SANDERS],
+                               numpy.var([769, 1269, 1269], ddof=1))
+        self.assertEqual(summary.get_histogram(c.C_SANDERS)[1269], 2)
+
+    def test_standard_errors(self):
+        """Checks the standard errors of the estimated probabilities."""
+        final_delegates = numpy.array([[2000, 1769], [1769, 2000],
+                                       [1950, 1819], [1900, 1869]])
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        summary.add_final_delegates(final_delegates)
+        win_errors = summary.get_win_standard_errors()
+        self.assertAlmostEqual(win_errors[c.C_BIDEN], (0.75*0.25/4)**0.5)
+        self.assertAlmostEqual(win_errors["No majority"], 0)
+        most_delegates_errors = summary.get_most_delegates_standard_errors()
+        self.assertEqual(most_delegates_errors, {c.C_BIDEN:0, c.C_WARREN:0})
+
+    def test_merge(self):
+        """Checks merging summaries matches summarising every result."""
+        candidates = [c.C_BIDEN, c.C_WARREN]
+        final_delegates = numpy.array([[2000, 1769], [1769, 2000],
+                                       [1884, 1885], [1900, 1869]])
+        summary_1 = database.SimulationSummary(candidates)
+        summary_1.add_final_delegates(final_delegates[:1])
+        summary_2 = database.SimulationSummary(candidates)
+        summary_2.add_final_delegates(final_delegates[1:])
+        summary = database.SimulationSummary(candidates)
+        summary.add_final_delegates(final_delegates)
+        summary_1.merge(summary_2)
+        self.assertEqual(summary_1.get_win_counts(), summary.get_win_counts())
+        self.assertEqual(summary_1.get_delegate_variance(),
+                         summary.get_delegate_variance())
+        self.assertTrue(numpy.array_equal(summary_1.histograms,
+                                          summary.histograms))
+
+    def test_weighted(self):
+        """Checks probabilities estimated from weighted simulations."""
+        final_delegates = numpy.array([[2000, 1769], [1769, 2000],
+                                       [1950, 1819], [1900, 1869]])
+        weights = numpy.array([0.5, 2, 0.1, 1.4])
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        summary.add_final_delegates(final_delegates[:2], weights[:2])
+        other = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        other.add_final_delegates(final_delegates[2:], weights[2:])
+        summary.merge(other)
+        probabilities = summary.get_weighted_win_probabilities()
+        self.assertAlmostEqual(probabilities[c.C_BIDEN], 2/4)
+        self.assertAlmostEqual(probabilities[c.C_WARREN], 2/4)
+        self.assertAlmostEqual(probabilities["No majority"], 0)
+        biden_weights = numpy.array([0.5, 0, 0.1, 1.4])
+        self.assertAlmostEqual(
+            summary.get_weighted_win_standard_errors()[c.C_BIDEN],
+            biden_weights.std()/2)
+        self.assertAlmostEqual(summary.get_effective_sample_size(),
+                               4**2/(weights**2).sum())
+        self.assertEqual(summary.get_win_counts(), {c.C_BIDEN:3,
+                                                    c.C_WARREN:1})
+
+    def test_unweighted(self):
+        """Checks unweighted simulations give the proportions won."""
+        final_delegates = numpy.array([[2000, 1769], [1769, 2000],
+                                       [1950, 1819], [1900, 1869]])
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        summary.add_final_delegates(final_delegates)
+        self.assertEqual(summary.get_weighted_win_probabilities(),
+                         {c.C_BIDEN:0.75, c.C_WARREN:0.25, "No majority":0})
+        errors = summary.get_weighted_win_standard_errors()
+        for name, error in summary.get_win_standard_errors().items():
+            self.assertAlmostEqual(errors[name], error)
+        self.assertEqual(summary.get_effective_sample_size(), 4)
+
+    def test_invalid_weights(self):
+        """Tests the case where the weights do not match the simulations."""
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        with self.assertRaises(ValueError):
+            summary.add_final_delegates([[2000, 1769]], [1, 1])
+        with self.assertRaises(ValueError):
+            summary.add_final_delegates([[2000, 1769]], [-1])
+
+    def test_merge_different_candidates(self):
+        """Tests the case where the summaries have different candidates."""
+        summary_1 = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        summary_2 = database.SimulationSummary([c.C_BIDEN, c.C_SANDERS])
+        with self.assertRaises(ValueError):
+            summary_1.merge(summary_2)
+
+    def test_results(self):
+        """Checks adding PrimarySimulationResults objects."""
+        result = database.PrimarySimulationResults()
+        result.add_final_delegates({c.C_BIDEN:1900, c.C_WARREN:1869})
+        summary = database.SimulationSummary([c.C_WARREN, c.C_BIDEN])
+        summary.add_results([result, result])
+        self.assertEqual(summary.get_win_counts(), {c.C_BIDEN:2})
+        self.assertEqual(summary.get_mean_delegates(), {c.C_WARREN:1869,
+                                                        c.C_BIDEN:1900})
+
+def make_poll(location, day):
+    """Creates a poll from a day in October 2019."""
+    return database.Poll(c.Q_PRIMARY, location, 1, {c.C_BIDEN:50,
+                         c.C_WARREN:50}, datetime.date(2019, 10, day))
+
+class TestPollIndex(unittest.TestCase):
+    """
+    Tests the PollIndex class, which finds a location's polls from a range
+    of dates.
+
+    """
+    def test_standard_case(self):
+        """Checks the polls in a window are found in date order."""
+        polls = [make_poll(c.S_IOWA, day) for day in [5, 1, 20, 10, 10, 3]]
+        polls.append(make_poll(c.S_USA, 10))
+        poll_index = database.PollIndex(polls)
+        window = poll_index.get_window(c.S_IOWA, datetime.date(2019, 10, 3),
+                                       datetime.date(2019, 10, 10))
+        self.assertEqual(window, [polls[5], polls[0], polls[3], polls[4]])
+        self.assertEqual(poll_index.get_window(c.S_IOWA),
+                         [polls[1], polls[5], polls[0], polls[3], polls[4],
+                          polls[2]])
+        self.assertEqual(poll_index.get_window(c.S_IOWA, stop=datetime.date(
+                             2019, 9, 30)), [])
+        self.assertEqual(poll_index.get_window(c.S_NEVADA), [])
+
+    def test_database(self):
+        """Checks a database's index includes polls added later."""
+        db = database.Database(states={}, primary_calendar=[],
+                               polls=[make_poll(c.S_IOWA, 10)])
+        poll_index = db.get_poll_index()
+        db.add_polls([make_poll(c.S_IOWA, 5), make_poll(c.S_USA, 1)])
+        self.assertIs(db.get_poll_index(), poll_index)
+        self.assertEqual([poll.get_date().day for poll in
+                          poll_index.get_window(c.S_IOWA)], [5, 10])
+        self.assertEqual(len(poll_index.get_window(c.S_USA)), 1)
+
+        # Replacing the list of polls rebuilds the index.
+        db.polls = [make_poll(c.S_NEVADA, 1)]
+        self.assertEqual(db.get_poll_index().get_window(c.S_IOWA), [])
+        self.assertEqual(len(db.get_poll_index().get_window(c.S_NEVADA)), 1)
+
+    def test_get_matrix(self):
+        """Checks a location's polls are converted to arrays."""
+        polls = [make_poll(c.S_IOWA, day) for day in [5, 1, 20, 10]]
+        polls[0].result = {c.C_BIDEN:70}
+        poll_index = database.PollIndex(polls)
+        matrix = poll_index.get_matrix(c.S_IOWA, [c.C_WARREN, c.C_BIDEN])
+        self.assertIs(poll_index.get_matrix(c.S_IOWA, [c.C_WARREN, c.C_BIDEN]),
+                      matrix)
+        numpy.testing.assert_array_equal(matrix.results,
+                                         [[50, 50], [0, 70], [50, 50],
+                                          [50, 50]])
+        numpy.testing.assert_array_equal(matrix.missing[:, 0],
+                                         [False, True, False, False])
+        rows = matrix.get_rows(datetime.date(2019, 10, 5),
+                               datetime.date(2019, 10, 19))
+        self.assertEqual(matrix.polls[rows], [polls[0], polls[3]])
+
+        # Adding polls to the location replaces its matrix.
+        poll_index.add_polls([make_poll(c.S_IOWA, 2)])
+        self.assertEqual(len(poll_index.get_matrix(c.S_IOWA, [c.C_BIDEN])), 5)
+
+class TestAsOf(unittest.TestCase):
+    """
+    Tests the as_of method of the Database class, which copies the database
+    to build the model as of another day.
+
+    """
+    def test_standard_case(self):
+        """Checks the copy shares the polls but not the states."""
+        db = helpers.make_database()
+        db.add_polls([make_poll(c.S_IOWA, 10)])
+        day = datetime.date(2019, 10, 15)
+        copy = db.as_of(day)
+        self.assertEqual(copy.get_as_of_date(), day)
+        self.assertEqual(db.get_as_of_date(), datetime.date.today())
+        self.assertIs(copy.get_poll_index(), db.get_poll_index())
+        self.assertIsNot(copy.get_state(c.S_IOWA), db.get_state(c.S_IOWA))
+        copy.get_state(c.S_IOWA).primary_polling = {}
+        self.assertEqual(db.get_state(c.S_IOWA).get_primary_polling()[
+            c.C_BIDEN], 45)
+
+        # The date is kept by snapshots.
+        snapshot = pickle.loads(pickle.dumps(database.ModelSnapshot(copy)))
+        self.assertEqual(snapshot.get_as_of_date(), day)
+        self.assertEqual(snapshot.new_run().get_as_of_date(), day)
+
+class TestBacktestResults(unittest.TestCase):
+    """
+    Tests the BacktestResults class, which stores the probabilities on each
+    day of a backtest.
+
+    """
+    def test_standard_case(self):
+        """Checks a day's row is filled in from a summary."""
+        days = [datetime.date(2019, 10, 1), datetime.date(2019, 10, 2)]
+        results = database.BacktestResults([c.C_BIDEN, c.C_WARREN], days)
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        summary.add_final_delegates([[3000, 769], [1500, 1600],
+                                     [1600, 1500], [1700, 1600]])
+        results.set_day(1, summary)
+        self.assertEqual(results.get_dates(), days)
+        numpy.testing.assert_array_equal(results.num_sims, [0, 4])
+        numpy.testing.assert_allclose(results.get_win_probabilities(
+            c.C_BIDEN), [numpy.nan, 0.25])
+        numpy.testing.assert_allclose(results.get_win_probabilities(
+            "No majority"), [numpy.nan, 0.75])
+        numpy.testing.assert_allclose(results.most_delegates_probabilities[1],
+                                      [2/3, 1/3])
+        numpy.testing.assert_allclose(results.mean_delegates[1],
+                                      [1950, 1367.25])
+
+    def test_save(self):
+        """Checks saved results are loaded unchanged."""
+        days = [datetime.date(2019, 10, 1), datetime.date(2019, 10, 2)]
+        results = database.BacktestResults([c.C_BIDEN, c.C_WARREN], days)
+        summary = database.SimulationSummary([c.C_BIDEN, c.C_WARREN])
+        summary.add_final_delegates([[3000, 769]])
+        results.set_day(0, summary)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "backtest.npz")
+            results.save(path)
+            loaded = database.BacktestResults.load(path)
+        self.assertEqual(loaded.candidates, results.candidates)
+        self.assertEqual(loaded.get_dates(), days)
+        for name in ["num_sims", "win_probabilities", "mean_delegates",
+                     "no_majority_probabilities",
+                     "most_delegates_probabilities"]:
+            numpy.testing.assert_array_equal(getattr(loaded, name),
+                                             getattr(results, name))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file